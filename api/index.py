@@ -12,7 +12,9 @@ sys.path.insert(0, str(root_dir))
 # Change working directory to root
 os.chdir(root_dir)
 
-from app_vercel import app
+from factory import create_app
+
+app = create_app(lazy_blueprints=True)
 
 def handler(request):
     """Vercel serverless function handler"""
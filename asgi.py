@@ -0,0 +1,6 @@
+from app import app as flask_app
+from services.async_api import create_asgi_app
+
+# Async JSON APIs in front of the Flask app; serve with an ASGI server:
+#   gunicorn -k uvicorn.workers.UvicornWorker -w 2 -b 0.0.0.0:$PORT asgi:app
+app = create_asgi_app(flask_app)
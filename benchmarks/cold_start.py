@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+RMGFraud Cold Start Benchmark
+Runs `python -X importtime` on app creation in a fresh interpreter, reports
+the slowest imports and fails when the import budget is exceeded or a heavy
+library is loaded at startup
+
+Usage:
+    python benchmarks/cold_start.py --budget-ms 800 --lazy
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_BUDGET_MS = 1500
+
+# Libraries no request path needs at startup
+HEAVY_MODULES = ('numpy', 'pandas', 'PIL', 'qrcode', 'plotly', 'folium', 'matplotlib')
+
+def startup_statement(lazy):
+    return (
+        'from factory import create_app; '
+        f"create_app('testing', lazy_blueprints={bool(lazy)})"
+    )
+
+def parse_importtime(stderr):
+    """Return [(self_us, cumulative_us, depth, module)] from -X importtime output"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((int(self_us), int(cumulative_us), depth, name.strip()))
+    return rows
+
+def measure(lazy=False, python=sys.executable):
+    """Create the app in a fresh interpreter and summarise its imports"""
+    env = dict(os.environ, PYTHONPATH=ROOT, PYTHONDONTWRITEBYTECODE='')
+    started = time.perf_counter()
+    process = subprocess.run(
+        [python, '-X', 'importtime', '-c', startup_statement(lazy)],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+    if process.returncode != 0:
+        raise RuntimeError(f'App creation failed:\n{process.stderr[-2000:]}')
+
+    rows = parse_importtime(process.stderr)
+    loaded = {row[3].split('.')[0] for row in rows}
+    return {
+        'import_ms': sum(row[0] for row in rows) / 1000,
+        'wall_ms': wall_ms,
+        'modules': len(rows),
+        'top_level': sorted((row for row in rows if row[2] == 0), key=lambda row: -row[1]),
+        'heavy': sorted(name for name in HEAVY_MODULES if name in loaded)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure RMGFraud startup imports')
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS,
+                        help='Fail when total import time exceeds this many milliseconds')
+    parser.add_argument('--lazy', action='store_true', help='Measure with lazy blueprint registration')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs to take the fastest of')
+    parser.add_argument('--top', type=int, default=15, help='Slowest top-level imports to list')
+    args = parser.parse_args()
+
+    results = [measure(lazy=args.lazy) for _ in range(max(args.repeat, 1))]
+    best = min(results, key=lambda result: result['import_ms'])
+
+    print(f"Imports:       {best['modules']} modules, {best['import_ms']:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    print(f"Process wall:  {best['wall_ms']:.1f} ms")
+    print('Slowest top-level imports (cumulative ms):')
+    for self_us, cumulative_us, depth, name in best['top_level'][:args.top]:
+        print(f'  {cumulative_us / 1000:8.1f}  {name}')
+
+    failed = False
+    if best['heavy']:
+        print(f"FAIL: heavy modules imported at startup: {', '.join(best['heavy'])}")
+        failed = True
+    if best['import_ms'] > args.budget_ms:
+        print(f"FAIL: import time {best['import_ms']:.1f} ms is over the {args.budget_ms:.0f} ms budget")
+        failed = True
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
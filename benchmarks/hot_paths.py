@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+RMGFraud Hot Path Microbenchmarks
+pytest-benchmark suite for the units the request paths spend their time in:
+entity search, bleach sanitization, heatmap scores, the country statistics
+recompute, audit log inserts and password hashing, against a seed_data.py
+corpus in an in-memory database
+
+Runs are saved under benchmarks/.baselines (per machine, not committed). A
+compare run fails when any benchmark's fastest round is more than
+--threshold percent slower than in the latest saved baseline; the minimum
+is the figure least disturbed by other load on the machine
+
+Usage:
+    python benchmarks/hot_paths.py --save-baseline    # on main, before changing anything
+    python benchmarks/hot_paths.py --threshold 10     # on the branch, before deploying
+"""
+
+import argparse
+import os
+import sys
+
+import pytest
+from pytest_benchmark.session import PerformanceRegression
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_DIR = os.path.join(ROOT, 'benchmarks', '.baselines')
+sys.path.insert(0, ROOT)
+
+DEFAULT_THRESHOLD_PCT = float(os.environ.get('BENCHMARK_REGRESSION_PCT') or 10)
+
+# 200 users, 2k entities, 20k reports, 100k audit rows
+SCALE = 0.01
+
+# A long report description with the markup users paste from documents
+DESCRIPTION = (
+    '<p>Inspection of the <b>dyeing unit</b> found <script>alert(1)</script> unpaid overtime, '
+    '<a href="https://example.com/evidence" onclick="steal()">photos</a> and forged '
+    '<i>compliance certificates</i> &amp; payroll sheets.</p>\n'
+) * 150
+
+@pytest.fixture(scope='module')
+def app():
+    import seed_data
+    from extensions import db
+    from factory import create_app
+
+    app = create_app('testing', config_overrides={'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+    with app.app_context():
+        seed_data.seed(argparse.Namespace(scale=SCALE, seed=45, drop=False, batch_size=5000))
+    app.test_client().get('/country/update-statistics')
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+
+def test_search_query_build(benchmark, app):
+    """Filters for a typed term plus country, compiled to SQL"""
+    from models import Entity
+    from routes.database import filter_entities
+
+    with app.app_context():
+        benchmark(lambda: str(filter_entities(Entity.query, 'Knit', 'manufacturer', 'High', 'BD').limit(50)))
+
+def test_search_query_execute(benchmark, app):
+    """The /database/search query for a typed term"""
+    from models import Entity
+    from routes.database import filter_entities
+
+    with app.app_context():
+        benchmark(lambda: filter_entities(Entity.query, 'Knit', '', '', 'BD').limit(50).all())
+
+def test_sanitize_large_description(benchmark):
+    """bleach.clean on a ~40 KB description with markup"""
+    import bleach
+    benchmark(bleach.clean, DESCRIPTION)
+
+def test_heatmap_scores(benchmark, app):
+    """Risk scores and coordinates for every country profile"""
+    from routes import country
+
+    with app.test_request_context('/country/api/heatmap-data'):
+        benchmark(country.api_heatmap_data)
+
+def test_country_statistics_recompute(benchmark, app):
+    """Entity and report aggregates for every country, written back"""
+    from routes import country
+
+    with app.test_request_context('/country/update-statistics'):
+        benchmark(country.update_statistics)
+
+def test_audit_log_insert(benchmark, app):
+    """One audit row and its activity summary update, committed"""
+    from datetime import datetime
+    from extensions import db
+    from models import AuditLog
+
+    def insert():
+        db.session.add(AuditLog(
+            user_id=2,
+            action='view_entity',
+            resource_type='entity',
+            resource_id=1,
+            ip_address='127.0.0.1',
+            user_agent='hot-paths',
+            timestamp=datetime.utcnow()
+        ))
+        db.session.commit()
+
+    with app.app_context():
+        benchmark(insert)
+
+def test_password_hash(benchmark, app):
+    """One hash at the production cost (PASSWORD_HASH_ITERATIONS)"""
+    from config import Config
+    from services import passwords
+
+    with app.app_context():
+        app.config['PASSWORD_HASH_ITERATIONS'] = Config.PASSWORD_HASH_ITERATIONS
+        try:
+            benchmark.pedantic(passwords.hash_password, args=('correct horse battery staple',), rounds=5)
+        finally:
+            app.config['PASSWORD_HASH_ITERATIONS'] = 1000
+
+def main():
+    parser = argparse.ArgumentParser(description='Hot path microbenchmarks with regression thresholds')
+    parser.add_argument('--save-baseline', action='store_true', help='save this run as the new baseline')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD_PCT,
+                        help='fail when a benchmark is this many percent slower than the baseline')
+    parser.add_argument('pytest_args', nargs='*', help='extra pytest arguments, e.g. -k search')
+    args = parser.parse_args()
+
+    pytest_args = [
+        os.path.abspath(__file__), '-q', '-p', 'no:cacheprovider',
+        f'--benchmark-storage=file://{BASELINE_DIR}',
+        '--benchmark-columns=min,median,mean,stddev,rounds',
+        '--benchmark-sort=name',
+        '--benchmark-warmup=on',
+        '--benchmark-min-rounds=20'
+    ]
+    if args.save_baseline:
+        pytest_args.append('--benchmark-save=baseline')
+    elif os.path.isdir(BASELINE_DIR) and any(files for _, _, files in os.walk(BASELINE_DIR)):
+        pytest_args += ['--benchmark-compare', f'--benchmark-compare-fail=min:{args.threshold:g}%']
+    else:
+        print("No baseline yet - run with --save-baseline first")
+        return 1
+
+    try:
+        return pytest.main(pytest_args + args.pytest_args)
+    except PerformanceRegression:
+        # The regressed benchmarks are listed above
+        print("❌ Hot path regression over the baseline")
+        return 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+RMGFraud Load Test
+Replays a traffic mix against a database filled by seed_data.py and reports
+throughput and p50/p95/p99 latency per route. Each virtual user logs in as
+a seeded moderator and loops over weighted scenarios:
+
+    search     typeahead: one /database/search request per keystroke
+    entity     entity page, often followed by more reports or the network
+    submit     report form, then a submission naming a seeded entity
+    moderate   moderation queue, then a review of a pending report
+    browse     homepage, country overview and dashboard
+
+With --database-url (repeatable) the script starts a local server per
+database, so SQLite and PostgreSQL runs are directly comparable; with --url
+it drives a server that is already running. Local servers run the
+production config over plain HTTP, with secure cookies and CSRF checks off
+so scripted sessions can log in and post forms
+
+Usage:
+    python benchmarks/seed_data.py --database-url sqlite:////tmp/rmgfraud-load.db --scale 0.01
+    python benchmarks/load_test.py --scale 0.01 --users 16 --duration 60 \\
+        --database-url sqlite:////tmp/rmgfraud-load.db \\
+        --database-url postgresql://localhost/rmgfraud_load
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import threading
+import time
+
+import requests
+
+import seed_data
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+CSRF_RE = re.compile(r'name="csrf_token"[^>]*value="([^"]+)"')
+
+DEFAULT_MIX = 'search=40,entity=30,browse=12,moderate=10,submit=8'
+
+# Words users start typing into the search box
+SEARCH_TERMS = seed_data.NAME_PREFIXES + seed_data.NAME_MIDDLES
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of floats"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1)
+    return ordered[max(index, 0)]
+
+def create_server_app():
+    """App for local load-test servers (gunicorn 'load_test:create_server_app()')"""
+    sys.path.insert(0, ROOT)
+    from factory import create_app
+    app = create_app('production')
+    app.config['SESSION_COOKIE_SECURE'] = False
+    app.config['WTF_CSRF_ENABLED'] = False
+    return app
+
+class Results:
+    """Latencies and failures per route, shared by all virtual users"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.errors = {}
+
+    def add(self, route, elapsed, ok):
+        with self.lock:
+            self.latencies.setdefault(route, []).append(elapsed * 1000)
+            if not ok:
+                self.errors[route] = self.errors.get(route, 0) + 1
+
+    def summary(self, duration):
+        routes = {}
+        for route, samples in sorted(self.latencies.items()):
+            routes[route] = {
+                'requests': len(samples),
+                'rps': round(len(samples) / duration, 2),
+                'p50_ms': round(percentile(samples, 50), 2),
+                'p95_ms': round(percentile(samples, 95), 2),
+                'p99_ms': round(percentile(samples, 99), 2),
+                'errors': self.errors.get(route, 0)
+            }
+        total = sum(route['requests'] for route in routes.values())
+        return {
+            'requests': total,
+            'rps': round(total / duration, 2),
+            'errors': sum(self.errors.values()),
+            'routes': routes
+        }
+
+class VirtualUser:
+    """One logged-in browser session running scenarios"""
+
+    def __init__(self, base_url, username, sizes, rng, results):
+        self.base_url = base_url
+        self.sizes = sizes
+        self.rng = rng
+        self.results = results
+        self.session = requests.Session()
+        self.csrf_token = None
+        self.login(username)
+
+    def request(self, route, method, path, ok_statuses=(200,), **kwargs):
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, f'{self.base_url}{path}', allow_redirects=False,
+                                            timeout=30, **kwargs)
+        except requests.RequestException:
+            self.results.add(route, time.perf_counter() - started, False)
+            return None
+        self.results.add(route, time.perf_counter() - started, response.status_code in ok_statuses)
+        match = CSRF_RE.search(response.text) if 'html' in response.headers.get('Content-Type', '') else None
+        if match:
+            self.csrf_token = match.group(1)
+        return response
+
+    def form(self, data):
+        if self.csrf_token:
+            data['csrf_token'] = self.csrf_token
+        return data
+
+    def login(self, username):
+        self.session.get(f'{self.base_url}/auth/login')
+        response = self.session.post(f'{self.base_url}/auth/login', allow_redirects=False, data=self.form({
+            'username': username,
+            'password': seed_data.LOAD_TEST_PASSWORD
+        }))
+        if response.status_code != 302 or '/dashboard' not in response.headers.get('Location', ''):
+            raise RuntimeError(f'could not log in as {username} ({response.status_code})')
+
+    def entity_id(self):
+        return seed_data.hot_entity_id(self.rng, self.sizes['entities'])
+
+    def search(self):
+        term = self.rng.choice(SEARCH_TERMS)
+        for length in range(2, len(term) + 1):
+            self.request('GET /database/search', 'GET', '/database/search', params={'q': term[:length]},
+                         headers={'Content-Type': 'application/json'})
+            time.sleep(self.rng.uniform(0.05, 0.15))
+
+    def entity(self):
+        entity_id = self.entity_id()
+        self.request('GET /database/entity/<id>', 'GET', f'/database/entity/{entity_id}')
+        roll = self.rng.random()
+        if roll < 0.3:
+            self.request('GET /database/entity/<id>/reports', 'GET', f'/database/entity/{entity_id}/reports',
+                         params={'page': 2})
+        elif roll < 0.4:
+            self.request('GET /database/entity/<id>/network', 'GET', f'/database/entity/{entity_id}/network')
+
+    def submit(self):
+        self.request('GET /reporting/submit', 'GET', '/reporting/submit')
+        entity_type = seed_data.weighted(self.rng, seed_data.ENTITY_TYPES)
+        fraud_type = seed_data.weighted(self.rng, seed_data.FRAUD_TYPES)
+        self.request('POST /reporting/submit', 'POST', '/reporting/submit', ok_statuses=(302,), data=self.form({
+            'title': f'{fraud_type} observed during audit',
+            'fraud_type': fraud_type,
+            'risk_level': seed_data.weighted(self.rng, seed_data.REPORT_RISK_LEVELS),
+            'summary': 'Load test submission',
+            'entity_name': seed_data.entity_name(self.entity_id(), entity_type),
+            'entity_type': entity_type,
+            'country_code': seed_data.weighted(self.rng, seed_data.COUNTRY_WEIGHTS),
+            'sources': 'https://example.com/evidence',
+            'is_anonymous': 'on'
+        }))
+
+    def moderate(self):
+        self.request('GET /reporting/moderate', 'GET', '/reporting/moderate', params={'status': 'pending'})
+        report_id = self.rng.randint(1, self.sizes['reports'])
+        self.request('POST /reporting/review/<id>', 'POST', f'/reporting/review/{report_id}',
+                     ok_statuses=(302,), data=self.form({
+                         'review_status': self.rng.choice(['approved', 'rejected', 'needs_more_info']),
+                         'review_notes': 'Load test review'
+                     }))
+
+    def browse(self):
+        self.request('GET /', 'GET', '/')
+        self.request('GET /country/', 'GET', '/country/')
+        self.request('GET /dashboard/', 'GET', '/dashboard/')
+
+def parse_mix(text):
+    mix = []
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        if not hasattr(VirtualUser, name.strip()):
+            raise SystemExit(f'unknown scenario {name!r}')
+        mix.append((name.strip(), float(weight or 1)))
+    return mix
+
+def run_users(args, base_url, sizes):
+    """args.users virtual users for args.duration seconds, after args.warmup seconds"""
+    mix = parse_mix(args.mix)
+    moderators = seed_data.moderator_count(sizes['users'])
+    results = Results()
+    warmup = Results()
+    stop = threading.Event()
+    measuring = threading.Event()
+    errors = []
+
+    def worker(index):
+        rng = random.Random(args.seed * 1000 + index)
+        try:
+            user = VirtualUser(base_url, f'moderator{index % moderators + 1}', sizes, rng, warmup)
+        except (RuntimeError, requests.RequestException) as e:
+            errors.append(str(e))
+            return
+        while not stop.is_set():
+            user.results = results if measuring.is_set() else warmup
+            getattr(user, seed_data.weighted(rng, mix))()
+            time.sleep(rng.uniform(0, args.think_time))
+
+    threads = [threading.Thread(target=worker, args=(index,), daemon=True) for index in range(args.users)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.warmup)
+    measuring.set()
+    time.sleep(args.duration)
+    stop.set()
+    for thread in threads:
+        thread.join(timeout=30)
+
+    if errors:
+        print(f"❌ {len(errors)} virtual users could not start: {errors[0]}")
+    return results.summary(args.duration)
+
+def start_server(args, database_url, port):
+    """A local server on database_url; returns the process once it answers"""
+    env = dict(
+        os.environ,
+        PYTHONPATH=os.pathsep.join([ROOT, HERE]),
+        FLASK_CONFIG='production',
+        DATABASE_URL=database_url,
+        RATELIMIT_ENABLED='false'
+    )
+    if args.server == 'gunicorn':
+        command = [sys.executable, '-m', 'gunicorn', '-w', str(args.workers), '--threads', str(args.threads),
+                   '-b', f'127.0.0.1:{port}', '--log-level', 'warning', 'load_test:create_server_app()']
+    else:
+        command = [sys.executable, os.path.abspath(__file__), '--serve', str(port)]
+    process = subprocess.Popen(command, cwd=ROOT, env=env)
+
+    base_url = f'http://127.0.0.1:{port}'
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'server for {database_url} exited with {process.returncode}')
+        try:
+            if requests.get(f'{base_url}/reporting/api/fraud-types', timeout=2).status_code == 200:
+                return process, base_url
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError(f'server for {database_url} did not start')
+
+def serve(port):
+    """Development server used by --server werkzeug"""
+    from werkzeug.serving import run_simple
+    run_simple('127.0.0.1', port, create_server_app(), threaded=True)
+
+def report(label, summary):
+    print(f"\n{label}: {summary['requests']} requests, {summary['rps']} req/s, {summary['errors']} errors")
+    print(f"  {'route':<36} {'reqs':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for route, stats in summary['routes'].items():
+        print(f"  {route:<36} {stats['requests']:>7} {stats['rps']:>8.1f} {stats['p50_ms']:>8.1f}"
+              f" {stats['p95_ms']:>8.1f} {stats['p99_ms']:>8.1f} {stats['errors']:>7}")
+
+def main():
+    if len(sys.argv) == 3 and sys.argv[1] == '--serve':
+        serve(int(sys.argv[2]))
+        return 0
+
+    parser = argparse.ArgumentParser(description='Replay a traffic mix and report latency per route')
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--url', help='a running server')
+    target.add_argument('--database-url', action='append', help='start a local server per database')
+    parser.add_argument('--scale', type=float, default=1.0, help='the --scale the data was seeded with')
+    parser.add_argument('--users', type=int, default=16, help='concurrent virtual users')
+    parser.add_argument('--duration', type=float, default=60.0)
+    parser.add_argument('--warmup', type=float, default=5.0)
+    parser.add_argument('--think-time', type=float, default=0.2, help='max pause between scenarios (s)')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='scenario weights')
+    parser.add_argument('--seed', type=int, default=45)
+    parser.add_argument('--server', choices=['gunicorn', 'werkzeug'], default='gunicorn')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+
+    sizes = seed_data.sizes_for(args.scale)
+    print("RMGFraud Load Test")
+    print("=" * 40)
+    print(f"{args.users} users, mix {args.mix}, {args.duration:.0f}s after {args.warmup:.0f}s warmup")
+
+    summaries = {}
+    if args.url:
+        summaries[args.url] = run_users(args, args.url.rstrip('/'), sizes)
+        report(args.url, summaries[args.url])
+    else:
+        for database_url in args.database_url:
+            process, base_url = start_server(args, database_url, args.port)
+            try:
+                summaries[database_url] = run_users(args, base_url, sizes)
+            finally:
+                process.terminate()
+                process.wait()
+            report(database_url, summaries[database_url])
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(summaries, f, indent=2)
+
+    if any(summary['requests'] == 0 for summary in summaries.values()):
+        print("❌ No requests completed")
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
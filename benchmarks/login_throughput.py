@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+RMGFraud Login Throughput Benchmark
+Measures logins/sec against a running server and the p99 latency of an
+unrelated route, first without and then under a login burst
+
+Usage:
+    python benchmarks/login_throughput.py --url http://localhost:5000 \\
+        --username bench --password bench-password --login-threads 8
+"""
+
+import argparse
+import re
+import statistics
+import sys
+import threading
+import time
+
+import requests
+
+CSRF_RE = re.compile(r'name="csrf_token"[^>]*value="([^"]+)"')
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of floats"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1)
+    return ordered[max(index, 0)]
+
+def login_worker(args, stop, results):
+    """Log in and out repeatedly, counting successful logins"""
+    while not stop.is_set():
+        session = requests.Session()
+        page = session.get(f'{args.url}/auth/login')
+        match = CSRF_RE.search(page.text)
+        data = {'username': args.username, 'password': args.password}
+        if match:
+            data['csrf_token'] = match.group(1)
+
+        started = time.perf_counter()
+        response = session.post(f'{args.url}/auth/login', data=data, allow_redirects=False)
+        elapsed = time.perf_counter() - started
+
+        if response.status_code == 302 and '/dashboard' in response.headers.get('Location', ''):
+            results['logins'].append(elapsed)
+        else:
+            results['login_failures'] += 1
+
+def probe_worker(args, stop, results):
+    """Hit an unrelated route and record its latency"""
+    session = requests.Session()
+    while not stop.is_set():
+        started = time.perf_counter()
+        session.get(f'{args.url}{args.probe_path}')
+        results['probe'].append(time.perf_counter() - started)
+
+def run_phase(args, login_threads):
+    """Run probe threads (and optionally login threads) for args.duration seconds"""
+    results = {'logins': [], 'login_failures': 0, 'probe': []}
+    stop = threading.Event()
+    threads = [threading.Thread(target=probe_worker, args=(args, stop, results))
+               for _ in range(args.probe_threads)]
+    threads += [threading.Thread(target=login_worker, args=(args, stop, results))
+                for _ in range(login_threads)]
+
+    for thread in threads:
+        thread.start()
+    time.sleep(args.duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    return results
+
+def report(label, results, duration):
+    probe_ms = [sample * 1000 for sample in results['probe']]
+    print(f"{label}:")
+    print(f"  logins/sec:      {len(results['logins']) / duration:.1f}"
+          f" ({results['login_failures']} failed)")
+    if results['logins']:
+        print(f"  login p50:       {statistics.median(results['logins']) * 1000:.1f} ms")
+    print(f"  probe requests:  {len(probe_ms)}")
+    print(f"  probe p50 / p99: {percentile(probe_ms, 50):.1f} / {percentile(probe_ms, 99):.1f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description='Login throughput vs. unrelated route latency')
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--username', required=True)
+    parser.add_argument('--password', required=True)
+    parser.add_argument('--login-threads', type=int, default=8)
+    parser.add_argument('--probe-threads', type=int, default=2)
+    parser.add_argument('--probe-path', default='/reporting/api/fraud-types')
+    parser.add_argument('--duration', type=float, default=15.0)
+    args = parser.parse_args()
+
+    print("RMGFraud Login Throughput Benchmark")
+    print("=" * 40)
+
+    baseline = run_phase(args, login_threads=0)
+    report('Baseline (no logins)', baseline, args.duration)
+
+    burst = run_phase(args, login_threads=args.login_threads)
+    report(f'Login burst ({args.login_threads} threads)', burst, args.duration)
+
+    if not burst['logins']:
+        print("❌ No successful logins - check the credentials")
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
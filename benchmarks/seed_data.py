@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+RMGFraud Synthetic Data Generator
+Fills an empty database with a deterministic corpus shaped like production:
+entities spread over the RMG sourcing countries, reports skewed towards a
+few heavily reported entities with realistic risk, fraud type and status
+mixes, reviews for every moderated report and a long tail of audit rows.
+The same --seed and --scale always produce the same rows (timestamps end
+at the time of the run). Summary tables and country statistics are rebuilt
+at the end, so the app starts warm
+
+Seeded accounts (password LOAD_TEST_PASSWORD, used by load_test.py):
+    admin, moderator1..moderatorN, user1..userN
+
+Usage:
+    python benchmarks/seed_data.py --database-url sqlite:////tmp/rmgfraud-load.db --scale 0.01
+    python benchmarks/seed_data.py --database-url postgresql://localhost/rmgfraud_load
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Row counts at --scale 1.0
+FULL_SIZES = {
+    'users': 20000,
+    'entities': 200000,
+    'reports': 2000000,
+    'audit_rows': 10000000
+}
+
+MODERATORS = 50
+LOAD_TEST_PASSWORD = 'load-test-password'
+
+# Reports and audit rows are spread over this many days before the run
+HISTORY_DAYS = 3 * 365
+
+COUNTRIES = [
+    ('BD', 'Bangladesh', 45), ('IN', 'India', 14), ('CN', 'China', 10), ('VN', 'Vietnam', 8),
+    ('PK', 'Pakistan', 7), ('LK', 'Sri Lanka', 5), ('MM', 'Myanmar', 4), ('ID', 'Indonesia', 3),
+    ('TH', 'Thailand', 2), ('MY', 'Malaysia', 2)
+]
+COUNTRY_WEIGHTS = [(code, weight) for code, _, weight in COUNTRIES]
+ENTITY_TYPES = [('manufacturer', 40), ('supplier', 30), ('company', 20), ('individual', 10)]
+ENTITY_RISK_LEVELS = [('Low', 55), ('Medium', 28), ('High', 12), ('Critical', 5)]
+REPORT_RISK_LEVELS = [('Low', 30), ('Medium', 40), ('High', 22), ('Critical', 8)]
+REPORT_STATUSES = [('pending', 35), ('under_review', 15), ('verified', 35), ('rejected', 15)]
+FRAUD_TYPES = [
+    ('Labor Violations', 22), ('Financial Fraud', 16), ('Supply Chain Fraud', 14), ('Safety Violations', 11),
+    ('Document Forgery', 9), ('Quality Control Fraud', 7), ('Bribery and Corruption', 6), ('Tax Evasion', 5),
+    ('Environmental Violations', 4), ('Money Laundering', 3), ('Intellectual Property Theft', 2), ('Other', 1)
+]
+AUDIT_ACTIONS = [
+    ('view_entity', 70), ('login', 14), ('submit_fraud_report', 6), ('review_fraud_report', 4),
+    ('logout', 3), ('add_entity', 1), ('edit_entity', 1), ('verify_entity', 1)
+]
+AUDIT_RESOURCES = {
+    'view_entity': 'entity', 'add_entity': 'entity', 'edit_entity': 'entity', 'verify_entity': 'entity',
+    'submit_fraud_report': 'fraud_report', 'review_fraud_report': 'fraud_report'
+}
+
+NAME_PREFIXES = [
+    'Rahman', 'Apex', 'Delta', 'Karim', 'Sonar', 'Meghna', 'Padma', 'Jamuna', 'Crescent', 'Hossain',
+    'Square', 'Ananta', 'Epyllion', 'Fakir', 'Ha-Meem', 'Islam', 'Kazi', 'Mohammadi', 'Noman', 'Opex',
+    'Pacific', 'Rupali', 'Shanta', 'Tamishna', 'Urmi', 'Viyellatex', 'Zaber', 'Golden', 'Lotus', 'Tiger',
+    'Lanka', 'Saigon', 'Mekong', 'Tirupur', 'Ludhiana', 'Karachi', 'Faisal', 'Ningbo', 'Shenzhen', 'Yangon'
+]
+NAME_MIDDLES = [
+    'Knit', 'Denim', 'Textile', 'Apparels', 'Fashions', 'Garments', 'Sweaters', 'Composite', 'Dyeing',
+    'Spinning', 'Washing', 'Knitwear', 'Accessories', 'Trims', 'Packaging', 'Fabrics', 'Designs', 'Exports',
+    'Sourcing', 'Logistics', 'Printing', 'Embroidery', 'Yarn', 'Leather', 'Outerwear'
+]
+NAME_SUFFIXES = ['Ltd', 'Limited', 'Pvt Ltd', 'Co', 'Corporation', 'Industries Ltd', 'Group', 'Mills Ltd']
+PERSON_FIRST = ['Abdul', 'Nasrin', 'Rafiq', 'Shirin', 'Kamal', 'Farhana', 'Jahid', 'Rumana', 'Anil', 'Mei']
+PERSON_LAST = ['Hossain', 'Akter', 'Rahman', 'Begum', 'Uddin', 'Khatun', 'Chowdhury', 'Sarkar', 'Kumar', 'Lin']
+USER_AGENTS = [
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/120.0 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 14_2) AppleWebKit/605.1.15 Version/17.2 Safari/605.1.15',
+    'Mozilla/5.0 (Linux; Android 14; SM-A546E) AppleWebKit/537.36 Chrome/120.0 Mobile Safari/537.36',
+    'Mozilla/5.0 (iPhone; CPU iPhone OS 17_2 like Mac OS X) AppleWebKit/605.1.15 Mobile/15E148'
+]
+
+def sizes_for(scale):
+    """Row counts for a scale factor (at least one of each)"""
+    return {name: max(int(count * scale), 1) for name, count in FULL_SIZES.items()}
+
+def moderator_count(users):
+    return max(min(MODERATORS, users // 10), 1)
+
+def hot_entity_id(rng, entities):
+    """Entity id skewed towards a small set of heavily reported entities"""
+    return int(entities * rng.random() ** 3) + 1
+
+def weighted(rng, choices):
+    values, weights = zip(*choices)
+    return rng.choices(values, weights=weights, k=1)[0]
+
+def entity_name(index, entity_type):
+    """Deterministic unique name; individuals get person names"""
+    if entity_type == 'individual':
+        first = PERSON_FIRST[index % len(PERSON_FIRST)]
+        last = PERSON_LAST[(index // len(PERSON_FIRST)) % len(PERSON_LAST)]
+        return f'{first} {last} {index}'
+    prefix = NAME_PREFIXES[index % len(NAME_PREFIXES)]
+    middle = NAME_MIDDLES[(index // len(NAME_PREFIXES)) % len(NAME_MIDDLES)]
+    suffix = NAME_SUFFIXES[(index // 7) % len(NAME_SUFFIXES)]
+    unit = index // (len(NAME_PREFIXES) * len(NAME_MIDDLES))
+    return f'{prefix} {middle} Unit-{unit} {suffix}' if unit else f'{prefix} {middle} {suffix}'
+
+def user_rows(count, password_hash, now):
+    moderators = moderator_count(count)
+    for user_id in range(1, count + 1):
+        if user_id == 1:
+            username, role = 'admin', 'admin'
+        elif user_id <= moderators + 1:
+            username, role = f'moderator{user_id - 1}', 'moderator'
+        else:
+            username, role = f'user{user_id - moderators - 1}', 'user'
+        yield {
+            'id': user_id,
+            'username': username,
+            'email': f'{username}@load.rmgfraud.test',
+            'password_hash': password_hash,
+            'role': role,
+            'is_verified': role != 'user' or user_id % 3 != 0,
+            'verification_id': f'LOAD-{user_id:07d}',
+            'verification_type': ('bgmea', 'rmg_supplier', 'banking')[user_id % 3],
+            'mfa_enabled': False,
+            'created_at': now - timedelta(days=HISTORY_DAYS * (count - user_id) / count)
+        }
+
+def entity_rows(rng, count, now):
+    from services.entity_keys import canonical_entity_key
+
+    for entity_id in range(1, count + 1):
+        entity_type = weighted(rng, ENTITY_TYPES)
+        name = entity_name(entity_id, entity_type)
+        created_at = now - timedelta(days=rng.uniform(0, HISTORY_DAYS))
+        yield {
+            'id': entity_id,
+            'name': name,
+            'canonical_key': canonical_entity_key(name),
+            'entity_type': entity_type,
+            'country_code': weighted(rng, COUNTRY_WEIGHTS),
+            'registration_number': f'REG-{rng.randrange(10 ** 8):08d}',
+            'risk_level': weighted(rng, ENTITY_RISK_LEVELS),
+            'risk_score': round(rng.uniform(0, 100), 2),
+            'is_verified': rng.random() < 0.3,
+            'created_at': created_at,
+            'updated_at': created_at
+        }
+
+def report_rows(rng, count, entities, users, now):
+    # Named reporters are regular users (ids after admin and moderators)
+    first_user = min(moderator_count(users) + 2, users)
+    for report_id in range(1, count + 1):
+        # Report volume grows over time: later ids are more recent
+        age_days = HISTORY_DAYS * (1 - (report_id / count) ** 0.5) + rng.uniform(0, 2)
+        created_at = now - timedelta(days=age_days)
+        risk_level = weighted(rng, REPORT_RISK_LEVELS)
+        fraud_type = weighted(rng, FRAUD_TYPES)
+        is_anonymous = rng.random() < 0.6
+        yield {
+            'id': report_id,
+            'title': f'{fraud_type} reported at site {rng.randrange(1, 500)}',
+            'fraud_type': fraud_type,
+            'risk_level': risk_level,
+            'summary': f'Synthetic {fraud_type.lower()} report for load testing.',
+            'sources': '[]',
+            'is_anonymous': is_anonymous,
+            'status': weighted(rng, REPORT_STATUSES),
+            'priority': 'high' if risk_level in ['High', 'Critical'] else 'medium',
+            'created_at': created_at,
+            'updated_at': created_at,
+            'entity_id': hot_entity_id(rng, entities) if rng.random() < 0.9 else None,
+            'reporter_id': None if is_anonymous else rng.randint(first_user, users)
+        }
+
+def review_rows(rng, reports, users, now):
+    """One review per moderated report, from the report ids and statuses already inserted"""
+    moderators = moderator_count(users)
+    review_status = {'verified': 'approved', 'rejected': 'rejected', 'under_review': 'needs_more_info'}
+    for report_id, status, created_at in reports:
+        if status in review_status:
+            yield {
+                'fraud_report_id': report_id,
+                'reviewer_id': rng.randint(min(2, users), min(moderators + 1, users)),
+                'review_status': review_status[status],
+                'review_notes': 'Synthetic review',
+                'created_at': min(created_at + timedelta(hours=rng.uniform(1, 96)), now)
+            }
+
+def audit_rows(rng, count, entities, reports, users, now):
+    for audit_id in range(1, count + 1):
+        action = weighted(rng, AUDIT_ACTIONS)
+        resource_type = AUDIT_RESOURCES.get(action)
+        if resource_type == 'entity':
+            resource_id = hot_entity_id(rng, entities)
+        elif resource_type == 'fraud_report':
+            resource_id = rng.randrange(1, reports + 1)
+        else:
+            resource_id = None
+        yield {
+            'id': audit_id,
+            'user_id': rng.randrange(1, users + 1) if rng.random() < 0.8 else None,
+            'action': action,
+            'resource_type': resource_type,
+            'resource_id': resource_id,
+            'ip_address': f'103.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}',
+            'user_agent': rng.choice(USER_AGENTS),
+            'timestamp': now - timedelta(days=HISTORY_DAYS * (1 - audit_id / count))
+        }
+
+def insert_batches(db, model, rows, batch_size, label):
+    """Bulk-insert rows in batches, one transaction each, printing progress"""
+    started = time.perf_counter()
+    batch = []
+    total = 0
+
+    def flush():
+        nonlocal total
+        # Core inserts skip the ORM's per-row bookkeeping and mapper events
+        db.session.execute(model.__table__.insert(), batch)
+        db.session.commit()
+        total += len(batch)
+        batch.clear()
+        print(f'\r  {label}: {total:,}', end='', flush=True)
+
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+
+    elapsed = time.perf_counter() - started
+    print(f'\r  {label}: {total:,} in {elapsed:.1f}s ({total / max(elapsed, 1e-9):,.0f} rows/s)')
+    return total
+
+def reset_sequences(db):
+    """Explicit ids leave PostgreSQL sequences behind; move them past the data"""
+    if db.engine.dialect.name != 'postgresql':
+        return
+    for table in ('users', 'entities', 'fraud_reports', 'report_reviews', 'audit_logs', 'country_profiles'):
+        db.session.execute(db.text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE(MAX(id), 1)) FROM {table}"
+        ))
+    db.session.commit()
+
+def build_app():
+    sys.path.insert(0, ROOT)
+    from factory import create_app
+    return create_app('production')
+
+def seed(args):
+    from extensions import db
+    from models import AuditLog, CountryProfile, Entity, FraudReport, ReportReview, User
+    from services import activity_summary, passwords, report_counts
+
+    sizes = sizes_for(args.scale)
+    rng = random.Random(args.seed)
+    now = datetime.utcnow().replace(microsecond=0)
+
+    if args.drop:
+        db.drop_all()
+    db.create_all()
+    if db.session.query(User.id).first() is not None:
+        print('❌ Database already has data - pass --drop to start over')
+        return 1
+
+    print(f"Seeding {', '.join(f'{count:,} {name}' for name, count in sizes.items())}")
+    insert_batches(db, User, user_rows(sizes['users'], passwords.hash_password(LOAD_TEST_PASSWORD), now),
+                   args.batch_size, 'users')
+    insert_batches(db, CountryProfile, ({
+        'country_code': code, 'country_name': name
+    } for code, name, _ in COUNTRIES), args.batch_size, 'countries')
+    insert_batches(db, Entity, entity_rows(rng, sizes['entities'], now), args.batch_size, 'entities')
+
+    # Reviews need each report's status and date; keep only those, not the rows
+    moderated = []
+
+    def reports_with_statuses():
+        for row in report_rows(rng, sizes['reports'], sizes['entities'], sizes['users'], now):
+            if row['status'] != 'pending':
+                moderated.append((row['id'], row['status'], row['created_at']))
+            yield row
+
+    insert_batches(db, FraudReport, reports_with_statuses(), args.batch_size, 'reports')
+    insert_batches(db, ReportReview, review_rows(rng, moderated, sizes['users'], now), args.batch_size, 'reviews')
+    del moderated[:]
+    insert_batches(db, AuditLog, audit_rows(rng, sizes['audit_rows'], sizes['entities'], sizes['reports'],
+                                            sizes['users'], now), args.batch_size, 'audit rows')
+    reset_sequences(db)
+
+    print('Rebuilding summaries')
+    started = time.perf_counter()
+    report_counts.rebuild_counts()
+    for user_id in range(1, sizes['users'] + 1):
+        activity_summary.rebuild_summary(user_id)
+    print(f'  entity counts and {sizes["users"]:,} user summaries in {time.perf_counter() - started:.1f}s')
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description='Deterministic synthetic corpus for load testing')
+    parser.add_argument('--database-url', required=True)
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help='fraction of the full corpus (200k entities, 2M reports, 10M audit rows)')
+    parser.add_argument('--seed', type=int, default=45)
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--drop', action='store_true', help='drop existing tables first')
+    args = parser.parse_args()
+
+    # Config reads these at import; hash the shared password in-process
+    os.environ['DATABASE_URL'] = args.database_url
+    os.environ.setdefault('PASSWORD_HASH_WORKERS', '0')
+    os.environ.setdefault('RATELIMIT_ENABLED', 'false')
+
+    print("RMGFraud Synthetic Data Generator")
+    print("=" * 40)
+
+    app = build_app()
+    with app.app_context():
+        status = seed(args)
+    if status:
+        return status
+
+    # Country figures come from the app's own refresh
+    response = app.test_client().get('/country/update-statistics')
+    print(f'Country statistics refreshed ({response.status_code})')
+    print('✅ Done')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
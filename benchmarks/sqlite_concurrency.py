@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+RMGFraud SQLite Concurrency Benchmark
+Runs report-submission writers and dashboard-style readers from several
+worker processes against one SQLite file, once per mode, and compares write
+throughput, read throughput and "database is locked" failures
+
+Modes:
+    baseline   rollback journal, pysqlite's deferred transactions
+    wal        SQLITE_PRODUCTION_MODE pragmas only
+    wal+queue  pragmas plus the single-writer queue (the default)
+
+Usage:
+    python benchmarks/sqlite_concurrency.py --processes 4 --writers 4 --readers 4 --duration 10
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODES = {
+    'baseline': {'SQLITE_PRODUCTION_MODE': 'false', 'SQLITE_WRITE_QUEUE': 'false'},
+    'wal': {'SQLITE_PRODUCTION_MODE': 'true', 'SQLITE_WRITE_QUEUE': 'false'},
+    'wal+queue': {'SQLITE_PRODUCTION_MODE': 'true', 'SQLITE_WRITE_QUEUE': 'true'}
+}
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of floats"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1)
+    return ordered[max(index, 0)]
+
+def build_app():
+    sys.path.insert(0, ROOT)
+    from factory import create_app
+    return create_app('production')
+
+def setup_database():
+    """Create the schema in the benchmark database"""
+    app = build_app()
+    from extensions import db
+    with app.app_context():
+        db.create_all()
+
+def write_loop(app, stop, results):
+    """Submit a report and its audit row per transaction, like reporting.submit"""
+    from extensions import db
+    from models import AuditLog, FraudReport
+    from sqlalchemy.exc import OperationalError
+
+    with app.app_context():
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                report = FraudReport(
+                    title='Benchmark report',
+                    fraud_type='Financial Fraud',
+                    risk_level='Medium',
+                    summary='Concurrent write benchmark',
+                    status='pending',
+                    priority='medium'
+                )
+                db.session.add(report)
+                db.session.flush()
+                db.session.add(AuditLog(
+                    action='submit_fraud_report',
+                    resource_type='fraud_report',
+                    resource_id=report.id
+                ))
+                db.session.commit()
+                results['write_ms'].append((time.perf_counter() - started) * 1000)
+            except OperationalError as e:
+                db.session.rollback()
+                key = 'locked' if 'locked' in str(e) else 'write_errors'
+                results[key] += 1
+
+def read_loop(app, stop, results):
+    """Recent high-risk reports and a status count, like the dashboards"""
+    from extensions import db
+    from models import FraudReport
+    from sqlalchemy.exc import OperationalError
+
+    with app.app_context():
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                FraudReport.query.order_by(FraudReport.created_at.desc()).limit(10).all()
+                FraudReport.query.filter_by(status='pending').count()
+                db.session.rollback()
+                results['read_ms'].append((time.perf_counter() - started) * 1000)
+            except OperationalError:
+                db.session.rollback()
+                results['read_errors'] += 1
+
+def run_worker(writers, readers, duration, start_at):
+    """One worker process: threads of writers and readers for duration seconds"""
+    app = build_app()
+    results = {'write_ms': [], 'read_ms': [], 'locked': 0, 'write_errors': 0, 'read_errors': 0}
+    stop = threading.Event()
+    threads = [threading.Thread(target=write_loop, args=(app, stop, results)) for _ in range(writers)]
+    threads += [threading.Thread(target=read_loop, args=(app, stop, results)) for _ in range(readers)]
+
+    time.sleep(max(start_at - time.time(), 0))
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    print(json.dumps(results))
+
+def run_mode(mode, args):
+    """Fresh database file, schema, then args.processes concurrent workers"""
+    directory = tempfile.mkdtemp(prefix='rmgfraud-sqlite-')
+    env = dict(
+        os.environ,
+        PYTHONPATH=ROOT,
+        DATABASE_URL=f"sqlite:///{os.path.join(directory, 'bench.db')}",
+        DB_ENGINE_PROFILE='sqlite',
+        RATELIMIT_ENABLED='false',
+        SQLITE_BUSY_TIMEOUT=str(args.busy_timeout),
+        **MODES[mode]
+    )
+    script = os.path.abspath(__file__)
+    subprocess.run([sys.executable, script, '--role', 'setup'], cwd=ROOT, env=env, check=True)
+
+    start_at = time.time() + 2
+    command = [
+        sys.executable, script, '--role', 'worker',
+        '--writers', str(args.writers), '--readers', str(args.readers),
+        '--duration', str(args.duration), '--start-at', str(start_at)
+    ]
+    workers = [subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.PIPE, text=True)
+               for _ in range(args.processes)]
+
+    total = {'write_ms': [], 'read_ms': [], 'locked': 0, 'write_errors': 0, 'read_errors': 0}
+    for worker in workers:
+        output, _ = worker.communicate()
+        if worker.returncode != 0:
+            raise RuntimeError(f'{mode} worker failed')
+        result = json.loads(output.strip().splitlines()[-1])
+        for key, value in result.items():
+            total[key] += value
+    return total
+
+def report(mode, total, duration):
+    print(f'{mode}:')
+    print(f"  writes/sec:       {len(total['write_ms']) / duration:.1f}"
+          f" ({total['locked']} locked, {total['write_errors']} other errors)")
+    print(f"  write p50 / p99:  {percentile(total['write_ms'], 50):.1f} / {percentile(total['write_ms'], 99):.1f} ms")
+    print(f"  reads/sec:        {len(total['read_ms']) / duration:.1f} ({total['read_errors']} errors)")
+    print(f"  read p50 / p99:   {percentile(total['read_ms'], 50):.1f} / {percentile(total['read_ms'], 99):.1f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description='SQLite write/read concurrency by mode')
+    parser.add_argument('--processes', type=int, default=4, help='Worker processes (gunicorn workers)')
+    parser.add_argument('--writers', type=int, default=4, help='Writer threads per process')
+    parser.add_argument('--readers', type=int, default=4, help='Reader threads per process')
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--busy-timeout', type=int, default=5,
+                        help="Seconds a writer waits before 'database is locked' (pysqlite's default is 5)")
+    parser.add_argument('--modes', default=','.join(MODES), help='Comma-separated modes to run')
+    parser.add_argument('--role', choices=['main', 'setup', 'worker'], default='main', help=argparse.SUPPRESS)
+    parser.add_argument('--start-at', type=float, default=0.0, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.role == 'setup':
+        setup_database()
+        return 0
+    if args.role == 'worker':
+        run_worker(args.writers, args.readers, args.duration, args.start_at)
+        return 0
+
+    print("RMGFraud SQLite Concurrency Benchmark")
+    print("=" * 40)
+    print(f'{args.processes} processes x ({args.writers} writers + {args.readers} readers), '
+          f'{args.duration:.0f}s per mode, busy timeout {args.busy_timeout}s')
+
+    totals = {}
+    for mode in args.modes.split(','):
+        totals[mode] = run_mode(mode, args)
+        report(mode, totals[mode], args.duration)
+
+    if 'baseline' in totals and len(totals) > 1:
+        base = len(totals['baseline']['write_ms']) or 1
+        for mode, total in totals.items():
+            if mode != 'baseline':
+                print(f"{mode} write throughput vs. baseline: {len(total['write_ms']) / base:.2f}x")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -30,7 +30,95 @@ class Config:
     MAIL_USERNAME = os.environ.get('MAIL_USERNAME')
     MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD')
     
-    # Rate limiting
+    # Database engine profile: auto picks sqlite for SQLite URLs, serverless on
+    # Vercel/Lambda (NullPool, optionally via DATABASE_POOLER_URL), else worker
+    DB_ENGINE_PROFILE = os.environ.get('DB_ENGINE_PROFILE') or 'auto'
+    DATABASE_POOLER_URL = os.environ.get('DATABASE_POOLER_URL')
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE') or 5)
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW') or 10)
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT') or 30)
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE') or 1800)
+    SQLITE_BUSY_TIMEOUT = int(os.environ.get('SQLITE_BUSY_TIMEOUT') or 15)
+    
+    # SQLite production mode: WAL and tuning pragmas on every connection, and a
+    # per-process write queue that opens write transactions with BEGIN IMMEDIATE
+    SQLITE_PRODUCTION_MODE = os.environ.get('SQLITE_PRODUCTION_MODE', 'true').lower() in ['true', 'on', '1']
+    SQLITE_WRITE_QUEUE = os.environ.get('SQLITE_WRITE_QUEUE', 'true').lower() in ['true', 'on', '1']
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS') or 'NORMAL'
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE') or 268435456)
+    SQLITE_CACHE_SIZE_KB = int(os.environ.get('SQLITE_CACHE_SIZE_KB') or 65536)
+    
+    # Read replica for GET views marked @use_replica; writers stay on the
+    # primary for REPLICA_STICKY_SECONDS to read their own writes
+    DATABASE_REPLICA_URL = os.environ.get('DATABASE_REPLICA_URL')
+    REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS') or 10)
+    
+    # Request profiling (per worker): a sampled share of requests records wall
+    # time, SQL count/time and the slowest statements per endpoint
+    PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'true').lower() in ['true', 'on', '1']
+    PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE') or 0.1)
+    PROFILING_SLOW_STATEMENTS = int(os.environ.get('PROFILING_SLOW_STATEMENTS') or 5)
+    PROFILING_WINDOW = int(os.environ.get('PROFILING_WINDOW') or 200)
+    PROFILING_EXCLUDE = tuple(
+        name.strip() for name in (os.environ.get('PROFILING_EXCLUDE') or 'static,dashboard.event_stream').split(',')
+        if name.strip()
+    )
+    
+    # Prometheus /metrics (memory:// per worker, file:///path summed across
+    # workers); scrapers send METRICS_TOKEN as a bearer token. Without a
+    # token /metrics is a 404 unless METRICS_PUBLIC opens it to anyone
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() in ['true', 'on', '1']
+    METRICS_STORAGE_URL = os.environ.get('METRICS_STORAGE_URL') or 'memory://'
+    METRICS_FLUSH_INTERVAL = int(os.environ.get('METRICS_FLUSH_INTERVAL') or 5)
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    METRICS_PUBLIC = os.environ.get('METRICS_PUBLIC', 'false').lower() in ['true', 'on', '1']
+    
+    # Query guard: count statements per request against @query_budget and
+    # flag shapes repeated more than QUERY_GUARD_MAX_REPEATS times (N+1);
+    # 'off', 'warn' (log) or 'raise' (fail the request)
+    QUERY_GUARD = (os.environ.get('QUERY_GUARD') or 'off').lower()
+    QUERY_GUARD_DEFAULT_BUDGET = int(os.environ.get('QUERY_GUARD_DEFAULT_BUDGET') or 25)
+    QUERY_GUARD_MAX_REPEATS = int(os.environ.get('QUERY_GUARD_MAX_REPEATS') or 3)
+    
+    # Static assets: `flask build-assets` writes content-hashed, precompressed
+    # copies to static/dist, served with immutable caching; HTML/JSON responses
+    # of COMPRESS_MIN_SIZE bytes or more are compressed on the fly
+    ASSETS_FINGERPRINT = os.environ.get('ASSETS_FINGERPRINT', 'true').lower() in ['true', 'on', '1']
+    ASSETS_MAX_AGE = int(os.environ.get('ASSETS_MAX_AGE') or 31536000)
+    COMPRESS_ENABLED = os.environ.get('COMPRESS_ENABLED', 'true').lower() in ['true', 'on', '1']
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE') or 1024)
+    COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL') or 6)
+    COMPRESS_BR_QUALITY = int(os.environ.get('COMPRESS_BR_QUALITY') or 4)
+    
+    # Template {% cache %} fragments (invalidated by data_version() tokens) and
+    # template bytecode, precompiled by `flask compile-templates` ('' disables).
+    # Unset, fragments are cached only with a shared file:// CACHE_STORAGE_URL
+    # (the default outside serverless): with memory:// a commit invalidates
+    # fragments in its own worker only
+    FRAGMENT_CACHE_ENABLED = (
+        os.environ['FRAGMENT_CACHE_ENABLED'].lower() in ['true', 'on', '1']
+        if os.environ.get('FRAGMENT_CACHE_ENABLED') else None
+    )
+    FRAGMENT_CACHE_TTL = int(os.environ.get('FRAGMENT_CACHE_TTL') or 300)
+    TEMPLATE_BYTECODE_DIR = os.environ.get('TEMPLATE_BYTECODE_DIR', os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), '.jinja_bytecode'
+    ))
+    
+    # Async serving path (asgi.py): the read-only JSON APIs run on an async
+    # engine whose pool bounds concurrent queries per worker; other requests
+    # run in the Flask app on ASGI_WSGI_THREADS threads, and SSE streams on
+    # their own ASGI_STREAM_THREADS
+    ASYNC_DB_POOL_SIZE = int(os.environ.get('ASYNC_DB_POOL_SIZE') or 10)
+    ASYNC_DB_MAX_OVERFLOW = int(os.environ.get('ASYNC_DB_MAX_OVERFLOW') or 0)
+    ASYNC_DB_POOL_TIMEOUT = int(os.environ.get('ASYNC_DB_POOL_TIMEOUT') or 5)
+    ASGI_WSGI_THREADS = int(os.environ.get('ASGI_WSGI_THREADS') or 8)
+    ASGI_STREAM_THREADS = int(os.environ.get('ASGI_STREAM_THREADS') or 32)
+    
+    # Register blueprints on the first request instead of at startup (serverless)
+    LAZY_BLUEPRINTS = os.environ.get('LAZY_BLUEPRINTS', 'false').lower() in ['true', 'on', '1']
+    
+    # Rate limiting (memory:// per worker, sqlite:///path shared across workers)
+    RATELIMIT_ENABLED = os.environ.get('RATELIMIT_ENABLED', 'true').lower() in ['true', 'on', '1']
     RATELIMIT_STORAGE_URL = os.environ.get('RATELIMIT_STORAGE_URL') or 'memory://'
     RATELIMIT_DEFAULT = os.environ.get('RATELIMIT_DEFAULT') or '100 per hour'
     
@@ -49,20 +137,130 @@ class Config:
     API_RATE_LIMIT = os.environ.get('API_RATE_LIMIT') or '1000 per hour'
     API_KEY_LENGTH = int(os.environ.get('API_KEY_LENGTH') or 32)
     
-    # Backup settings
-    BACKUP_ENABLED = os.environ.get('BACKUP_ENABLED', 'true').lower() in ['true', 'on', '1']
+    # Proxies in front of the app whose X-Forwarded-For/-Proto are trusted
+    # (1 behind Railway's or Vercel's edge); 0 uses the socket address
+    PROXY_FIX_X_FOR = int(os.environ.get('PROXY_FIX_X_FOR') or 0)
+    
+    # Rate-limited endpoints ('POST auth.login' limits only POSTs); every
+    # other endpoint, the homepage and static files included, is unlimited
+    RATELIMIT_ENDPOINT_LIMITS = {
+        'POST auth.login': os.environ.get('RATELIMIT_AUTH') or '30 per minute',
+        'POST auth.register': os.environ.get('RATELIMIT_AUTH') or '30 per minute',
+        'POST auth.verify_mfa': os.environ.get('RATELIMIT_AUTH') or '30 per minute',
+        'POST reporting.submit': os.environ.get('RATELIMIT_REPORTING') or RATELIMIT_DEFAULT,
+        'country.api_statistics': API_RATE_LIMIT,
+        'country.api_heatmap_data': API_RATE_LIMIT,
+        'database.search': os.environ.get('RATELIMIT_DATABASE') or API_RATE_LIMIT
+    }
+    
+    # Password hashing (cost is per deployment). WORKERS caps the hashes a
+    # worker process computes at once (unset: 2, 0: no cap); TIMEOUT is how
+    # long a login waits for a free slot
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD') or 'pbkdf2:sha256'
+    PASSWORD_HASH_ITERATIONS = int(os.environ.get('PASSWORD_HASH_ITERATIONS') or 600000)
+    PASSWORD_HASH_WORKERS = int(os.environ['PASSWORD_HASH_WORKERS']) if os.environ.get('PASSWORD_HASH_WORKERS') else None
+    PASSWORD_HASH_TIMEOUT = int(os.environ.get('PASSWORD_HASH_TIMEOUT') or 10)
+    
+    # Identity cache for the Flask-Login user loader; invalidations reach
+    # other workers through per-user versions in the shared cache
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL') or 30)
+    USER_CACHE_MAX_ENTRIES = int(os.environ.get('USER_CACHE_MAX_ENTRIES') or 10000)
+    
+    # Shared cache (memory:// per worker, file:///path shared across workers;
+    # unset, instance/cache, or memory:// under serverless)
+    CACHE_STORAGE_URL = os.environ.get('CACHE_STORAGE_URL')
+    CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES') or 2048)
+    PLATFORM_STATS_TTL = int(os.environ.get('PLATFORM_STATS_TTL') or 15)
+    
+    # Risk scoring
+    RISK_SCORE_HALF_LIFE_DAYS = int(os.environ.get('RISK_SCORE_HALF_LIFE_DAYS') or 180)
+    RISK_SCORE_SATURATION = float(os.environ.get('RISK_SCORE_SATURATION') or 20.0)
+    RISK_SCORE_BATCH_SIZE = int(os.environ.get('RISK_SCORE_BATCH_SIZE') or 1000)
+    # Entities with reports are rescored at least this often so recency decay
+    # lowers quiet entities' scores (and reports removed by hand are noticed)
+    RISK_SCORE_DECAY_STEP_HOURS = int(os.environ.get('RISK_SCORE_DECAY_STEP_HOURS') or 24)
+    
+    # Entity detail pages
+    ENTITY_REPORTS_PER_PAGE = int(os.environ.get('ENTITY_REPORTS_PER_PAGE') or 20)
+    REPORT_COUNTS_BATCH_SIZE = int(os.environ.get('REPORT_COUNTS_BATCH_SIZE') or 1000)
+    
+    # Live moderation events (memory:// per worker, sqlite:///path shared across
+    # workers; unset, instance/events.db, or memory:// under serverless). SSE is
+    # off under serverless unless EVENTS_SSE_ENABLED says otherwise, and pages
+    # poll every EVENTS_CLIENT_POLL_SECONDS instead. WEB_CONCURRENCY is the
+    # gunicorn worker count, which rules out a memory:// broker when above 1
+    EVENTS_STORAGE_URL = os.environ.get('EVENTS_STORAGE_URL')
+    EVENTS_SSE_ENABLED = (
+        os.environ['EVENTS_SSE_ENABLED'].lower() in ['true', 'on', '1']
+        if os.environ.get('EVENTS_SSE_ENABLED') else None
+    )
+    EVENTS_MAX_STREAMS = int(os.environ.get('EVENTS_MAX_STREAMS') or 4)
+    EVENTS_CLIENT_POLL_SECONDS = int(os.environ.get('EVENTS_CLIENT_POLL_SECONDS') or 15)
+    WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY') or 1)
+    EVENTS_BACKLOG = int(os.environ.get('EVENTS_BACKLOG') or 500)
+    EVENTS_POLL_INTERVAL = float(os.environ.get('EVENTS_POLL_INTERVAL') or 0.5)
+    EVENTS_STREAM_MAX_AGE = int(os.environ.get('EVENTS_STREAM_MAX_AGE') or 300)
+    EVENTS_HEARTBEAT = int(os.environ.get('EVENTS_HEARTBEAT') or 15)
+    
+    # Pending-verification queue
+    PENDING_USERS_PER_PAGE = int(os.environ.get('PENDING_USERS_PER_PAGE') or 50)
+    BULK_VERIFY_MAX = int(os.environ.get('BULK_VERIFY_MAX') or 500)
+    
+    # User dashboard activity summary
+    USER_ACTIVITY_RECENT_REPORTS = int(os.environ.get('USER_ACTIVITY_RECENT_REPORTS') or 5)
+    USER_ACTIVITY_RECENT_AUDITS = int(os.environ.get('USER_ACTIVITY_RECENT_AUDITS') or 10)
+    USER_ACTIVITY_BATCH_SIZE = int(os.environ.get('USER_ACTIVITY_BATCH_SIZE') or 500)
+    
+    # Entity link graph
+    ENTITY_GRAPH_MAX_FANOUT = int(os.environ.get('ENTITY_GRAPH_MAX_FANOUT') or 50)
+    ENTITY_GRAPH_MAX_AGE = int(os.environ.get('ENTITY_GRAPH_MAX_AGE') or 300)
+    ENTITY_GRAPH_MAX_NODES = int(os.environ.get('ENTITY_GRAPH_MAX_NODES') or 200)
+    
+    # Backup settings (off by default; enabling needs a BACKUP_DIR on persistent
+    # storage, and pg_dump installed for PostgreSQL)
+    BACKUP_ENABLED = os.environ.get('BACKUP_ENABLED', 'false').lower() in ['true', 'on', '1']
     BACKUP_SCHEDULE = os.environ.get('BACKUP_SCHEDULE') or '0 2 * * *'
     BACKUP_RETENTION_DAYS = int(os.environ.get('BACKUP_RETENTION_DAYS') or 30)
+    BACKUP_DIR = os.environ.get('BACKUP_DIR')
+    BACKUP_TIMEOUT = int(os.environ.get('BACKUP_TIMEOUT') or 3600)
+    
+    # Audit log archival to gzipped JSON lines (the job is off by default;
+    # enable it with an AUDIT_ARCHIVE_DIR on persistent storage)
+    AUDIT_ARCHIVE_AFTER_DAYS = int(os.environ.get('AUDIT_ARCHIVE_AFTER_DAYS') or 365)
+    AUDIT_ARCHIVE_BATCH_SIZE = int(os.environ.get('AUDIT_ARCHIVE_BATCH_SIZE') or 5000)
+    AUDIT_ARCHIVE_DIR = os.environ.get('AUDIT_ARCHIVE_DIR')  # default: instance/archive
+    
+    # Scheduled jobs (cron in UTC, 'off' disables). They run in a dedicated
+    # `flask run-jobs --loop` process (the Procfile's worker), or from a cron
+    # trigger with `flask run-jobs`. SCHEDULER_ENABLED=true polls from a thread
+    # in every web worker instead, for single-process deployments only
+    SCHEDULER_ENABLED = os.environ.get('SCHEDULER_ENABLED', 'false').lower() in ['true', 'on', '1']
+    SCHEDULER_POLL_SECONDS = int(os.environ.get('SCHEDULER_POLL_SECONDS') or 30)
+    SCHEDULER_LOCK_SECONDS = int(os.environ.get('SCHEDULER_LOCK_SECONDS') or 3600)
+    SCHEDULER_HISTORY_DAYS = int(os.environ.get('SCHEDULER_HISTORY_DAYS') or 30)
+    SCHEDULER_JOBS = {
+        'country_statistics': os.environ.get('SCHEDULE_COUNTRY_STATISTICS') or '*/15 * * * *',
+        'report_counts': os.environ.get('SCHEDULE_REPORT_COUNTS') or '15 3 * * *',
+        'risk_rescore': os.environ.get('SCHEDULE_RISK_RESCORE') or '0 * * * *',
+        'entity_merge': os.environ.get('SCHEDULE_ENTITY_MERGE') or '45 3 * * *',
+        'audit_archive': os.environ.get('SCHEDULE_AUDIT_ARCHIVE') or 'off',
+        'backup': BACKUP_SCHEDULE,
+        'job_history': os.environ.get('SCHEDULE_JOB_HISTORY') or '30 4 * * *',
+        'rate_limit_prune': os.environ.get('SCHEDULE_RATE_LIMIT_PRUNE') or '*/30 * * * *'
+    }
 
 class DevelopmentConfig(Config):
     """Development configuration"""
     DEBUG = True
     SQLALCHEMY_DATABASE_URI = os.environ.get('DEV_DATABASE_URL') or 'sqlite:///rmgfraud_dev.db'
+    PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE') or 1.0)
+    QUERY_GUARD = (os.environ.get('QUERY_GUARD') or 'warn').lower()
     SESSION_COOKIE_SECURE = False
 
 class ProductionConfig(Config):
     """Production configuration"""
     DEBUG = False
+    PROXY_FIX_X_FOR = int(os.environ.get('PROXY_FIX_X_FOR') or 1)
     SESSION_COOKIE_SECURE = True
     SESSION_COOKIE_HTTPONLY = True
     SESSION_COOKIE_SAMESITE = 'Strict'
@@ -72,6 +270,14 @@ class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     WTF_CSRF_ENABLED = False
+    PASSWORD_HASH_ITERATIONS = 1000
+    PASSWORD_HASH_WORKERS = 0
+    RATELIMIT_ENABLED = False
+    QUERY_GUARD = 'raise'
+    TEMPLATE_BYTECODE_DIR = ''
+    SCHEDULER_ENABLED = False
+    EVENTS_STORAGE_URL = 'memory://'
+    CACHE_STORAGE_URL = 'memory://'
 
 # Configuration dictionary
 config = {
@@ -76,6 +76,7 @@ def create_sample_data():
         
         # Create sample entities
         from models import Entity, CountryProfile
+        from services.entity_keys import canonical_entity_key, find_entity
         
         # Sample countries
         countries = [
@@ -100,9 +101,9 @@ def create_sample_data():
         ]
         
         for entity_data in entities:
-            entity = Entity.query.filter_by(name=entity_data['name']).first()
+            entity = find_entity(entity_data['name'], entity_data['entity_type'], entity_data['country_code'])
             if not entity:
-                entity = Entity(**entity_data)
+                entity = Entity(canonical_key=canonical_entity_key(entity_data['name']), **entity_data)
                 db.session.add(entity)
         
         try:
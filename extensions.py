@@ -0,0 +1,13 @@
+"""
+RMGFraud extensions
+Created unbound at import time and attached to an app by create_app()
+"""
+
+from flask_sqlalchemy import SQLAlchemy
+from flask_login import LoginManager
+from flask_wtf.csrf import CSRFProtect
+from services.replicas import RoutingSession
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+login_manager = LoginManager()
+csrf = CSRFProtect()
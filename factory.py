@@ -0,0 +1,187 @@
+"""
+RMGFraud application factory
+Builds a configured app from config.py. Blueprints come from a registry and
+can be registered on the first request instead of at import, and heavy
+libraries (numpy, pandas, qrcode) are only imported by the code paths that
+use them, which keeps serverless cold starts short
+"""
+
+from flask import Flask, render_template
+from config import config
+from extensions import db, login_manager, csrf
+import importlib
+import os
+import threading
+
+# Module paths of the blueprints, in registration order
+BLUEPRINTS = (
+    'routes.auth',
+    'routes.dashboard',
+    'routes.database',
+    'routes.reporting',
+    'routes.country'
+)
+
+def config_name_from_env():
+    """FLASK_CONFIG, else 'production' when FLASK_ENV says so, else 'default'"""
+    name = os.environ.get('FLASK_CONFIG')
+    if name:
+        return name
+    return 'production' if os.environ.get('FLASK_ENV') == 'production' else 'default'
+
+def register_blueprints(app, modules=BLUEPRINTS):
+    """Import each blueprint module and register its bp"""
+    for module_name in modules:
+        if module_name not in app.blueprints:
+            app.register_blueprint(importlib.import_module(module_name).bp)
+
+class LazyBlueprints:
+    """WSGI wrapper that registers the blueprints just before the first request
+
+    The URL map is complete before any request is dispatched, so url_for()
+    works everywhere; code that needs routes outside a request calls load().
+    """
+
+    def __init__(self, app, modules=BLUEPRINTS):
+        self.app = app
+        self.modules = modules
+        self.wsgi_app = app.wsgi_app
+        self.lock = threading.Lock()
+        self.loaded = False
+        app.wsgi_app = self
+        app.extensions['lazy_blueprints'] = self
+
+    def load(self):
+        if self.loaded:
+            return
+        with self.lock:
+            if not self.loaded:
+                register_blueprints(self.app, self.modules)
+                self.app.wsgi_app = self.wsgi_app
+                self.loaded = True
+
+    def __call__(self, environ, start_response):
+        self.load()
+        return self.wsgi_app(environ, start_response)
+
+def create_app(config_name=None, lazy_blueprints=None, config_overrides=None):
+    """Create and configure an RMGFraud app
+
+    lazy_blueprints defaults to the LAZY_BLUEPRINTS setting. config_overrides
+    is a dict of settings applied on top of the config class, so tests can
+    change one app without touching the class every other app reads.
+    """
+    app = Flask(__name__)
+    app.config.from_object(config[config_name or config_name_from_env()])
+    if config_overrides:
+        app.config.update(config_overrides)
+
+    # Pooling follows the deployment (DB_ENGINE_PROFILE), SQLite files get
+    # production pragmas and a write queue, then extensions bind
+    from services import engine_profiles, profiling, query_guard, replicas, sqlite_mode
+    engine_profiles.configure(app)
+    replicas.configure(app)
+    db.init_app(app)
+    with app.app_context():
+        engine_profiles.instrument_all(db.engines)
+        sqlite_mode.install_all(app, db.engines)
+    replicas.init_app(app, db)
+    profiling.init_app(app, db)
+    query_guard.init_app(app, db)
+    login_manager.init_app(app)
+    login_manager.login_view = 'auth.login'
+    login_manager.login_message = 'Please log in to access this page.'
+    csrf.init_app(app)
+
+    try:
+        # Only needed for the `flask db` commands; not installed on Vercel
+        from flask_migrate import Migrate
+        Migrate(app, db)
+    except ImportError:
+        pass
+
+    from services.metrics import exporter
+    exporter.init_app(app)
+
+    # Client addresses (rate-limit buckets, audit logs) from X-Forwarded-For,
+    # trusting only the PROXY_FIX_X_FOR proxies in front of the app
+    proxy_hops = app.config.get('PROXY_FIX_X_FOR', 0)
+    if proxy_hops:
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxy_hops, x_proto=proxy_hops)
+
+    from services.rate_limit import RateLimiter
+    RateLimiter(app)
+
+    # Fingerprinted static files and compression of the final response body
+    from services import assets
+    assets.init_app(app)
+
+    # {% cache %} template fragments in the shared cache, and precompiled
+    # template bytecode
+    from services import cache, fragment_cache
+    cache.init_app(app)
+    fragment_cache.init_app(app)
+
+    from services import activity_summary, report_counts
+    activity_summary.init_app(app)
+    report_counts.init_app(app)
+
+    # Live updates: a broker every worker shares, SSE or polling per deployment
+    from services import events
+    events.init_app(app)
+
+    # Maintenance jobs on cron schedules, one worker per run
+    from services import scheduler
+    scheduler.init_app(app)
+
+    @login_manager.user_loader
+    def load_user(user_id):
+        from services import user_cache
+        return user_cache.load_user(int(user_id))
+
+    register_core_routes(app)
+
+    if lazy_blueprints is None:
+        lazy_blueprints = app.config.get('LAZY_BLUEPRINTS', False)
+    if lazy_blueprints:
+        LazyBlueprints(app)
+    else:
+        register_blueprints(app)
+
+    return app
+
+def register_core_routes(app):
+    """Homepage and error handlers that live outside the blueprints"""
+    from models import CountryProfile, FraudReport
+    from services.query_guard import query_budget
+    from services.replicas import use_replica
+
+    @app.route('/')
+    @query_budget(3)
+    @use_replica
+    def index():
+        """Homepage with search bar, fraud heatmap, and red-flag cases"""
+        # Get recent high-risk fraud reports for the carousel
+        recent_frauds = FraudReport.query.filter(
+            FraudReport.risk_level.in_(['High', 'Critical'])
+        ).order_by(FraudReport.created_at.desc()).limit(5).all()
+
+        # Get fraud statistics for heatmap
+        fraud_stats = db.session.query(
+            CountryProfile.country_code,
+            CountryProfile.fraud_count
+        ).all()
+
+        return render_template('index.html',
+                             recent_frauds=recent_frauds,
+                             fraud_stats=fraud_stats)
+
+    @app.errorhandler(404)
+    def not_found_error(error):
+        return render_template('errors/404.html'), 404
+
+    @app.errorhandler(500)
+    def internal_error(error):
+        db.session.rollback()
+        return render_template('errors/500.html'), 500
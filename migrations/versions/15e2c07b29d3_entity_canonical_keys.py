@@ -0,0 +1,126 @@
+"""Entity canonical keys
+
+Adds entities.canonical_key, keys every entity and merges the duplicates
+the keys reveal (the same rules as services.entity_keys.merge_group),
+and only then creates the unique index, which would fail on duplicates.
+All of it runs on the migration's connection, so on PostgreSQL the
+backfill sees the new column inside the same transaction.
+
+Revision ID: 15e2c07b29d3
+Revises: f1713d57e476
+Create Date: 2026-10-19 00:06:51.734902
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from services.entity_keys import canonical_entity_key
+
+
+# revision identifiers, used by Alembic.
+revision = '15e2c07b29d3'
+down_revision = 'f1713d57e476'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+entities = sa.table(
+    'entities',
+    sa.column('id', sa.Integer),
+    sa.column('name', sa.String),
+    sa.column('canonical_key', sa.String),
+    sa.column('entity_type', sa.String),
+    sa.column('country_code', sa.String),
+    sa.column('registration_number', sa.String),
+    sa.column('contact_info', sa.Text),
+    sa.column('description', sa.Text),
+    sa.column('is_verified', sa.Boolean),
+    sa.column('risk_scored_at', sa.DateTime)
+)
+fraud_reports = sa.table(
+    'fraud_reports',
+    sa.column('id', sa.Integer),
+    sa.column('entity_id', sa.Integer),
+    sa.column('status', sa.String),
+    sa.column('risk_level', sa.String)
+)
+report_counts = sa.table(
+    'entity_report_counts',
+    sa.column('entity_id', sa.Integer),
+    sa.column('status', sa.String),
+    sa.column('risk_level', sa.String),
+    sa.column('report_count', sa.Integer)
+)
+
+# Filled on the survivor from the first duplicate that has them
+FILL_FIELDS = ('registration_number', 'contact_info', 'description')
+
+
+def _merge(bind, survivor, duplicates):
+    """Move the duplicates' reports to the survivor, delete them and recount the survivor"""
+    duplicate_ids = [row.id for row in duplicates]
+    values = {'risk_scored_at': None}
+    for field in FILL_FIELDS:
+        if not getattr(survivor, field):
+            values[field] = next((getattr(row, field) for row in duplicates if getattr(row, field)), None)
+
+    bind.execute(
+        fraud_reports.update().where(fraud_reports.c.entity_id.in_(duplicate_ids)).values(entity_id=survivor.id)
+    )
+    bind.execute(report_counts.delete().where(report_counts.c.entity_id.in_(duplicate_ids + [survivor.id])))
+    bind.execute(entities.delete().where(entities.c.id.in_(duplicate_ids)))
+    bind.execute(report_counts.insert().from_select(
+        ['entity_id', 'status', 'risk_level', 'report_count'],
+        sa.select(
+            fraud_reports.c.entity_id,
+            fraud_reports.c.status,
+            fraud_reports.c.risk_level,
+            sa.func.count(fraud_reports.c.id)
+        ).where(fraud_reports.c.entity_id == survivor.id).group_by(
+            fraud_reports.c.entity_id, fraud_reports.c.status, fraud_reports.c.risk_level
+        )
+    ))
+    bind.execute(entities.update().where(entities.c.id == survivor.id).values(**values))
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    if 'canonical_key' not in {column['name'] for column in inspector.get_columns('entities')}:
+        op.add_column('entities', sa.Column('canonical_key', sa.String(length=200), nullable=True))
+    if 'uq_entities_canonical' in {index['name'] for index in inspector.get_indexes('entities')}:
+        return
+
+    groups = {}
+    for row in bind.execute(sa.select(entities).order_by(entities.c.id)):
+        key = canonical_entity_key(row.name)
+        if key:
+            groups.setdefault((key, row.entity_type, row.country_code), []).append(row)
+
+    keyed = []
+    for (key, _, _), rows in groups.items():
+        # Prefer a verified entity, then the oldest
+        rows.sort(key=lambda row: (not row.is_verified, row.id))
+        if len(rows) > 1:
+            _merge(bind, rows[0], rows[1:])
+        if rows[0].canonical_key != key:
+            keyed.append({'entity_id': rows[0].id, 'key': key})
+
+    update = entities.update().where(entities.c.id == sa.bindparam('entity_id')).values(
+        canonical_key=sa.bindparam('key')
+    )
+    for start in range(0, len(keyed), BATCH_SIZE):
+        bind.execute(update, keyed[start:start + BATCH_SIZE])
+
+    op.create_index(
+        'uq_entities_canonical', 'entities', ['canonical_key', 'entity_type', 'country_code'], unique=True
+    )
+
+
+def downgrade():
+    # Merged duplicates are not restored
+    op.drop_index('uq_entities_canonical', table_name='entities')
+    with op.batch_alter_table('entities') as batch_op:
+        batch_op.drop_column('canonical_key')
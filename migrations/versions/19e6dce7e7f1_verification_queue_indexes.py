@@ -0,0 +1,33 @@
+"""Verification queue indexes on users
+
+Revision ID: 19e6dce7e7f1
+Revises: a817cae02846
+Create Date: 2026-10-19 00:20:44.271530
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '19e6dce7e7f1'
+down_revision = 'a817cae02846'
+branch_labels = None
+depends_on = None
+
+INDEXES = (
+    ('ix_users_verified_id', ['is_verified', 'id']),
+    ('ix_users_verified_type_id', ['is_verified', 'verification_type', 'id'])
+)
+
+
+def upgrade():
+    existing = {index['name'] for index in sa.inspect(op.get_bind()).get_indexes('users')}
+    for name, columns in INDEXES:
+        if name not in existing:
+            op.create_index(name, 'users', columns)
+
+
+def downgrade():
+    for name, _ in reversed(INDEXES):
+        op.drop_index(name, table_name='users')
@@ -0,0 +1,48 @@
+"""Entity risk score columns
+
+Adds the columns services.risk_scoring writes. They start NULL, so the next
+incremental rescore picks every entity up.
+
+Databases whose tables were created by db.create_all() may already have
+some of these objects; every step checks first.
+
+Revision ID: 2bab57206b11
+Revises:
+Create Date: 2026-10-18 23:50:12.418305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2bab57206b11'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+COLUMNS = ('risk_score', 'computed_risk_level', 'risk_report_count', 'risk_scored_at')
+
+
+def _columns(table):
+    return {column['name'] for column in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def upgrade():
+    existing = _columns('entities')
+    for column in (
+        sa.Column('risk_score', sa.Float(), nullable=True),
+        sa.Column('computed_risk_level', sa.String(length=20), nullable=True),
+        sa.Column('risk_report_count', sa.Integer(), nullable=True),
+        sa.Column('risk_scored_at', sa.DateTime(), nullable=True)
+    ):
+        if column.name not in existing:
+            op.add_column('entities', column)
+
+
+def downgrade():
+    existing = _columns('entities')
+    with op.batch_alter_table('entities') as batch_op:
+        for name in reversed(COLUMNS):
+            if name in existing:
+                batch_op.drop_column(name)
@@ -0,0 +1,34 @@
+"""Indexes for incremental risk rescoring
+
+Revision ID: 5d0c8e2a9f31
+Revises: 72c4d5b6b4d2
+Create Date: 2026-10-19 01:12:44.306518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d0c8e2a9f31'
+down_revision = '72c4d5b6b4d2'
+branch_labels = None
+depends_on = None
+
+
+def _indexes(inspector, table):
+    return {index['name'] for index in inspector.get_indexes(table)}
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    if 'ix_entities_risk_scored_at' not in _indexes(inspector, 'entities'):
+        op.create_index('ix_entities_risk_scored_at', 'entities', ['risk_scored_at'])
+    if 'ix_fraud_reports_updated_at' not in _indexes(inspector, 'fraud_reports'):
+        op.create_index('ix_fraud_reports_updated_at', 'fraud_reports', ['updated_at'])
+
+
+def downgrade():
+    op.drop_index('ix_fraud_reports_updated_at', table_name='fraud_reports')
+    op.drop_index('ix_entities_risk_scored_at', table_name='entities')
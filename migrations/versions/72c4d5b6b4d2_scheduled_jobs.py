@@ -0,0 +1,59 @@
+"""Scheduled jobs and their run history
+
+Revision ID: 72c4d5b6b4d2
+Revises: e123b53459c3
+Create Date: 2026-10-19 00:26:37.190482
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '72c4d5b6b4d2'
+down_revision = 'e123b53459c3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    if not inspector.has_table('scheduled_jobs'):
+        op.create_table(
+            'scheduled_jobs',
+            sa.Column('name', sa.String(length=64), nullable=False),
+            sa.Column('schedule', sa.String(length=100), nullable=False),
+            sa.Column('enabled', sa.Boolean(), nullable=False),
+            sa.Column('next_run_at', sa.DateTime(), nullable=False),
+            sa.Column('locked_by', sa.String(length=100), nullable=True),
+            sa.Column('locked_until', sa.DateTime(), nullable=True),
+            sa.Column('last_run_at', sa.DateTime(), nullable=True),
+            sa.Column('last_status', sa.String(length=20), nullable=True),
+            sa.Column('last_duration_ms', sa.Float(), nullable=True),
+            sa.PrimaryKeyConstraint('name')
+        )
+
+    if not inspector.has_table('job_runs'):
+        op.create_table(
+            'job_runs',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('job_name', sa.String(length=64), nullable=False),
+            sa.Column('worker', sa.String(length=100), nullable=True),
+            sa.Column('trigger', sa.String(length=20), nullable=False),
+            sa.Column('started_at', sa.DateTime(), nullable=False),
+            sa.Column('finished_at', sa.DateTime(), nullable=True),
+            sa.Column('duration_ms', sa.Float(), nullable=True),
+            sa.Column('status', sa.String(length=20), nullable=False),
+            sa.Column('result', sa.Text(), nullable=True),
+            sa.Column('error', sa.Text(), nullable=True),
+            sa.ForeignKeyConstraint(['job_name'], ['scheduled_jobs.name']),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('ix_job_runs_job_started', 'job_runs', ['job_name', 'started_at'])
+
+
+def downgrade():
+    op.drop_index('ix_job_runs_job_started', table_name='job_runs')
+    op.drop_table('job_runs')
+    op.drop_table('scheduled_jobs')
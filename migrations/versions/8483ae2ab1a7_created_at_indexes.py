@@ -0,0 +1,33 @@
+"""created_at indexes for the dashboard statistics
+
+Revision ID: 8483ae2ab1a7
+Revises: 15e2c07b29d3
+Create Date: 2026-10-19 00:14:03.562117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8483ae2ab1a7'
+down_revision = '15e2c07b29d3'
+branch_labels = None
+depends_on = None
+
+INDEXES = (
+    ('ix_users_created_at', 'users', ['created_at']),
+    ('ix_fraud_reports_created_at', 'fraud_reports', ['created_at'])
+)
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    for name, table, columns in INDEXES:
+        if name not in {index['name'] for index in inspector.get_indexes(table)}:
+            op.create_index(name, table, columns)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,47 @@
+"""User activity summaries
+
+Creates user_activity_summaries and the audit log index the summary reads.
+Fill the rows afterwards with `flask rebuild-activity-summaries`.
+
+Revision ID: a817cae02846
+Revises: 8483ae2ab1a7
+Create Date: 2026-10-19 00:17:26.908341
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a817cae02846'
+down_revision = '8483ae2ab1a7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    if not inspector.has_table('user_activity_summaries'):
+        op.create_table(
+            'user_activity_summaries',
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('reports_total', sa.Integer(), nullable=False),
+            sa.Column('reports_pending', sa.Integer(), nullable=False),
+            sa.Column('reports_under_review', sa.Integer(), nullable=False),
+            sa.Column('reports_verified', sa.Integer(), nullable=False),
+            sa.Column('reports_rejected', sa.Integer(), nullable=False),
+            sa.Column('recent_report_ids', sa.Text(), nullable=True),
+            sa.Column('recent_audit_ids', sa.Text(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+            sa.PrimaryKeyConstraint('user_id')
+        )
+
+    if 'ix_audit_logs_user_timestamp' not in {index['name'] for index in inspector.get_indexes('audit_logs')}:
+        op.create_index('ix_audit_logs_user_timestamp', 'audit_logs', ['user_id', 'timestamp'])
+
+
+def downgrade():
+    op.drop_index('ix_audit_logs_user_timestamp', table_name='audit_logs')
+    op.drop_table('user_activity_summaries')
@@ -0,0 +1,26 @@
+"""Reporter index on fraud_reports
+
+Revision ID: e123b53459c3
+Revises: 19e6dce7e7f1
+Create Date: 2026-10-19 00:23:10.845926
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e123b53459c3'
+down_revision = '19e6dce7e7f1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    existing = {index['name'] for index in sa.inspect(op.get_bind()).get_indexes('fraud_reports')}
+    if 'ix_fraud_reports_reporter_created' not in existing:
+        op.create_index('ix_fraud_reports_reporter_created', 'fraud_reports', ['reporter_id', 'created_at'])
+
+
+def downgrade():
+    op.drop_index('ix_fraud_reports_reporter_created', table_name='fraud_reports')
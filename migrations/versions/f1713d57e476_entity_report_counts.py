@@ -0,0 +1,54 @@
+"""Entity report counters and report paging indexes
+
+Creates entity_report_counts and fills it from fraud_reports in one
+grouped INSERT, the same rows `flask rebuild-report-counts` writes.
+
+Revision ID: f1713d57e476
+Revises: 2bab57206b11
+Create Date: 2026-10-18 23:58:40.120574
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1713d57e476'
+down_revision = '2bab57206b11'
+branch_labels = None
+depends_on = None
+
+
+def _indexes(inspector, table):
+    return {index['name'] for index in inspector.get_indexes(table)}
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    if not inspector.has_table('entity_report_counts'):
+        op.create_table(
+            'entity_report_counts',
+            sa.Column('entity_id', sa.Integer(), nullable=False),
+            sa.Column('status', sa.String(length=20), nullable=False),
+            sa.Column('risk_level', sa.String(length=20), nullable=False),
+            sa.Column('report_count', sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(['entity_id'], ['entities.id']),
+            sa.PrimaryKeyConstraint('entity_id', 'status', 'risk_level')
+        )
+        op.execute(
+            "INSERT INTO entity_report_counts (entity_id, status, risk_level, report_count) "
+            "SELECT entity_id, COALESCE(status, 'pending'), risk_level, COUNT(id) FROM fraud_reports "
+            "WHERE entity_id IS NOT NULL GROUP BY entity_id, COALESCE(status, 'pending'), risk_level"
+        )
+
+    if 'ix_fraud_reports_entity_created' not in _indexes(inspector, 'fraud_reports'):
+        op.create_index('ix_fraud_reports_entity_created', 'fraud_reports', ['entity_id', 'created_at'])
+    if 'ix_report_reviews_fraud_report_id' not in _indexes(inspector, 'report_reviews'):
+        op.create_index('ix_report_reviews_fraud_report_id', 'report_reviews', ['fraud_report_id'])
+
+
+def downgrade():
+    op.drop_index('ix_report_reviews_fraud_report_id', table_name='report_reviews')
+    op.drop_index('ix_fraud_reports_entity_created', table_name='fraud_reports')
+    op.drop_table('entity_report_counts')
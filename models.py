@@ -1,17 +1,9 @@
-from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
+from extensions import db
+from services import mfa_qr, passwords
 import pyotp
 
-# This will be set by the app
-db = None
-
-def init_db(database):
-    """Initialize the database instance"""
-    global db
-    db = database
-
 class User(UserMixin, db.Model if db else object):
     """User model with authentication and role management"""
     if db:
@@ -27,19 +19,29 @@ class User(UserMixin, db.Model if db else object):
         verification_type = db.Column(db.String(20))  # bgmea, rmg_supplier, banking
         mfa_secret = db.Column(db.String(32))
         mfa_enabled = db.Column(db.Boolean, default=False)
-        created_at = db.Column(db.DateTime, default=datetime.utcnow)
+        created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
         last_login = db.Column(db.DateTime)
         
         # Relationships
         fraud_reports = db.relationship('FraudReport', backref='reporter', lazy='dynamic')
+        
+        # Pending-verification queue, walked in id order with or without a type filter
+        __table_args__ = (
+            db.Index('ix_users_verified_id', 'is_verified', 'id'),
+            db.Index('ix_users_verified_type_id', 'is_verified', 'verification_type', 'id'),
+        )
     
     def set_password(self, password):
         """Hash and set password"""
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = passwords.hash_password(password)
     
     def check_password(self, password):
-        """Check password against hash"""
-        return check_password_hash(self.password_hash, password)
+        """Check password against hash, upgrading legacy or outdated hashes"""
+        matches, needs_rehash = passwords.verify_password(self.password_hash, password)
+        if matches and needs_rehash:
+            # Saved with the caller's next commit
+            self.set_password(password)
+        return matches
     
     def generate_mfa_secret(self):
         """Generate MFA secret for user"""
@@ -53,16 +55,21 @@ class User(UserMixin, db.Model if db else object):
         totp = pyotp.TOTP(self.mfa_secret)
         return totp.verify(token, valid_window=1)
     
-    def get_mfa_qr_code(self):
-        """Generate QR code for MFA setup"""
+    def get_mfa_provisioning_uri(self):
+        """otpauth:// URI for authenticator apps"""
         if not self.mfa_secret:
             return None
         totp = pyotp.TOTP(self.mfa_secret)
-        qr_code = qrcode.make(totp.provisioning_uri(
+        return totp.provisioning_uri(
             name=self.email,
             issuer_name="RMGFraud"
-        ))
-        return qr_code
+        )
+    
+    def get_mfa_qr_code(self):
+        """Inline SVG QR code for MFA setup, cached until the secret changes"""
+        if not self.mfa_secret:
+            return None
+        return mfa_qr.provisioning_svg(self.id, self.mfa_secret, self.get_mfa_provisioning_uri())
 
 class Entity(db.Model if db else object):
     """Entity model for companies, individuals, suppliers, etc."""
@@ -71,18 +78,29 @@ class Entity(db.Model if db else object):
         
         id = db.Column(db.Integer, primary_key=True)
         name = db.Column(db.String(200), nullable=False)
+        canonical_key = db.Column(db.String(200))  # see services.entity_keys.canonical_entity_key
         entity_type = db.Column(db.String(50), nullable=False)  # company, individual, supplier, manufacturer
         country_code = db.Column(db.String(3), nullable=False)
         registration_number = db.Column(db.String(100))
         contact_info = db.Column(db.Text)
         description = db.Column(db.Text)
         risk_level = db.Column(db.String(20), default='Low')  # Low, Medium, High, Critical
+        risk_score = db.Column(db.Float, default=0.0)  # 0-100, computed by services.risk_scoring
+        computed_risk_level = db.Column(db.String(20))  # band of risk_score; risk_level stays moderator-set
+        risk_report_count = db.Column(db.Integer)  # reports counted at risk_scored_at
+        risk_scored_at = db.Column(db.DateTime)
         is_verified = db.Column(db.Boolean, default=False)
         created_at = db.Column(db.DateTime, default=datetime.utcnow)
         updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
         
         # Relationships
         fraud_reports = db.relationship('FraudReport', backref='entity', lazy='dynamic')
+        
+        __table_args__ = (
+            db.Index('uq_entities_canonical', 'canonical_key', 'entity_type', 'country_code', unique=True),
+            # Incremental rescoring finds unscored and stale entities by scoring time
+            db.Index('ix_entities_risk_scored_at', 'risk_scored_at'),
+        )
 
 class FraudReport(db.Model if db else object):
     """Fraud report model for whistleblower submissions"""
@@ -100,7 +118,7 @@ class FraudReport(db.Model if db else object):
         is_anonymous = db.Column(db.Boolean, default=True)
         status = db.Column(db.String(20), default='pending')  # pending, under_review, verified, rejected
         priority = db.Column(db.String(20), default='medium')  # low, medium, high, urgent
-        created_at = db.Column(db.DateTime, default=datetime.utcnow)
+        created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
         updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
         
         # Foreign keys
@@ -108,7 +126,16 @@ class FraudReport(db.Model if db else object):
         reporter_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
         
         # Relationships
-        reviews = db.relationship('ReportReview', backref='fraud_report', lazy='dynamic')
+        reviews = db.relationship('ReportReview', backref='fraud_report', lazy='select',
+                                  order_by='ReportReview.created_at')
+        
+        __table_args__ = (
+            db.Index('ix_fraud_reports_entity_created', 'entity_id', 'created_at'),
+            # My-reports pages and activity summaries read one reporter's rows newest first
+            db.Index('ix_fraud_reports_reporter_created', 'reporter_id', 'created_at'),
+            # Incremental rescoring reads only the reports updated since its last run
+            db.Index('ix_fraud_reports_updated_at', 'updated_at'),
+        )
 
 class ReportReview(db.Model if db else object):
     """Review model for fraud report moderation"""
@@ -116,7 +143,7 @@ class ReportReview(db.Model if db else object):
         __tablename__ = 'report_reviews'
         
         id = db.Column(db.Integer, primary_key=True)
-        fraud_report_id = db.Column(db.Integer, db.ForeignKey('fraud_reports.id'), nullable=False)
+        fraud_report_id = db.Column(db.Integer, db.ForeignKey('fraud_reports.id'), nullable=False, index=True)
         reviewer_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
         review_status = db.Column(db.String(20), nullable=False)  # approved, rejected, needs_more_info
         review_notes = db.Column(db.Text)
@@ -125,6 +152,16 @@ class ReportReview(db.Model if db else object):
         # Relationships
         reviewer = db.relationship('User', backref='reviews')
 
+class EntityReportCount(db.Model if db else object):
+    """Precomputed report counts per entity, status and risk level"""
+    if db:
+        __tablename__ = 'entity_report_counts'
+        
+        entity_id = db.Column(db.Integer, db.ForeignKey('entities.id'), primary_key=True)
+        status = db.Column(db.String(20), primary_key=True)
+        risk_level = db.Column(db.String(20), primary_key=True)
+        report_count = db.Column(db.Integer, nullable=False, default=0)
+
 class CountryProfile(db.Model if db else object):
     """Country profile model for fraud statistics and heatmap data"""
     if db:
@@ -159,4 +196,61 @@ class AuditLog(db.Model if db else object):
         details = db.Column(db.Text)  # JSON string for additional details
         
         # Relationships
-        user = db.relationship('User', backref='audit_logs')
\ No newline at end of file
+        user = db.relationship('User', backref='audit_logs')
+        
+        __table_args__ = (
+            db.Index('ix_audit_logs_user_timestamp', 'user_id', 'timestamp'),
+        )
+
+class UserActivitySummary(db.Model if db else object):
+    """Per-user report counts and recent activity pointers for the dashboard"""
+    if db:
+        __tablename__ = 'user_activity_summaries'
+        
+        user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+        reports_total = db.Column(db.Integer, nullable=False, default=0)
+        reports_pending = db.Column(db.Integer, nullable=False, default=0)
+        reports_under_review = db.Column(db.Integer, nullable=False, default=0)
+        reports_verified = db.Column(db.Integer, nullable=False, default=0)
+        reports_rejected = db.Column(db.Integer, nullable=False, default=0)
+        recent_report_ids = db.Column(db.Text, default='[]')  # JSON list, newest first
+        recent_audit_ids = db.Column(db.Text, default='[]')  # JSON list, newest first
+        updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class ScheduledJob(db.Model if db else object):
+    """A periodic maintenance job with its cron schedule and leader lock"""
+    if db:
+        __tablename__ = 'scheduled_jobs'
+        
+        name = db.Column(db.String(64), primary_key=True)
+        schedule = db.Column(db.String(100), nullable=False)  # cron: minute hour day month weekday (UTC)
+        enabled = db.Column(db.Boolean, nullable=False, default=True)
+        next_run_at = db.Column(db.DateTime, nullable=False)
+        
+        # Leader lock: the worker running the job and when its claim lapses
+        locked_by = db.Column(db.String(100))
+        locked_until = db.Column(db.DateTime)
+        
+        last_run_at = db.Column(db.DateTime)
+        last_status = db.Column(db.String(20))  # success, failed
+        last_duration_ms = db.Column(db.Float)
+
+class JobRun(db.Model if db else object):
+    """One run of a scheduled job, for timing and history"""
+    if db:
+        __tablename__ = 'job_runs'
+        
+        id = db.Column(db.Integer, primary_key=True)
+        job_name = db.Column(db.String(64), db.ForeignKey('scheduled_jobs.name'), nullable=False)
+        worker = db.Column(db.String(100))
+        trigger = db.Column(db.String(20), nullable=False, default='schedule')  # schedule, manual
+        started_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+        finished_at = db.Column(db.DateTime)
+        duration_ms = db.Column(db.Float)
+        status = db.Column(db.String(20), nullable=False, default='running')  # running, success, failed
+        result = db.Column(db.Text)  # JSON summary returned by the job
+        error = db.Column(db.Text)
+        
+        __table_args__ = (
+            db.Index('ix_job_runs_job_started', 'job_name', 'started_at'),
+        )
\ No newline at end of file
@@ -2,16 +2,16 @@ from flask import Blueprint, render_template, request, redirect, url_for, flash,
 from flask_login import login_user, logout_user, login_required, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
 from models import User, db, AuditLog
+from services import metrics, user_cache
+from services.query_guard import query_budget
 from datetime import datetime
 import pyotp
-import qrcode
-from io import BytesIO
-import base64
 import bleach
 
 bp = Blueprint('auth', __name__, url_prefix='/auth')
 
 @bp.route('/login', methods=['GET', 'POST'])
+@query_budget(8)
 def login():
     """User login with MFA support"""
     if current_user.is_authenticated:
@@ -27,11 +27,16 @@ def login():
         if user and user.check_password(password):
             # Check MFA if enabled
             if user.mfa_enabled:
+                # Save a hash check_password upgraded before the MFA prompt returns
+                if db.session.is_modified(user):
+                    db.session.commit()
                 if not mfa_token:
                     session['pending_user_id'] = user.id
+                    metrics.inc('rmgfraud_logins_total', result='mfa_required')
                     return render_template('auth/mfa_verify.html', user=user)
                 
                 if not user.verify_mfa_token(mfa_token):
+                    metrics.inc('rmgfraud_logins_total', result='mfa_failure')
                     flash('Invalid MFA token. Please try again.', 'error')
                     return render_template('auth/mfa_verify.html', user=user)
             
@@ -49,15 +54,18 @@ def login():
             )
             db.session.add(audit_log)
             db.session.commit()
+            metrics.inc('rmgfraud_logins_total', result='success')
             
             flash('Login successful!', 'success')
             return redirect(url_for('dashboard.index'))
         else:
+            metrics.inc('rmgfraud_logins_total', result='failure')
             flash('Invalid username or password.', 'error')
     
     return render_template('auth/login.html')
 
 @bp.route('/register', methods=['GET', 'POST'])
+@query_budget(8)
 def register():
     """User registration with verification requirements"""
     if current_user.is_authenticated:
@@ -99,7 +107,7 @@ def register():
         user.set_password(password)
         
         db.session.add(user)
-        db.session.commit()
+        db.session.flush()
         
         # Create audit log
         audit_log = AuditLog(
@@ -119,6 +127,7 @@ def register():
     return render_template('auth/register.html')
 
 @bp.route('/logout')
+@query_budget(6)
 @login_required
 def logout():
     """User logout"""
@@ -138,6 +147,7 @@ def logout():
     return redirect(url_for('index'))
 
 @bp.route('/setup-mfa')
+@query_budget(5)
 @login_required
 def setup_mfa():
     """Setup MFA for user"""
@@ -145,21 +155,21 @@ def setup_mfa():
         flash('MFA is already enabled for your account.', 'info')
         return redirect(url_for('dashboard.settings'))
     
-    secret = current_user.generate_mfa_secret()
-    db.session.commit()
+    # Reuse a pending secret so revisits don't invalidate a scanned code
+    secret = current_user.mfa_secret
+    if not secret:
+        secret = current_user.generate_mfa_secret()
+        db.session.commit()
     
-    # Generate QR code
+    # Inline SVG QR code (None if qrcode isn't installed)
     qr_code = current_user.get_mfa_qr_code()
-    qr_buffer = BytesIO()
-    qr_code.save(qr_buffer, format='PNG')
-    qr_buffer.seek(0)
-    qr_data = base64.b64encode(qr_buffer.getvalue()).decode()
     
     return render_template('auth/setup_mfa.html', 
                          secret=secret, 
-                         qr_code=qr_data)
+                         qr_code=qr_code)
 
 @bp.route('/verify-mfa', methods=['POST'])
+@query_budget(6)
 @login_required
 def verify_mfa():
     """Verify MFA setup"""
@@ -168,6 +178,7 @@ def verify_mfa():
     if current_user.verify_mfa_token(token):
         current_user.mfa_enabled = True
         db.session.commit()
+        user_cache.invalidate_user(current_user.id)
         
         flash('MFA has been successfully enabled!', 'success')
         return redirect(url_for('dashboard.settings'))
@@ -176,6 +187,7 @@ def verify_mfa():
         return redirect(url_for('auth.setup_mfa'))
 
 @bp.route('/disable-mfa', methods=['POST'])
+@query_budget(6)
 @login_required
 def disable_mfa():
     """Disable MFA for user"""
@@ -188,6 +200,7 @@ def disable_mfa():
     current_user.mfa_enabled = False
     current_user.mfa_secret = None
     db.session.commit()
+    user_cache.invalidate_user(current_user.id)
     
     flash('MFA has been disabled.', 'success')
     return redirect(url_for('dashboard.settings'))
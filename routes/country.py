@@ -1,27 +1,33 @@
 from flask import Blueprint, render_template, request, jsonify
 from models import CountryProfile, Entity, FraudReport, db
+from services import country_stats
+from services.query_guard import query_budget
+from services.replicas import use_replica
 from datetime import datetime, timedelta
 import json
 
 bp = Blueprint('country', __name__, url_prefix='/country')
 
 @bp.route('/')
+@query_budget(2)
+@use_replica
 def index():
     """Country profiles overview page"""
+    # Loaded inside the template's {% cache %} block, so a cached page runs no query
+    return render_template('country/index.html', load_overview=country_overview)
+
+def country_overview():
+    """Profiles by fraud count, with the global totals"""
     countries = CountryProfile.query.order_by(CountryProfile.fraud_count.desc()).all()
-    
-    # Get global statistics
-    total_fraud_count = sum(country.fraud_count for country in countries)
-    total_high_risk = sum(country.high_risk_count for country in countries)
-    total_critical = sum(country.critical_count for country in countries)
-    
-    return render_template('country/index.html',
-                         countries=countries,
-                         total_fraud_count=total_fraud_count,
-                         total_high_risk=total_high_risk,
-                         total_critical=total_critical)
+    return {
+        'countries': countries,
+        'total_fraud_count': sum(country.fraud_count for country in countries),
+        'total_high_risk': sum(country.high_risk_count for country in countries),
+        'total_critical': sum(country.critical_count for country in countries)
+    }
 
 @bp.route('/<country_code>')
+@query_budget(8)
 def country_detail(country_code):
     """Detailed country profile with statistics and visualizations"""
     country = CountryProfile.query.filter_by(country_code=country_code).first()
@@ -62,15 +68,19 @@ def country_detail(country_code):
         entity_stats['by_type'][entity_type] += 1
     
     # Get fraud trends (last 12 months)
+    # (extract() rather than date_trunc(), which SQLite does not have; rows
+    # keep date_trunc's shape, the first of each month with its count)
     twelve_months_ago = datetime.utcnow() - timedelta(days=365)
-    monthly_reports = db.session.query(
-        db.func.date_trunc('month', FraudReport.created_at).label('month'),
-        db.func.count(FraudReport.id).label('count')
-    ).filter(
-        FraudReport.created_at >= twelve_months_ago
-    ).group_by(
-        db.func.date_trunc('month', FraudReport.created_at)
-    ).order_by('month').all()
+    report_year = db.extract('year', FraudReport.created_at)
+    report_month = db.extract('month', FraudReport.created_at)
+    monthly_reports = [
+        {'month': datetime(int(year), int(month), 1), 'count': count}
+        for year, month, count in db.session.query(
+            report_year, report_month, db.func.count(FraudReport.id)
+        ).filter(
+            FraudReport.created_at >= twelve_months_ago
+        ).group_by(report_year, report_month).order_by(report_year, report_month)
+    ]
     
     # Get fraud types distribution
     fraud_types = db.session.query(
@@ -89,86 +99,60 @@ def country_detail(country_code):
                          fraud_types=fraud_types)
 
 @bp.route('/api/statistics')
+@query_budget(2)
+@use_replica
 def api_statistics():
     """API endpoint for country statistics"""
     countries = CountryProfile.query.all()
-    
-    statistics = []
-    for country in countries:
-        statistics.append({
-            'country_code': country.country_code,
-            'country_name': country.country_name,
-            'fraud_count': country.fraud_count,
-            'high_risk_count': country.high_risk_count,
-            'critical_count': country.critical_count,
-            'total_entities': country.total_entities,
-            'verified_entities': country.verified_entities,
-            'fraud_trend': country.fraud_trend
-        })
+    statistics = [statistics_entry(country) for country in countries]
     
     return jsonify(statistics)
 
 @bp.route('/api/heatmap-data')
+@query_budget(2)
+@use_replica
 def api_heatmap_data():
     """API endpoint for fraud heatmap data"""
     countries = CountryProfile.query.all()
-    
-    heatmap_data = []
-    for country in countries:
-        # Calculate risk score based on fraud count and risk levels
-        risk_score = country.fraud_count + (country.high_risk_count * 2) + (country.critical_count * 3)
-        
-        heatmap_data.append({
-            'country_code': country.country_code,
-            'country_name': country.country_name,
-            'fraud_count': country.fraud_count,
-            'risk_score': risk_score,
-            'coordinates': get_country_coordinates(country.country_code)
-        })
+    heatmap_data = [heatmap_entry(country) for country in countries]
     
     return jsonify(heatmap_data)
 
 @bp.route('/update-statistics')
+@query_budget(6)
 def update_statistics():
     """Update country statistics (admin only)"""
-    # This would typically be called by a scheduled task
-    countries = CountryProfile.query.all()
-    
-    for country in countries:
-        # Count entities in this country
-        total_entities = Entity.query.filter_by(country_code=country.country_code).count()
-        verified_entities = Entity.query.filter_by(
-            country_code=country.country_code,
-            is_verified=True
-        ).count()
-        
-        # Count fraud reports
-        fraud_reports = FraudReport.query.join(Entity).filter(
-            Entity.country_code == country.country_code
-        ).all()
-        
-        fraud_count = len(fraud_reports)
-        high_risk_count = len([r for r in fraud_reports if r.risk_level == 'High'])
-        critical_count = len([r for r in fraud_reports if r.risk_level == 'Critical'])
-        
-        # Update country profile
-        country.fraud_count = fraud_count
-        country.high_risk_count = high_risk_count
-        country.critical_count = critical_count
-        country.total_entities = total_entities
-        country.verified_entities = verified_entities
-        country.last_updated = datetime.utcnow()
-        
-        # Calculate trend (simplified)
-        if fraud_count > 0:
-            country.fraud_trend = 'increasing'  # This would be calculated based on historical data
-        else:
-            country.fraud_trend = 'stable'
-    
-    db.session.commit()
+    # The scheduler's country_statistics job runs the same refresh
+    country_stats.refresh_statistics()
     
     return jsonify({'status': 'success', 'message': 'Statistics updated'})
 
+def statistics_entry(country):
+    """One country in the /api/statistics response"""
+    return {
+        'country_code': country.country_code,
+        'country_name': country.country_name,
+        'fraud_count': country.fraud_count,
+        'high_risk_count': country.high_risk_count,
+        'critical_count': country.critical_count,
+        'total_entities': country.total_entities,
+        'verified_entities': country.verified_entities,
+        'fraud_trend': country.fraud_trend
+    }
+
+def heatmap_entry(country):
+    """One country in the /api/heatmap-data response"""
+    # Calculate risk score based on fraud count and risk levels
+    risk_score = country.fraud_count + (country.high_risk_count * 2) + (country.critical_count * 3)
+    
+    return {
+        'country_code': country.country_code,
+        'country_name': country.country_name,
+        'fraud_count': country.fraud_count,
+        'risk_score': risk_score,
+        'coordinates': get_country_coordinates(country.country_code)
+    }
+
 def get_country_coordinates(country_code):
     """Get approximate coordinates for country (simplified)"""
     coordinates = {
@@ -1,54 +1,53 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, current_app, Response
 from flask_login import login_required, current_user
-from models import User, Entity, FraudReport, CountryProfile, db, AuditLog
+from sqlalchemy.orm import joinedload
+from models import User, Entity, FraudReport, CountryProfile, UserActivitySummary, db, AuditLog
+from services import activity_summary, engine_profiles, events, platform_stats, profiling, scheduler, sqlite_mode, user_cache
+from services.query_guard import query_budget
 from datetime import datetime, timedelta
 import bleach
+import json
 
 bp = Blueprint('dashboard', __name__, url_prefix='/dashboard')
 
 @bp.route('/')
+@query_budget(8)
 @login_required
 def index():
     """User dashboard with overview statistics"""
-    # Get user statistics
-    user_reports = FraudReport.query.filter_by(reporter_id=current_user.id).count()
-    recent_reports = FraudReport.query.filter_by(reporter_id=current_user.id).order_by(
-        FraudReport.created_at.desc()
-    ).limit(5).all()
+    # Get user statistics from the summary row
+    summary = activity_summary.get_summary(current_user.id)
+    recent_reports, recent_activity = activity_summary.recent_items(summary)
     
     # Get platform statistics
-    total_entities = Entity.query.count()
-    high_risk_entities = Entity.query.filter(Entity.risk_level.in_(['High', 'Critical'])).count()
-    total_reports = FraudReport.query.count()
-    verified_reports = FraudReport.query.filter_by(status='verified').count()
-    
-    # Get recent activity
-    recent_activity = AuditLog.query.filter_by(user_id=current_user.id).order_by(
-        AuditLog.timestamp.desc()
-    ).limit(10).all()
+    stats = platform_stats.get_stats()
     
     return render_template('dashboard/index.html',
-                         user_reports=user_reports,
+                         user_reports=summary.reports_total,
+                         activity_summary=summary,
                          recent_reports=recent_reports,
-                         total_entities=total_entities,
-                         high_risk_entities=high_risk_entities,
-                         total_reports=total_reports,
-                         verified_reports=verified_reports,
+                         total_entities=stats['total_entities'],
+                         high_risk_entities=stats['high_risk_entities'],
+                         total_reports=stats['total_reports'],
+                         verified_reports=stats['verified_reports'],
                          recent_activity=recent_activity)
 
 @bp.route('/profile')
+@query_budget(2)
 @login_required
 def profile():
     """User profile page"""
     return render_template('dashboard/profile.html', user=current_user)
 
 @bp.route('/settings')
+@query_budget(2)
 @login_required
 def settings():
     """User settings page"""
     return render_template('dashboard/settings.html', user=current_user)
 
 @bp.route('/update-profile', methods=['POST'])
+@query_budget(6)
 @login_required
 def update_profile():
     """Update user profile"""
@@ -68,8 +67,6 @@ def update_profile():
             return redirect(url_for('dashboard.profile'))
         current_user.email = email
     
-    db.session.commit()
-    
     # Create audit log
     audit_log = AuditLog(
         user_id=current_user.id,
@@ -80,11 +77,13 @@ def update_profile():
     )
     db.session.add(audit_log)
     db.session.commit()
+    user_cache.invalidate_user(current_user.id)
     
     flash('Profile updated successfully!', 'success')
     return redirect(url_for('dashboard.profile'))
 
 @bp.route('/change-password', methods=['POST'])
+@query_budget(6)
 @login_required
 def change_password():
     """Change user password"""
@@ -107,7 +106,6 @@ def change_password():
     
     # Update password
     current_user.set_password(new_password)
-    db.session.commit()
     
     # Create audit log
     audit_log = AuditLog(
@@ -124,6 +122,7 @@ def change_password():
     return redirect(url_for('dashboard.settings'))
 
 @bp.route('/admin')
+@query_budget(4)
 @login_required
 def admin():
     """Admin panel for platform management"""
@@ -132,36 +131,84 @@ def admin():
         return redirect(url_for('dashboard.index'))
     
     # Get platform statistics
-    total_users = User.query.count()
-    verified_users = User.query.filter_by(is_verified=True).count()
-    pending_verifications = User.query.filter_by(is_verified=False).count()
-    
-    total_entities = Entity.query.count()
-    verified_entities = Entity.query.filter_by(is_verified=True).count()
-    pending_entities = Entity.query.filter_by(is_verified=False).count()
-    
-    total_reports = FraudReport.query.count()
-    pending_reports = FraudReport.query.filter_by(status='pending').count()
-    verified_reports = FraudReport.query.filter_by(status='verified').count()
+    stats = platform_stats.get_stats()
     
     # Get recent activity
     recent_users = User.query.order_by(User.created_at.desc()).limit(5).all()
     recent_reports = FraudReport.query.order_by(FraudReport.created_at.desc()).limit(5).all()
     
     return render_template('dashboard/admin.html',
-                         total_users=total_users,
-                         verified_users=verified_users,
-                         pending_verifications=pending_verifications,
-                         total_entities=total_entities,
-                         verified_entities=verified_entities,
-                         pending_entities=pending_entities,
-                         total_reports=total_reports,
-                         pending_reports=pending_reports,
-                         verified_reports=verified_reports,
+                         total_users=stats['total_users'],
+                         verified_users=stats['verified_users'],
+                         pending_verifications=stats['pending_verifications'],
+                         total_entities=stats['total_entities'],
+                         verified_entities=stats['verified_entities'],
+                         pending_entities=stats['pending_entities'],
+                         total_reports=stats['total_reports'],
+                         pending_reports=stats['pending_reports'],
+                         verified_reports=stats['verified_reports'],
                          recent_users=recent_users,
                          recent_reports=recent_reports)
 
+@bp.route('/events')
+@query_budget(2)
+@login_required
+def event_stream():
+    """Server-Sent Events stream of moderation activity (admin/moderator only)"""
+    if current_user.role not in ['admin', 'moderator']:
+        return jsonify({'error': 'forbidden'}), 403
+    
+    last_id = request.headers.get('Last-Event-ID', type=int)
+    if last_id is None:
+        last_id = request.args.get('last_id', type=int)
+    
+    if not current_app.config.get('EVENTS_SSE_ENABLED', True):
+        return jsonify({'error': 'Live streams are off here; poll instead'}), 404
+    
+    # Each stream holds a server thread for up to EVENTS_STREAM_MAX_AGE
+    if not events.acquire_stream(current_app.config.get('EVENTS_MAX_STREAMS', 4)):
+        response = jsonify({'error': 'Too many live streams; poll instead'})
+        response.status_code = 503
+        response.headers['Retry-After'] = '30'
+        return response
+    
+    # Resolve everything up front; the generator runs after the request context is gone
+    stream = events.stream(
+        events.get_broker(),
+        last_id,
+        current_app.config.get('EVENTS_STREAM_MAX_AGE', 300),
+        current_app.config.get('EVENTS_HEARTBEAT', 15)
+    )
+    
+    response = Response(stream, mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+    response.call_on_close(events.release_stream)
+    return response
+
+@bp.route('/events/poll')
+@query_budget(4)
+@login_required
+def event_poll():
+    """Live-update polling for pages without a stream: new events and current counts (admin/moderator only)"""
+    if current_user.role not in ['admin', 'moderator']:
+        return jsonify({'error': 'forbidden'}), 403
+    
+    last_id, new_events, resync = events.poll(events.get_broker(), request.args.get('last_id', type=int))
+    
+    return jsonify({
+        'last_id': last_id,
+        'resync': resync,
+        'events': [
+            {'id': event_id, 'type': event_type, 'data': json.loads(data)}
+            for event_id, event_type, data in new_events
+        ],
+        'counts': platform_stats.get_stats()
+    })
+
 @bp.route('/verify-user/<int:user_id>', methods=['POST'])
+@query_budget(8)
 @login_required
 def verify_user(user_id):
     """Verify user account (admin only)"""
@@ -170,8 +217,8 @@ def verify_user(user_id):
         return redirect(url_for('dashboard.admin'))
     
     user = User.query.get_or_404(user_id)
+    was_verified = user.is_verified
     user.is_verified = True
-    db.session.commit()
     
     # Create audit log
     audit_log = AuditLog(
@@ -186,11 +233,113 @@ def verify_user(user_id):
     )
     db.session.add(audit_log)
     db.session.commit()
+    user_cache.invalidate_user(user.id)
+    
+    if not was_verified:
+        events.publish('user_verified', {'id': user.id, 'username': user.username})
     
     flash(f'User {user.username} has been verified!', 'success')
     return redirect(url_for('dashboard.admin'))
 
+def pending_users_page(verification_type, after_id, per_page):
+    """Unverified users after a given id, oldest first, using the queue indexes"""
+    query = User.query.filter(User.is_verified == False)
+    if verification_type:
+        query = query.filter(User.verification_type == verification_type)
+    if after_id:
+        query = query.filter(User.id > after_id)
+    
+    users = query.order_by(User.id).limit(per_page + 1).all()
+    
+    # The extra row only tells us whether another page exists
+    return users[:per_page], len(users) > per_page
+
+@bp.route('/pending-users')
+@query_budget(3)
+@login_required
+def pending_users():
+    """Pending-verification queue with keyset pagination (admin only)"""
+    if current_user.role != 'admin':
+        flash('You do not have permission to access the verification queue.', 'error')
+        return redirect(url_for('dashboard.index'))
+    
+    verification_type = request.args.get('type', '')
+    after_id = request.args.get('after', 0, type=int)
+    per_page = min(
+        request.args.get('per_page', current_app.config.get('PENDING_USERS_PER_PAGE', 50), type=int),
+        current_app.config.get('BULK_VERIFY_MAX', 500)
+    )
+    
+    users, has_more = pending_users_page(verification_type, after_id, max(per_page, 1))
+    
+    return render_template('dashboard/pending_users.html',
+                         users=users,
+                         has_more=has_more,
+                         next_after=users[-1].id if users else None,
+                         verification_type=verification_type,
+                         per_page=per_page)
+
+@bp.route('/verify-users', methods=['POST'])
+@query_budget(8)
+@login_required
+def verify_users():
+    """Verify a batch of user accounts with one UPDATE (admin only)"""
+    if current_user.role != 'admin':
+        flash('You do not have permission to verify users.', 'error')
+        return redirect(url_for('dashboard.admin'))
+    
+    verification_type = request.form.get('type', '')
+    requested_ids = request.form.getlist('user_ids', type=int)
+    if not requested_ids:
+        flash('Select at least one user to verify.', 'error')
+        return redirect(url_for('dashboard.pending_users', type=verification_type))
+    
+    max_batch = current_app.config.get('BULK_VERIFY_MAX', 500)
+    if len(requested_ids) > max_batch:
+        flash(f'Verify at most {max_batch} users at a time.', 'error')
+        return redirect(url_for('dashboard.pending_users', type=verification_type))
+    
+    # Only accounts still pending are flipped and recorded
+    pending = db.session.execute(
+        db.select(User.id, User.username).where(
+            User.id.in_(requested_ids),
+            User.is_verified == False
+        ).order_by(User.id)
+    ).all()
+    user_ids = [row.id for row in pending]
+    
+    if user_ids:
+        db.session.execute(
+            db.update(User).where(User.id.in_(user_ids)).values(is_verified=True),
+            execution_options={'synchronize_session': False}
+        )
+        
+        # Create one audit log for the whole batch
+        audit_log = AuditLog(
+            user_id=current_user.id,
+            action='bulk_verify_users',
+            resource_type='user',
+            ip_address=request.remote_addr,
+            user_agent=request.headers.get('User-Agent'),
+            details=json.dumps({'count': len(user_ids), 'user_ids': user_ids}),
+            timestamp=datetime.utcnow()
+        )
+        db.session.add(audit_log)
+        db.session.commit()
+        
+        for user_id in user_ids:
+            user_cache.invalidate_user(user_id)
+        platform_stats.invalidate()
+        events.publish('users_verified', {
+            'ids': user_ids,
+            'usernames': [row.username for row in pending]
+        })
+    
+    flash(f'{len(user_ids)} users have been verified!', 'success')
+    return redirect(url_for('dashboard.pending_users', type=verification_type))
+
 @bp.route('/delete-user/<int:user_id>', methods=['POST'])
+@query_budget(14)
 @login_required
 def delete_user(user_id):
     """Delete user account (admin only)"""
@@ -206,8 +355,8 @@ def delete_user(user_id):
         return redirect(url_for('dashboard.admin'))
     
     username = user.username
+    UserActivitySummary.query.filter_by(user_id=user.id).delete()
     db.session.delete(user)
-    db.session.commit()
     
     # Create audit log
     audit_log = AuditLog(
@@ -222,11 +371,150 @@ def delete_user(user_id):
     )
     db.session.add(audit_log)
     db.session.commit()
+    user_cache.invalidate_user(user_id)
     
     flash(f'User {username} has been deleted!', 'success')
     return redirect(url_for('dashboard.admin'))
 
+@bp.route('/rescore-risk', methods=['POST'])
+@query_budget(10)
+@login_required
+def rescore_risk():
+    """Recompute entity risk scores from accumulated reports (admin only)"""
+    if current_user.role != 'admin':
+        flash('You do not have permission to rescore entities.', 'error')
+        return redirect(url_for('dashboard.admin'))
+
+    # pandas/numpy are only loaded by workers that actually rescore
+    from services import risk_scoring
+    full = request.form.get('full') == 'on'
+    result = risk_scoring.rescore_entities(full=full)
+
+    # Create audit log
+    audit_log = AuditLog(
+        user_id=current_user.id,
+        action='rescore_risk',
+        resource_type='entity',
+        ip_address=request.remote_addr,
+        user_agent=request.headers.get('User-Agent'),
+        details=f"Mode: {result['mode']}, Entities: {result['entities']}, Reports: {result['reports']}",
+        timestamp=datetime.utcnow()
+    )
+    db.session.add(audit_log)
+    db.session.commit()
+
+    flash(f"Rescored {result['entities']} entities from {result['reports']} reports in {result['seconds']}s.", 'success')
+    return redirect(url_for('dashboard.admin'))
+
+@bp.route('/merge-entities', methods=['POST'])
+@query_budget(8)
+@login_required
+def merge_entities():
+    """Queue the canonical key backfill and duplicate merge (admin only)"""
+    if current_user.role != 'admin':
+        flash('You do not have permission to merge entities.', 'error')
+        return redirect(url_for('dashboard.admin'))
+
+    # Rewrites the entities table, so it runs as the entity_merge job rather than in this request
+    if not scheduler.request_run('entity_merge'):
+        flash('The entity_merge job is disabled; run `flask run-job entity_merge` instead.', 'error')
+        return redirect(url_for('dashboard.admin'))
+
+    # Create audit log
+    audit_log = AuditLog(
+        user_id=current_user.id,
+        action='merge_entities',
+        resource_type='entity',
+        ip_address=request.remote_addr,
+        user_agent=request.headers.get('User-Agent'),
+        details='Queued the entity_merge job',
+        timestamp=datetime.utcnow()
+    )
+    db.session.add(audit_log)
+    db.session.commit()
+
+    flash('Entity merge queued; it runs on the next scheduler poll. See the jobs page for the result.', 'success')
+    return redirect(url_for('dashboard.admin'))
+
+@bp.route('/pool-stats')
+@query_budget(2)
+@login_required
+def pool_stats():
+    """Database connection pool statistics as JSON (admin only)"""
+    if current_user.role != 'admin':
+        return jsonify({'error': 'forbidden'}), 403
+    
+    return jsonify({
+        'profile': current_app.config.get('DB_ENGINE_PROFILE_ACTIVE'),
+        'engines': engine_profiles.pool_stats(),
+        'sqlite_write_queues': sqlite_mode.write_queue_stats()
+    })
+
+@bp.route('/jobs')
+@query_budget(3)
+@login_required
+def scheduled_jobs():
+    """Scheduled job status and recent run history as JSON (admin only)"""
+    if current_user.role != 'admin':
+        return jsonify({'error': 'forbidden'}), 403
+    
+    return jsonify(scheduler.job_status())
+
+@bp.route('/profiling')
+@query_budget(2)
+@login_required
+def profiling_report():
+    """Sampled per-endpoint timings and SQL figures (admin only)"""
+    if current_user.role != 'admin':
+        flash('You do not have permission to view profiling data.', 'error')
+        return redirect(url_for('dashboard.index'))
+    
+    profiler = profiling.get_profiler()
+    return render_template('dashboard/profiling.html',
+                         report=profiler.snapshot() if profiler else None)
+
+@bp.route('/profiling.json')
+@query_budget(2)
+@login_required
+def profiling_dump():
+    """Profiling data as JSON (admin only)"""
+    if current_user.role != 'admin':
+        return jsonify({'error': 'forbidden'}), 403
+    
+    profiler = profiling.get_profiler()
+    if profiler is None:
+        return jsonify({'error': 'profiling disabled'}), 404
+    return jsonify(profiler.snapshot())
+
+@bp.route('/profiling/reset', methods=['POST'])
+@query_budget(5)
+@login_required
+def reset_profiling():
+    """Clear this worker's profiling data (admin only)"""
+    if current_user.role != 'admin':
+        flash('You do not have permission to reset profiling data.', 'error')
+        return redirect(url_for('dashboard.index'))
+    
+    profiler = profiling.get_profiler()
+    if profiler is not None:
+        profiler.reset()
+    
+    # Create audit log
+    audit_log = AuditLog(
+        user_id=current_user.id,
+        action='reset_profiling',
+        ip_address=request.remote_addr,
+        user_agent=request.headers.get('User-Agent'),
+        timestamp=datetime.utcnow()
+    )
+    db.session.add(audit_log)
+    db.session.commit()
+    
+    flash('Profiling data cleared.', 'success')
+    return redirect(url_for('dashboard.profiling_report'))
+
 @bp.route('/audit-logs')
+@query_budget(4)
 @login_required
 def audit_logs():
     """View audit logs (admin only)"""
@@ -237,7 +525,7 @@ def audit_logs():
     page = request.args.get('page', 1, type=int)
     per_page = 50
     
-    logs = AuditLog.query.order_by(AuditLog.timestamp.desc()).paginate(
+    logs = AuditLog.query.options(joinedload(AuditLog.user)).order_by(AuditLog.timestamp.desc()).paginate(
         page=page, 
         per_page=per_page, 
         error_out=False
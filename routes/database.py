@@ -1,28 +1,18 @@
-from flask import Blueprint, render_template, request, jsonify, flash
+from flask import Blueprint, render_template, request, redirect, url_for, jsonify, flash, current_app
 from flask_login import login_required, current_user
+from sqlalchemy.orm import selectinload
 from models import Entity, FraudReport, db, AuditLog
+from services import entity_graph, entity_keys, events, platform_stats
+from services import report_counts as report_counts_service
+from services.query_guard import query_budget
+from services.replicas import use_replica
 from datetime import datetime
 import bleach
 
 bp = Blueprint('database', __name__, url_prefix='/database')
 
-@bp.route('/')
-def index():
-    """Database main page with search and filters"""
-    page = request.args.get('page', 1, type=int)
-    per_page = 20
-    
-    # Get filter parameters
-    search_query = bleach.clean(request.args.get('q', ''))
-    entity_type = request.args.get('entity_type', '')
-    risk_level = request.args.get('risk_level', '')
-    country = request.args.get('country', '')
-    sort_by = request.args.get('sort_by', 'created_at')
-    sort_order = request.args.get('sort_order', 'desc')
-    
-    # Build query
-    query = Entity.query
-    
+def filter_entities(query, search_query, entity_type, risk_level, country):
+    """Apply the search box text and the type, risk and country filters"""
     if search_query:
         query = query.filter(
             db.or_(
@@ -41,6 +31,38 @@ def index():
     if country:
         query = query.filter(Entity.country_code == country)
     
+    return query
+
+def search_result(entity):
+    """One entity in the JSON search (typeahead) response"""
+    return {
+        'id': entity.id,
+        'name': entity.name,
+        'entity_type': entity.entity_type,
+        'risk_level': entity.risk_level,
+        'country_code': entity.country_code,
+        'is_verified': entity.is_verified
+    }
+
+@bp.route('/')
+@query_budget(7)
+@use_replica
+def index():
+    """Database main page with search and filters"""
+    page = request.args.get('page', 1, type=int)
+    per_page = 20
+    
+    # Get filter parameters
+    search_query = bleach.clean(request.args.get('q', ''))
+    entity_type = request.args.get('entity_type', '')
+    risk_level = request.args.get('risk_level', '')
+    country = request.args.get('country', '')
+    sort_by = request.args.get('sort_by', 'created_at')
+    sort_order = request.args.get('sort_order', 'desc')
+    
+    # Build query
+    query = filter_entities(Entity.query, search_query, entity_type, risk_level, country)
+    
     # Apply sorting
     if sort_by == 'name':
         query = query.order_by(Entity.name.asc() if sort_order == 'asc' else Entity.name.desc())
@@ -50,31 +72,29 @@ def index():
     else:
         query = query.order_by(Entity.created_at.desc() if sort_order == 'desc' else Entity.created_at.asc())
     
-    # Paginate results
-    entities = query.paginate(
-        page=page, 
-        per_page=per_page, 
-        error_out=False
-    )
+    # Paginated inside the template's {% cache %} block, so a cached
+    # fragment skips the queries as well as the rendering
+    def load_entities():
+        return query.paginate(page=page, per_page=per_page, error_out=False)
     
     # Get statistics
-    total_entities = Entity.query.count()
-    high_risk_count = Entity.query.filter(Entity.risk_level.in_(['High', 'Critical'])).count()
-    verified_count = Entity.query.filter(Entity.is_verified == True).count()
+    stats = platform_stats.get_stats()
     
     return render_template('database/index.html',
-                         entities=entities,
+                         load_entities=load_entities,
                          search_query=search_query,
                          entity_type=entity_type,
                          risk_level=risk_level,
                          country=country,
                          sort_by=sort_by,
                          sort_order=sort_order,
-                         total_entities=total_entities,
-                         high_risk_count=high_risk_count,
-                         verified_count=verified_count)
+                         total_entities=stats['total_entities'],
+                         high_risk_count=stats['high_risk_entities'],
+                         verified_count=stats['verified_entities'])
 
 @bp.route('/search')
+@query_budget(3)
+@use_replica
 def search():
     """Search entities with AJAX support"""
     search_query = bleach.clean(request.args.get('q', ''))
@@ -83,49 +103,54 @@ def search():
     country = request.args.get('country', '')
     
     # Build query
-    query = Entity.query
-    
-    if search_query:
-        query = query.filter(
-            db.or_(
-                Entity.name.ilike(f'%{search_query}%'),
-                Entity.description.ilike(f'%{search_query}%'),
-                Entity.registration_number.ilike(f'%{search_query}%')
-            )
-        )
-    
-    if entity_type:
-        query = query.filter(Entity.entity_type == entity_type)
-    
-    if risk_level:
-        query = query.filter(Entity.risk_level == risk_level)
-    
-    if country:
-        query = query.filter(Entity.country_code == country)
+    query = filter_entities(Entity.query, search_query, entity_type, risk_level, country)
     
     entities = query.limit(50).all()
     
     if request.headers.get('Content-Type') == 'application/json':
-        return jsonify([{
-            'id': entity.id,
-            'name': entity.name,
-            'entity_type': entity.entity_type,
-            'risk_level': entity.risk_level,
-            'country_code': entity.country_code,
-            'is_verified': entity.is_verified
-        } for entity in entities])
+        return jsonify([search_result(entity) for entity in entities])
     
     return render_template('database/search_results.html', entities=entities)
 
+def entity_reports_page(entity_id, page, per_page):
+    """One page of an entity's reports with reviews and reporters eager-loaded"""
+    reports = FraudReport.query.filter_by(entity_id=entity_id).options(
+        selectinload(FraudReport.reporter),
+        selectinload(FraudReport.reviews)
+    ).order_by(
+        FraudReport.created_at.desc(), FraudReport.id.desc()
+    ).offset((page - 1) * per_page).limit(per_page + 1).all()
+    
+    # The extra row only tells us whether another page exists
+    return reports[:per_page], len(reports) > per_page
+
+def serialize_report(report):
+    """JSON representation of a report row on the entity page"""
+    return {
+        'id': report.id,
+        'title': report.title,
+        'fraud_type': report.fraud_type,
+        'risk_level': report.risk_level,
+        'status': report.status,
+        'summary': report.summary,
+        'created_at': report.created_at.isoformat() if report.created_at else None,
+        'reporter': report.reporter.username if report.reporter and not report.is_anonymous else None,
+        # Public page: moderators stay anonymous, only the outcomes are shown
+        'reviews': [{
+            'review_status': review.review_status,
+            'created_at': review.created_at.isoformat() if review.created_at else None
+        } for review in report.reviews]
+    }
+
 @bp.route('/entity/<int:id>')
+@query_budget(12)
 def entity_detail(id):
     """Detailed view of a specific entity"""
     entity = Entity.query.get_or_404(id)
+    per_page = current_app.config.get('ENTITY_REPORTS_PER_PAGE', 20)
     
-    # Get related fraud reports
-    fraud_reports = FraudReport.query.filter_by(entity_id=id).order_by(FraudReport.created_at.desc()).all()
-    
-    # Log view
+    # Log view first: committing expires loaded rows, so reports loaded
+    # before it would be refreshed one by one while rendering
     if current_user.is_authenticated:
         audit_log = AuditLog(
             user_id=current_user.id,
@@ -139,11 +164,69 @@ def entity_detail(id):
         db.session.add(audit_log)
         db.session.commit()
     
+    # Get the first page of related fraud reports and precomputed counts
+    fraud_reports, has_more_reports = entity_reports_page(id, 1, per_page)
+    report_counts = report_counts_service.counts_for_entity(id)
+    
     return render_template('database/entity_detail.html', 
                          entity=entity, 
-                         fraud_reports=fraud_reports)
+                         fraud_reports=fraud_reports,
+                         has_more_reports=has_more_reports,
+                         report_counts=report_counts)
+
+@bp.route('/entity/<int:id>/reports')
+@query_budget(4)
+@use_replica
+def entity_reports(id):
+    """JSON pages of an entity's fraud reports beyond the first"""
+    entity = Entity.query.get_or_404(id)
+    page = max(request.args.get('page', 2, type=int), 1)
+    per_page = current_app.config.get('ENTITY_REPORTS_PER_PAGE', 20)
+    
+    reports, has_next = entity_reports_page(entity.id, page, per_page)
+    
+    return jsonify({
+        'entity_id': entity.id,
+        'page': page,
+        'has_next': has_next,
+        'reports': [serialize_report(report) for report in reports]
+    })
+
+@bp.route('/entity/<int:id>/network')
+@query_budget(6)
+@use_replica
+def entity_network(id):
+    """JSON k-hop neighbourhood of an entity in the fraud-ring link graph"""
+    entity = Entity.query.get_or_404(id)
+    hops = max(1, min(request.args.get('hops', 2, type=int), 3))
+    max_nodes = current_app.config.get('ENTITY_GRAPH_MAX_NODES', entity_graph.DEFAULT_MAX_NODES)
+    
+    network = entity_graph.get_graph().neighbourhood(entity.id, hops=hops, max_nodes=max_nodes)
+    
+    # Load node details in a single primary-key lookup
+    entities = {
+        e.id: e for e in Entity.query.filter(Entity.id.in_(network['nodes'])).all()
+    }
+    
+    return jsonify({
+        'entity_id': entity.id,
+        'hops': hops,
+        'component_size': network['component_size'],
+        'truncated': network['truncated'],
+        'nodes': [{
+            'id': node_id,
+            'name': entities[node_id].name,
+            'entity_type': entities[node_id].entity_type,
+            'country_code': entities[node_id].country_code,
+            'risk_level': entities[node_id].risk_level,
+            'distance': network['distance'][node_id],
+            'degree': network['degree'][node_id]
+        } for node_id in network['nodes'] if node_id in entities],
+        'edges': network['edges']
+    })
 
 @bp.route('/add-entity', methods=['GET', 'POST'])
+@query_budget(8)
 @login_required
 def add_entity():
     """Add new entity to database"""
@@ -165,9 +248,15 @@ def add_entity():
             flash('Name, entity type, and country are required.', 'error')
             return render_template('database/add_entity.html')
         
+        existing = entity_keys.find_entity(name, entity_type, country_code)
+        if existing:
+            flash('This entity already exists in the database.', 'info')
+            return redirect(url_for('database.entity_detail', id=existing.id))
+        
         # Create entity
         entity = Entity(
             name=name,
+            canonical_key=entity_keys.canonical_entity_key(name),
             entity_type=entity_type,
             country_code=country_code,
             registration_number=registration_number,
@@ -178,7 +267,7 @@ def add_entity():
         )
         
         db.session.add(entity)
-        db.session.commit()
+        db.session.flush()
         
         # Create audit log
         audit_log = AuditLog(
@@ -194,12 +283,15 @@ def add_entity():
         db.session.add(audit_log)
         db.session.commit()
         
+        entity_graph.note_entity_added(entity)
+        
         flash('Entity added successfully! It will be reviewed before being made public.', 'success')
         return redirect(url_for('database.entity_detail', id=entity.id))
     
     return render_template('database/add_entity.html')
 
 @bp.route('/edit-entity/<int:id>', methods=['GET', 'POST'])
+@query_budget(8)
 @login_required
 def edit_entity(id):
     """Edit existing entity"""
@@ -211,17 +303,25 @@ def edit_entity(id):
         return redirect(url_for('database.entity_detail', id=id))
     
     if request.method == 'POST':
-        entity.name = bleach.clean(request.form.get('name', ''))
-        entity.entity_type = request.form.get('entity_type', '')
-        entity.country_code = request.form.get('country_code', '')
+        name = bleach.clean(request.form.get('name', ''))
+        entity_type = request.form.get('entity_type', '')
+        country_code = request.form.get('country_code', '')
+        
+        existing = entity_keys.find_entity(name, entity_type, country_code)
+        if existing and existing.id != entity.id:
+            flash('Another entity with this name already exists.', 'error')
+            return render_template('database/edit_entity.html', entity=entity)
+        
+        entity.name = name
+        entity.canonical_key = entity_keys.canonical_entity_key(name)
+        entity.entity_type = entity_type
+        entity.country_code = country_code
         entity.registration_number = bleach.clean(request.form.get('registration_number', ''))
         entity.contact_info = bleach.clean(request.form.get('contact_info', ''))
         entity.description = bleach.clean(request.form.get('description', ''))
         entity.risk_level = request.form.get('risk_level', 'Low')
         entity.updated_at = datetime.utcnow()
         
-        db.session.commit()
-        
         # Create audit log
         audit_log = AuditLog(
             user_id=current_user.id,
@@ -235,12 +335,16 @@ def edit_entity(id):
         db.session.add(audit_log)
         db.session.commit()
         
+        # Edits can remove shared keys, which needs a rebuild
+        entity_graph.invalidate()
+        
         flash('Entity updated successfully!', 'success')
         return redirect(url_for('database.entity_detail', id=id))
     
     return render_template('database/edit_entity.html', entity=entity)
 
 @bp.route('/verify-entity/<int:id>', methods=['POST'])
+@query_budget(8)
 @login_required
 def verify_entity(id):
     """Verify entity (admin/moderator only)"""
@@ -249,11 +353,10 @@ def verify_entity(id):
         return redirect(url_for('database.entity_detail', id=id))
     
     entity = Entity.query.get_or_404(id)
+    was_verified = entity.is_verified
     entity.is_verified = True
     entity.updated_at = datetime.utcnow()
     
-    db.session.commit()
-    
     # Create audit log
     audit_log = AuditLog(
         user_id=current_user.id,
@@ -267,5 +370,8 @@ def verify_entity(id):
     db.session.add(audit_log)
     db.session.commit()
     
+    if not was_verified:
+        events.publish('entity_verified', {'id': entity.id, 'name': entity.name})
+    
     flash('Entity verified successfully!', 'success')
     return redirect(url_for('database.entity_detail', id=id))
@@ -1,13 +1,33 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from flask_login import login_required, current_user
-from models import FraudReport, Entity, db, AuditLog
+from sqlalchemy.orm import joinedload, selectinload
+from models import FraudReport, Entity, ReportReview, db, AuditLog
+from services import activity_summary, entity_graph, entity_keys, events, metrics, report_counts
+from services.query_guard import query_budget
 from datetime import datetime
 import bleach
 import json
 
 bp = Blueprint('reporting', __name__, url_prefix='/reporting')
 
+FRAUD_TYPES = [
+    'Financial Fraud',
+    'Supply Chain Fraud',
+    'Labor Violations',
+    'Environmental Violations',
+    'Document Forgery',
+    'Bribery and Corruption',
+    'Tax Evasion',
+    'Money Laundering',
+    'Intellectual Property Theft',
+    'Quality Control Fraud',
+    'Safety Violations',
+    'Other'
+]
+
 @bp.route('/submit', methods=['GET', 'POST'])
+# A new entity's first report also creates its count and summary rows in SAVEPOINTs
+@query_budget(24)
 def submit():
     """Anonymous fraud reporting form"""
     if request.method == 'POST':
@@ -35,22 +55,13 @@ def submit():
         # Create or find entity
         entity = None
         if entity_name and entity_type and country_code:
-            entity = Entity.query.filter_by(
-                name=entity_name,
-                entity_type=entity_type,
-                country_code=country_code
-            ).first()
-            
-            if not entity:
-                entity = Entity(
-                    name=entity_name,
-                    entity_type=entity_type,
-                    country_code=country_code,
-                    risk_level=risk_level,
-                    is_verified=False
-                )
-                db.session.add(entity)
-                db.session.flush()  # Get the ID
+            entity, _ = entity_keys.find_or_create_entity(
+                entity_name,
+                entity_type,
+                country_code,
+                risk_level=risk_level,
+                is_verified=False
+            )
         
         # Create fraud report
         fraud_report = FraudReport(
@@ -68,7 +79,9 @@ def submit():
         )
         
         db.session.add(fraud_report)
-        db.session.commit()
+        report_counts.record_report(fraud_report)
+        activity_summary.record_report(fraud_report)
+        db.session.flush()
         
         # Create audit log
         audit_log = AuditLog(
@@ -84,17 +97,31 @@ def submit():
         db.session.add(audit_log)
         db.session.commit()
         
+        entity_graph.note_report_added(fraud_report)
+        metrics.inc('rmgfraud_reports_submitted_total', risk_level=risk_level)
+        events.publish('new_report', {
+            'id': fraud_report.id,
+            'title': fraud_report.title,
+            'fraud_type': fraud_report.fraud_type,
+            'risk_level': fraud_report.risk_level,
+            'status': fraud_report.status,
+            'priority': fraud_report.priority,
+            'created_at': fraud_report.created_at.isoformat()
+        })
+        
         flash('Fraud report submitted successfully! It will be reviewed by our team.', 'success')
         return redirect(url_for('reporting.success'))
     
     return render_template('reporting/submit.html')
 
 @bp.route('/success')
+@query_budget(2)
 def success():
     """Success page after report submission"""
     return render_template('reporting/success.html')
 
 @bp.route('/my-reports')
+@query_budget(4)
 @login_required
 def my_reports():
     """User's submitted reports"""
@@ -112,10 +139,16 @@ def my_reports():
     return render_template('reporting/my_reports.html', reports=reports)
 
 @bp.route('/report/<int:id>')
+@query_budget(5)
 @login_required
 def report_detail(id):
     """Detailed view of a fraud report"""
-    report = FraudReport.query.get_or_404(id)
+    # The page shows the reporter, entity and each review with its reviewer
+    report = FraudReport.query.options(
+        joinedload(FraudReport.reporter),
+        joinedload(FraudReport.entity),
+        selectinload(FraudReport.reviews).selectinload(ReportReview.reviewer)
+    ).filter_by(id=id).first_or_404()
     
     # Check permissions
     if report.reporter_id != current_user.id and current_user.role not in ['admin', 'moderator']:
@@ -135,6 +168,7 @@ def report_detail(id):
                          sources=sources)
 
 @bp.route('/moderate')
+@query_budget(4)
 @login_required
 def moderate():
     """Moderation panel for admin/moderator users"""
@@ -161,6 +195,7 @@ def moderate():
                          status=status)
 
 @bp.route('/review/<int:id>', methods=['POST'])
+@query_budget(16)
 @login_required
 def review_report(id):
     """Review and approve/reject fraud report"""
@@ -177,6 +212,7 @@ def review_report(id):
         return redirect(url_for('reporting.moderate'))
     
     # Update report status
+    old_status = report.status
     if review_status == 'approved':
         report.status = 'verified'
     elif review_status == 'rejected':
@@ -185,9 +221,10 @@ def review_report(id):
         report.status = 'under_review'
     
     report.updated_at = datetime.utcnow()
+    report_counts.record_status_change(report, old_status)
+    activity_summary.record_status_change(report, old_status)
     
     # Create review record
-    from models import ReportReview
     review = ReportReview(
         fraud_report_id=report.id,
         reviewer_id=current_user.id,
@@ -196,7 +233,6 @@ def review_report(id):
     )
     
     db.session.add(review)
-    db.session.commit()
     
     # Create audit log
     audit_log = AuditLog(
@@ -212,25 +248,21 @@ def review_report(id):
     db.session.add(audit_log)
     db.session.commit()
     
+    metrics.inc('rmgfraud_report_reviews_total', status=report.status)
+    events.publish('report_reviewed', {
+        'id': report.id,
+        'title': report.title,
+        'old_status': old_status,
+        'status': report.status,
+        'review_status': review_status,
+        'reviewer': current_user.username
+    })
+    
     flash(f'Report {review_status} successfully!', 'success')
     return redirect(url_for('reporting.moderate'))
 
 @bp.route('/api/fraud-types')
+@query_budget(2)
 def fraud_types():
     """API endpoint for fraud types"""
-    fraud_types = [
-        'Financial Fraud',
-        'Supply Chain Fraud',
-        'Labor Violations',
-        'Environmental Violations',
-        'Document Forgery',
-        'Bribery and Corruption',
-        'Tax Evasion',
-        'Money Laundering',
-        'Intellectual Property Theft',
-        'Quality Control Fraud',
-        'Safety Violations',
-        'Other'
-    ]
-    
-    return jsonify(fraud_types)
+    return jsonify(FRAUD_TYPES)
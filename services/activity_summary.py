@@ -0,0 +1,205 @@
+"""
+Per-user activity summaries
+Keeps report counts by status and the ids of a user's latest reports and
+audit events in one row, so the dashboard needs a primary-key lookup and
+two bounded id scans instead of counting the user's whole history
+"""
+
+from flask import current_app
+from models import AuditLog, FraudReport, User, UserActivitySummary, db
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime
+import json
+
+DEFAULT_RECENT_REPORTS = 5
+DEFAULT_RECENT_AUDITS = 10
+DEFAULT_BATCH_SIZE = 500
+
+STATUSES = ('pending', 'under_review', 'verified', 'rejected')
+
+def _limit(name, default):
+    return current_app.config.get(name, default)
+
+def _prepend(ids_json, new_id, limit):
+    ids = json.loads(ids_json or '[]')
+    return json.dumps(([new_id] + [i for i in ids if i != new_id])[:limit])
+
+def _status_column(status):
+    if status in STATUSES:
+        return getattr(UserActivitySummary, f'reports_{status}')
+    return None
+
+def _fill(summary):
+    """Set a summary row's counts and recent ids from reports and audit logs"""
+    user_id = summary.user_id
+    counts = dict(db.session.execute(
+        db.select(FraudReport.status, db.func.count(FraudReport.id)).where(
+            FraudReport.reporter_id == user_id
+        ).group_by(FraudReport.status)
+    ).all())
+
+    recent_reports = db.session.execute(
+        db.select(FraudReport.id).where(FraudReport.reporter_id == user_id).order_by(
+            FraudReport.created_at.desc()
+        ).limit(_limit('USER_ACTIVITY_RECENT_REPORTS', DEFAULT_RECENT_REPORTS))
+    ).scalars().all()
+
+    recent_audits = db.session.execute(
+        db.select(AuditLog.id).where(AuditLog.user_id == user_id).order_by(
+            AuditLog.timestamp.desc()
+        ).limit(_limit('USER_ACTIVITY_RECENT_AUDITS', DEFAULT_RECENT_AUDITS))
+    ).scalars().all()
+
+    summary.reports_total = sum(counts.values())
+    for status in STATUSES:
+        setattr(summary, f'reports_{status}', counts.get(status, 0))
+    summary.recent_report_ids = json.dumps(list(recent_reports))
+    summary.recent_audit_ids = json.dumps(list(recent_audits))
+    summary.updated_at = datetime.utcnow()
+    return summary
+
+def rebuild_summary(user_id):
+    """Recompute a user's summary row from reports and audit logs"""
+    summary = _fill(db.session.get(UserActivitySummary, user_id) or UserActivitySummary(user_id=user_id))
+    db.session.add(summary)
+    db.session.commit()
+    return summary
+
+def rebuild_summaries(batch_size=None):
+    """Recompute every user's summary row, committing per USER_ACTIVITY_BATCH_SIZE users
+
+    The backfill after upgrading: users without a row get one, so their
+    dashboards stop computing the summary on every load.
+    """
+    batch_size = batch_size or _limit('USER_ACTIVITY_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+    rebuilt = 0
+    last_id = 0
+    while True:
+        user_ids = db.session.scalars(
+            db.select(User.id).where(User.id > last_id).order_by(User.id).limit(batch_size)
+        ).all()
+        if not user_ids:
+            break
+        last_id = user_ids[-1]
+
+        existing = {
+            summary.user_id: summary
+            for summary in UserActivitySummary.query.filter(UserActivitySummary.user_id.in_(user_ids))
+        }
+        for user_id in user_ids:
+            db.session.add(_fill(existing.get(user_id) or UserActivitySummary(user_id=user_id)))
+        db.session.commit()
+        rebuilt += len(user_ids)
+    return rebuilt
+
+def get_summary(user_id):
+    """The user's summary row; computed without saving when the user has none yet
+
+    Rows are created by the write paths (record_report, rebuild_summary) and
+    by `flask rebuild-activity-summaries`, so a dashboard GET never writes.
+    """
+    summary = db.session.get(UserActivitySummary, user_id)
+    if summary is None:
+        summary = _fill(UserActivitySummary(user_id=user_id))
+    return summary
+
+def _locked_summary(user_id):
+    # Row lock held to commit, so concurrent submissions update the
+    # recent-id list one after another instead of overwriting each other
+    return db.session.get(UserActivitySummary, user_id, with_for_update=True, populate_existing=True)
+
+def record_report(report):
+    """Count a new report for its reporter (call before committing it)"""
+    if not report.reporter_id:
+        return
+    summary = _locked_summary(report.reporter_id)
+    if summary is None:
+        try:
+            with db.session.begin_nested():
+                # Built from the reporter's rows, which include this report
+                db.session.add(_fill(UserActivitySummary(user_id=report.reporter_id)))
+            return
+        except IntegrityError:
+            # A concurrent request created the row first; count on top of it
+            summary = _locked_summary(report.reporter_id)
+
+    summary.reports_total = UserActivitySummary.reports_total + 1
+    column = _status_column(report.status or 'pending')
+    if column is not None:
+        setattr(summary, column.key, column + 1)
+    db.session.flush()
+    summary.recent_report_ids = _prepend(
+        summary.recent_report_ids,
+        report.id,
+        _limit('USER_ACTIVITY_RECENT_REPORTS', DEFAULT_RECENT_REPORTS)
+    )
+
+def record_status_change(report, old_status):
+    """Move a report between the reporter's status counters"""
+    if not report.reporter_id or old_status == report.status:
+        return
+
+    values = {}
+    old_column, new_column = _status_column(old_status), _status_column(report.status)
+    if old_column is not None:
+        values[old_column.key] = old_column - 1
+    if new_column is not None:
+        values[new_column.key] = new_column + 1
+    if values:
+        db.session.execute(
+            db.update(UserActivitySummary).where(
+                UserActivitySummary.user_id == report.reporter_id
+            ).values(**values)
+        )
+
+def _after_audit_insert(mapper, connection, target):
+    """Push a new audit row onto its user's recent activity list"""
+    if not target.user_id:
+        return
+
+    table = UserActivitySummary.__table__
+    row = connection.execute(
+        db.select(table.c.recent_audit_ids).where(table.c.user_id == target.user_id).with_for_update()
+    ).first()
+    if row is None:
+        return
+
+    connection.execute(
+        table.update().where(table.c.user_id == target.user_id).values(
+            recent_audit_ids=_prepend(
+                row[0],
+                target.id,
+                _limit('USER_ACTIVITY_RECENT_AUDITS', DEFAULT_RECENT_AUDITS)
+            )
+        )
+    )
+
+def register_listeners():
+    """Hook audit log inserts; audit rows are written from every blueprint"""
+    if not db.event.contains(AuditLog, 'after_insert', _after_audit_insert):
+        db.event.listen(AuditLog, 'after_insert', _after_audit_insert)
+
+def init_app(app):
+    """Hook audit log inserts and add `flask rebuild-activity-summaries`, the backfill after upgrading"""
+    register_listeners()
+
+    @app.cli.command('rebuild-activity-summaries')
+    def rebuild_activity_summaries_command():
+        """Recompute every user's dashboard summary from reports and audit logs"""
+        with app.app_context():
+            users = rebuild_summaries()
+        print(f"Rebuilt activity summaries for {users} users.")
+
+def recent_items(summary):
+    """Load the reports and audit rows the summary points at"""
+    report_ids = json.loads(summary.recent_report_ids or '[]')
+    audit_ids = json.loads(summary.recent_audit_ids or '[]')
+
+    reports = FraudReport.query.filter(FraudReport.id.in_(report_ids)).order_by(
+        FraudReport.created_at.desc()
+    ).all() if report_ids else []
+    activity = AuditLog.query.filter(AuditLog.id.in_(audit_ids)).order_by(
+        AuditLog.timestamp.desc()
+    ).all() if audit_ids else []
+
+    return reports, activity
@@ -0,0 +1,179 @@
+"""
+Static assets and response compression
+`flask build-assets` copies every file under static/ to static/dist with a
+content hash in its name, plus gzip and (when the brotli package is
+installed) brotli variants, and writes a manifest. With the manifest in
+place url_for('static', ...) resolves to the hashed names, which are served
+precompressed by Accept-Encoding with immutable caching. Dynamic HTML/JSON
+responses above COMPRESS_MIN_SIZE are compressed on the fly
+"""
+
+from flask import current_app, request, send_from_directory
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+
+DEFAULT_MAX_AGE = 31536000
+DEFAULT_MIN_SIZE = 1024
+DEFAULT_LEVEL = 6
+DEFAULT_BR_QUALITY = 4
+
+# Precompressed at build time; images and fonts are already compressed
+PRECOMPRESS_EXTENSIONS = ('.css', '.js', '.svg', '.json', '.txt', '.map', '.html')
+
+COMPRESS_MIMETYPES = (
+    'text/html', 'text/css', 'text/plain', 'text/csv', 'application/json',
+    'application/javascript', 'image/svg+xml'
+)
+
+# Preferred first
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+_brotli = None
+
+def brotli_module():
+    """The brotli package, or None when it is not installed"""
+    global _brotli
+    if _brotli is None:
+        try:
+            import brotli
+            _brotli = brotli
+        except ImportError:
+            _brotli = False
+    return _brotli or None
+
+def build(static_folder):
+    """Write hashed and precompressed copies of static_folder to its dist/ and return the manifest"""
+    dist = os.path.join(static_folder, DIST_DIR)
+    shutil.rmtree(dist, ignore_errors=True)
+    brotli = brotli_module()
+    files = {}
+
+    for dirpath, dirnames, filenames in os.walk(static_folder):
+        dirnames[:] = sorted(name for name in dirnames if os.path.join(dirpath, name) != dist)
+        for filename in sorted(filenames):
+            source = os.path.join(dirpath, filename)
+            name = os.path.relpath(source, static_folder).replace(os.sep, '/')
+            with open(source, 'rb') as f:
+                data = f.read()
+
+            stem, extension = os.path.splitext(name)
+            hashed = f'{DIST_DIR}/{stem}.{hashlib.sha256(data).hexdigest()[:12]}{extension}'
+            target = os.path.join(static_folder, hashed)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, 'wb') as f:
+                f.write(data)
+
+            variants = {}
+            if extension in PRECOMPRESS_EXTENSIONS:
+                # mtime=0 keeps the .gz bytes identical between builds
+                variants['gzip'] = gzip.compress(data, compresslevel=9, mtime=0)
+                if brotli:
+                    variants['br'] = brotli.compress(data, quality=11)
+
+            encodings = []
+            for encoding, suffix in ENCODINGS:
+                compressed = variants.get(encoding)
+                if compressed is not None and len(compressed) < len(data):
+                    with open(target + suffix, 'wb') as f:
+                        f.write(compressed)
+                    encodings.append(encoding)
+
+            files[name] = {'path': hashed, 'encodings': encodings}
+
+    manifest = {'files': files}
+    with open(os.path.join(dist, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+def load_manifest(static_folder):
+    """The built manifest's files, or {} before `flask build-assets` has run"""
+    try:
+        with open(os.path.join(static_folder, DIST_DIR, MANIFEST_NAME)) as f:
+            return json.load(f)['files']
+    except (OSError, ValueError, KeyError):
+        return {}
+
+def accepted_encoding(encodings):
+    """First of encodings the client accepts"""
+    for encoding in encodings:
+        if request.accept_encodings[encoding]:
+            return encoding
+    return None
+
+def compress(data, encoding):
+    """data compressed at the on-the-fly level for encoding"""
+    if encoding == 'br':
+        quality = current_app.config.get('COMPRESS_BR_QUALITY', DEFAULT_BR_QUALITY)
+        return brotli_module().compress(data, quality=quality)
+    return gzip.compress(data, compresslevel=current_app.config.get('COMPRESS_LEVEL', DEFAULT_LEVEL))
+
+def init_app(app):
+    """Resolve and serve fingerprinted assets, compress dynamic responses, add `flask build-assets`"""
+    manifest = load_manifest(app.static_folder) if app.config.get('ASSETS_FINGERPRINT', True) else {}
+    app.extensions['assets_manifest'] = manifest
+    hashed_files = {entry['path']: entry['encodings'] for entry in manifest.values()}
+
+    if manifest:
+        @app.url_defaults
+        def fingerprint_static(endpoint, values):
+            if endpoint == 'static' and values.get('filename') in manifest:
+                values['filename'] = manifest[values['filename']]['path']
+
+    def serve_static(filename):
+        encodings = hashed_files.get(filename)
+        if encodings is None:
+            return app.send_static_file(filename)
+
+        encoding = accepted_encoding(encodings)
+        suffix = dict(ENCODINGS).get(encoding, '')
+        response = send_from_directory(
+            app.static_folder, filename + suffix,
+            mimetype=mimetypes.guess_type(filename)[0],
+            max_age=app.config.get('ASSETS_MAX_AGE', DEFAULT_MAX_AGE)
+        )
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        if encodings:
+            response.vary.add('Accept-Encoding')
+        # The name changes with the content, so it never needs revalidating
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
+
+    app.view_functions['static'] = serve_static
+
+    if app.config.get('COMPRESS_ENABLED', True):
+        min_size = app.config.get('COMPRESS_MIN_SIZE', DEFAULT_MIN_SIZE)
+        compressible = set(app.config.get('COMPRESS_MIMETYPES', COMPRESS_MIMETYPES))
+
+        @app.after_request
+        def compress_response(response):
+            if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+                    or 'Content-Encoding' in response.headers or response.mimetype not in compressible
+                    or request.method == 'HEAD'):
+                return response
+
+            data = response.get_data()
+            if len(data) < min_size:
+                return response
+
+            response.vary.add('Accept-Encoding')
+            encoding = accepted_encoding(('br', 'gzip') if brotli_module() else ('gzip',))
+            if encoding:
+                response.set_data(compress(data, encoding))
+                response.headers['Content-Encoding'] = encoding
+            return response
+
+    @app.cli.command('build-assets')
+    def build_assets_command():
+        """Fingerprint and precompress static/ into static/dist"""
+        manifest = build(app.static_folder)
+        print(f"Built {len(manifest['files'])} assets into {os.path.join(app.static_folder, DIST_DIR)}"
+              f"{'' if brotli_module() else ' (gzip only; install brotli for .br)'}.")
@@ -0,0 +1,212 @@
+"""
+Async serving path for the read-only JSON APIs
+An ASGI app that answers the country statistics and heatmap, the JSON
+entity search (typeahead) and the fraud type list from async SQLAlchemy
+sessions on a small bounded pool, and hands every other request to the
+Flask app on a WSGI thread pool. Payloads come from the same builders as
+the Flask views, so both paths return identical JSON and draw on the same
+rate-limit buckets. Server-Sent Event streams get their own thread pool so
+long-lived streams cannot starve ordinary Flask requests
+"""
+
+from a2wsgi import WSGIMiddleware
+from flask import url_for
+from sqlalchemy import select
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from urllib.parse import parse_qsl
+import bleach
+import gzip
+import time
+
+from extensions import db
+from models import CountryProfile, Entity
+from routes.country import heatmap_entry, statistics_entry
+from routes.database import filter_entities, search_result
+from routes.reporting import FRAUD_TYPES
+from services import engine_profiles, metrics, replicas
+from services.rate_limit import client_address
+
+ASYNC_DRIVERS = {'postgresql': 'postgresql+asyncpg', 'sqlite': 'sqlite+aiosqlite'}
+
+SEARCH_LIMIT = 50
+
+# Long-lived Flask responses, kept off the shared WSGI threads
+STREAM_ENDPOINTS = ('dashboard.event_stream',)
+
+def async_url(url):
+    """The async-driver form of a sync SQLAlchemy URL"""
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f'No async driver for {backend!r}; expected one of {tuple(ASYNC_DRIVERS)}')
+    if backend == 'sqlite' and url.database in (None, '', ':memory:'):
+        raise ValueError('In-memory SQLite is private to one connection; the async API needs a database file')
+
+    url = url.set(drivername=ASYNC_DRIVERS[backend])
+    sslmode = url.query.get('sslmode')
+    if backend == 'postgresql' and sslmode:
+        # asyncpg takes ssl=, not libpq's sslmode=
+        url = url.difference_update_query(['sslmode']).update_query_dict({'ssl': sslmode})
+    return url
+
+def engine_options(url, config):
+    """create_async_engine() options; the pool bounds concurrent queries per worker"""
+    options = {
+        'pool_size': config.get('ASYNC_DB_POOL_SIZE', 10),
+        'max_overflow': config.get('ASYNC_DB_MAX_OVERFLOW', 0),
+        'pool_timeout': config.get('ASYNC_DB_POOL_TIMEOUT', 5),
+        'pool_recycle': config.get('DB_POOL_RECYCLE', 1800),
+        'pool_pre_ping': True
+    }
+    if url.get_backend_name() == 'sqlite':
+        options['connect_args'] = {'timeout': config.get('SQLITE_BUSY_TIMEOUT', 15)}
+    return options
+
+def _query_args(scope):
+    # First value per name, like request.args.get()
+    args = {}
+    for name, value in parse_qsl(scope.get('query_string', b'').decode('latin-1'), keep_blank_values=True):
+        args.setdefault(name, value)
+    return args
+
+def _header(scope, name):
+    for key, value in scope.get('headers', ()):
+        if key == name:
+            return value.decode('latin-1')
+    return ''
+
+class AsyncAPI:
+    """ASGI app: async JSON endpoints in front of the Flask WSGI app"""
+
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        config = flask_app.config
+        self.wsgi = WSGIMiddleware(flask_app, workers=config.get('ASGI_WSGI_THREADS', 8))
+        self.streams = WSGIMiddleware(flask_app, workers=config.get('ASGI_STREAM_THREADS', 32))
+        self.limiter = flask_app.extensions.get('rate_limiter')
+        self.proxy_hops = config.get('PROXY_FIX_X_FOR', 0)
+
+        # Reads go to the replica when there is one, as for @use_replica views
+        lazy = flask_app.extensions.get('lazy_blueprints')
+        if lazy is not None:
+            lazy.load()
+        with flask_app.app_context():
+            sync_engine = db.engines.get(replicas.REPLICA_BIND) or db.engine
+            url = async_url(sync_engine.url)
+        self.engine = create_async_engine(url, **engine_options(url, config))
+        engine_profiles.instrument(self.engine.sync_engine, 'async')
+        self.sessions = async_sessionmaker(self.engine, expire_on_commit=False)
+
+        handlers = {
+            'country.api_statistics': self.country_statistics,
+            'country.api_heatmap_data': self.heatmap_data,
+            'database.search': self.search,
+            'reporting.fraud_types': self.fraud_types
+        }
+        with flask_app.test_request_context():
+            self.routes = {url_for(endpoint): (endpoint, handler) for endpoint, handler in handlers.items()}
+            self.stream_paths = {url_for(endpoint) for endpoint in STREAM_ENDPOINTS}
+
+        self.compress_min_size = config.get('COMPRESS_MIN_SIZE', 1024) if config.get('COMPRESS_ENABLED', True) else None
+        self.compress_level = config.get('COMPRESS_LEVEL', 6)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+
+        path = scope.get('path')
+        if scope['type'] == 'http' and path in self.stream_paths:
+            return await self.streams(scope, receive, send)
+        route = self.routes.get(path) if scope['type'] == 'http' else None
+        if route is None or scope['method'] not in ('GET', 'HEAD'):
+            return await self.wsgi(scope, receive, send)
+
+        endpoint, handler = route
+        if endpoint == 'database.search' and _header(scope, b'content-type') != 'application/json':
+            # The HTML search results page is rendered by Flask
+            return await self.wsgi(scope, receive, send)
+
+        started = time.perf_counter()
+        headers = []
+        allowed = True
+        if self.limiter is not None and self.limiter.backend is not None:
+            # Same buckets and client address as RateLimiter.check behind ProxyFix
+            client = client_address(
+                (scope.get('client') or ('',))[0], _header(scope, b'x-forwarded-for'), self.proxy_hops
+            )
+            limited = self.limiter.consume(endpoint, scope['method'], client)
+            if limited is not None:
+                allowed, retry_after, capacity = limited
+
+        if not allowed:
+            status, payload = 429, {'error': 'rate_limited', 'retry_after': retry_after}
+            headers = [(b'retry-after', str(retry_after).encode()), (b'x-ratelimit-limit', str(capacity).encode())]
+        else:
+            try:
+                status, payload = 200, await handler(scope, _query_args(scope))
+            except PoolTimeoutError:
+                # Every pooled connection is busy; shed load instead of queueing
+                status, payload = 503, {'error': 'Service busy, retry shortly'}
+                headers = [(b'retry-after', b'1')]
+
+        await self.send_json(scope, send, status, payload, headers)
+        metrics.observe(
+            'rmgfraud_http_request_duration_seconds',
+            time.perf_counter() - started,
+            blueprint=endpoint.split('.')[0],
+            endpoint=endpoint,
+            method=scope['method'],
+            status=status
+        )
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.engine.dispose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def send_json(self, scope, send, status, payload, extra_headers=()):
+        # Same encoder as jsonify()
+        body = (self.flask_app.json.dumps(payload) + '\n').encode()
+        headers = [(b'content-type', b'application/json'), (b'vary', b'Accept-Encoding'), *extra_headers]
+        if (self.compress_min_size is not None and len(body) >= self.compress_min_size
+                and 'gzip' in _header(scope, b'accept-encoding')):
+            body = gzip.compress(body, compresslevel=self.compress_level)
+            headers.append((b'content-encoding', b'gzip'))
+        headers.append((b'content-length', str(len(body)).encode()))
+
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': b'' if scope['method'] == 'HEAD' else body})
+
+    async def country_statistics(self, scope, args):
+        async with self.sessions() as session:
+            countries = (await session.scalars(select(CountryProfile))).all()
+        return [statistics_entry(country) for country in countries]
+
+    async def heatmap_data(self, scope, args):
+        async with self.sessions() as session:
+            countries = (await session.scalars(select(CountryProfile))).all()
+        return [heatmap_entry(country) for country in countries]
+
+    async def search(self, scope, args):
+        query = filter_entities(
+            select(Entity),
+            bleach.clean(args.get('q', '')),
+            args.get('entity_type', ''),
+            args.get('risk_level', ''),
+            args.get('country', '')
+        )
+        async with self.sessions() as session:
+            entities = (await session.scalars(query.limit(SEARCH_LIMIT))).all()
+        return [search_result(entity) for entity in entities]
+
+    async def fraud_types(self, scope, args):
+        return FRAUD_TYPES
+
+def create_asgi_app(flask_app):
+    """Wrap a Flask app from create_app() with the async JSON endpoints"""
+    return AsyncAPI(flask_app)
@@ -0,0 +1,193 @@
+"""
+Two-tier TTL cache
+An in-process LRU in front of an optional shared backend (a directory of
+pickled entries) so every worker on a host can reuse one computed value
+"""
+
+from flask import current_app
+from collections import OrderedDict
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+import time
+
+MISSING = object()
+
+DEFAULT_MAX_ENTRIES = 2048
+
+_create_lock = threading.Lock()
+
+class MemoryCache:
+    """Thread-safe LRU with per-entry expiry"""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] <= now:
+                self.misses += 1
+                return MISSING
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, ttl, expires_at=None):
+        with self.lock:
+            self.entries[key] = (expires_at or time.time() + ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+class FileCache:
+    """Entries as pickle files in a shared directory, replaced atomically"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(key.encode()).hexdigest() + '.cache')
+
+    def get_entry(self, key):
+        """Return (expires_at, value) or MISSING"""
+        try:
+            with open(self._path(key), 'rb') as handle:
+                expires_at, value = pickle.load(handle)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            self.misses += 1
+            return MISSING
+        if expires_at <= time.time():
+            self.misses += 1
+            return MISSING
+        self.hits += 1
+        return expires_at, value
+
+    def set(self, key, value, ttl, expires_at=None):
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as handle:
+                pickle.dump((expires_at or time.time() + ttl, value), handle, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, self._path(key))
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            if name.endswith('.cache'):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+
+class TwoTierCache:
+    """Local LRU backed by an optional shared FileCache"""
+
+    def __init__(self, local, shared=None):
+        self.local = local
+        self.shared = shared
+
+    def get(self, key):
+        value = self.local.get(key)
+        if value is not MISSING or self.shared is None:
+            return value
+
+        entry = self.shared.get_entry(key)
+        if entry is MISSING:
+            return MISSING
+        # Keep the shared expiry so workers agree on when the value goes stale
+        self.local.set(key, entry[1], 0, expires_at=entry[0])
+        return entry[1]
+
+    def get_shared(self, key):
+        """Read past the local LRU, for small values other workers change"""
+        if self.shared is None:
+            return self.local.get(key)
+        entry = self.shared.get_entry(key)
+        return MISSING if entry is MISSING else entry[1]
+
+    def set(self, key, value, ttl):
+        expires_at = time.time() + ttl
+        self.local.set(key, value, ttl, expires_at=expires_at)
+        if self.shared is not None:
+            self.shared.set(key, value, ttl, expires_at=expires_at)
+
+    def get_or_set(self, key, ttl, compute):
+        """Return the cached value, computing and storing it on a miss"""
+        value = self.get(key)
+        if value is MISSING:
+            value = compute()
+            self.set(key, value, ttl)
+        return value
+
+    def delete(self, key):
+        self.local.delete(key)
+        if self.shared is not None:
+            self.shared.delete(key)
+
+    def clear(self):
+        self.local.clear()
+        if self.shared is not None:
+            self.shared.clear()
+
+    def stats(self):
+        """Hit/miss counters per tier"""
+        stats = {'local_hits': self.local.hits, 'local_misses': self.local.misses}
+        if self.shared is not None:
+            stats.update(shared_hits=self.shared.hits, shared_misses=self.shared.misses)
+        return stats
+
+def create_cache(storage_url, max_entries=DEFAULT_MAX_ENTRIES):
+    """memory:// for a per-worker cache, file:///path to share across workers"""
+    shared = None
+    if storage_url.startswith('file://'):
+        shared = FileCache(storage_url[len('file://'):])
+    return TwoTierCache(MemoryCache(max_entries), shared)
+
+def init_app(app):
+    """Resolve CACHE_STORAGE_URL: unset, a directory under instance/, or memory:// under serverless"""
+    if not app.config.get('CACHE_STORAGE_URL'):
+        serverless = app.config.get('DB_ENGINE_PROFILE_ACTIVE') == 'serverless'
+        app.config['CACHE_STORAGE_URL'] = 'memory://' if serverless else (
+            'file://' + os.path.join(app.instance_path, 'cache')
+        )
+
+def get_cache():
+    """The application's cache, created on first use"""
+    app = current_app._get_current_object()
+    cache = app.extensions.get('cache')
+    if cache is None:
+        with _create_lock:
+            cache = app.extensions.get('cache')
+            if cache is None:
+                cache = create_cache(
+                    app.config.get('CACHE_STORAGE_URL', 'memory://'),
+                    app.config.get('CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES)
+                )
+                app.extensions['cache'] = cache
+    return cache
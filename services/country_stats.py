@@ -0,0 +1,52 @@
+"""
+Country statistics refresh
+Recomputes every country profile's entity and report counts from two
+grouped aggregates; run by the scheduler and by /country/update-statistics
+"""
+
+from models import CountryProfile, Entity, FraudReport, db
+from datetime import datetime
+
+def refresh_statistics():
+    """Rewrite the counts on every country profile and return how many were updated"""
+    countries = CountryProfile.query.all()
+    
+    # Entity and report counts for every country in two grouped queries
+    entity_counts = {
+        country_code: (total, verified or 0)
+        for country_code, total, verified in db.session.query(
+            Entity.country_code,
+            db.func.count(Entity.id),
+            db.func.sum(db.case((Entity.is_verified.is_(True), 1), else_=0))
+        ).group_by(Entity.country_code)
+    }
+    report_counts = {
+        country_code: (total, high or 0, critical or 0)
+        for country_code, total, high, critical in db.session.query(
+            Entity.country_code,
+            db.func.count(FraudReport.id),
+            db.func.sum(db.case((FraudReport.risk_level == 'High', 1), else_=0)),
+            db.func.sum(db.case((FraudReport.risk_level == 'Critical', 1), else_=0))
+        ).join(Entity).group_by(Entity.country_code)
+    }
+    
+    for country in countries:
+        total_entities, verified_entities = entity_counts.get(country.country_code, (0, 0))
+        fraud_count, high_risk_count, critical_count = report_counts.get(country.country_code, (0, 0, 0))
+        
+        # Update country profile
+        country.fraud_count = fraud_count
+        country.high_risk_count = high_risk_count
+        country.critical_count = critical_count
+        country.total_entities = total_entities
+        country.verified_entities = verified_entities
+        country.last_updated = datetime.utcnow()
+        
+        # Calculate trend (simplified)
+        if fraud_count > 0:
+            country.fraud_trend = 'increasing'  # This would be calculated based on historical data
+        else:
+            country.fraud_trend = 'stable'
+    
+    db.session.commit()
+    return len(countries)
@@ -0,0 +1,177 @@
+"""
+Database engine profiles and pool statistics
+Chooses pooling per deployment (serverless, long-lived workers, SQLite)
+from DB_ENGINE_PROFILE and records checkout, overflow and wait-time
+figures for every engine the app creates
+"""
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import NullPool, QueuePool
+import os
+import threading
+import time
+
+PROFILES = ('serverless', 'worker', 'sqlite')
+
+# Stats per engine name ('default' or the bind key)
+_stats = {}
+_stats_lock = threading.Lock()
+
+class PoolStats:
+    """Counters for one engine's pool"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidated = 0
+        self.waits = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.timeouts = 0
+
+    def record_wait(self, seconds, timed_out=False):
+        with self.lock:
+            self.waits += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            if timed_out:
+                self.timeouts += 1
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            timed_out = True
+            raise
+        finally:
+            stats = getattr(self, 'rmg_stats', None)
+            if stats is not None:
+                stats.record_wait(time.perf_counter() - started, timed_out)
+
+def detect_profile(uri):
+    """sqlite for SQLite URLs, serverless on Vercel/Lambda, else worker"""
+    if make_url(uri).get_backend_name() == 'sqlite':
+        return 'sqlite'
+    if os.environ.get('VERCEL') or os.environ.get('AWS_LAMBDA_FUNCTION_NAME'):
+        return 'serverless'
+    return 'worker'
+
+def engine_options(profile, uri, config):
+    """SQLAlchemy create_engine() options for a profile"""
+    if profile == 'serverless':
+        # No pool in the function; an external pooler (PgBouncer, Neon,
+        # Supabase) in front of Postgres absorbs the connection churn
+        return {'poolclass': NullPool}
+
+    if profile == 'sqlite':
+        url = make_url(uri)
+        if url.database in (None, '', ':memory:'):
+            # Flask-SQLAlchemy keeps in-memory databases on one StaticPool connection
+            return {}
+        return {
+            'poolclass': TimedQueuePool,
+            'pool_size': config.get('DB_POOL_SIZE', 5),
+            'max_overflow': config.get('DB_MAX_OVERFLOW', 10),
+            'pool_timeout': config.get('DB_POOL_TIMEOUT', 30),
+            'connect_args': {'timeout': config.get('SQLITE_BUSY_TIMEOUT', 15), 'check_same_thread': False}
+        }
+
+    return {
+        'poolclass': TimedQueuePool,
+        'pool_size': config.get('DB_POOL_SIZE', 5),
+        'max_overflow': config.get('DB_MAX_OVERFLOW', 10),
+        'pool_timeout': config.get('DB_POOL_TIMEOUT', 30),
+        'pool_recycle': config.get('DB_POOL_RECYCLE', 1800),
+        'pool_pre_ping': True
+    }
+
+def configure(app):
+    """Fill SQLALCHEMY_ENGINE_OPTIONS from the profile; call before db.init_app"""
+    config = app.config
+    profile = config.get('DB_ENGINE_PROFILE') or 'auto'
+
+    if profile == 'auto':
+        profile = detect_profile(config['SQLALCHEMY_DATABASE_URI'])
+    elif profile not in PROFILES:
+        raise ValueError(f'Unknown DB_ENGINE_PROFILE {profile!r}; expected auto or one of {PROFILES}')
+
+    if profile == 'serverless' and config.get('DATABASE_POOLER_URL'):
+        config['SQLALCHEMY_DATABASE_URI'] = config['DATABASE_POOLER_URL']
+
+    options = engine_options(profile, config['SQLALCHEMY_DATABASE_URI'], config)
+    # Explicit SQLALCHEMY_ENGINE_OPTIONS still win
+    options.update(config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+    config['DB_ENGINE_PROFILE_ACTIVE'] = profile
+    return profile
+
+def instrument(engine, name):
+    """Attach pool counters to an engine"""
+    stats = PoolStats()
+    with _stats_lock:
+        _stats[name] = (engine, stats)
+    engine.pool.rmg_stats = stats
+
+    @event.listens_for(engine, 'connect')
+    def on_connect(dbapi_connection, connection_record):
+        stats.connects += 1
+
+    @event.listens_for(engine, 'checkout')
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        stats.checkouts += 1
+
+    @event.listens_for(engine, 'checkin')
+    def on_checkin(dbapi_connection, connection_record):
+        stats.checkins += 1
+
+    @event.listens_for(engine, 'invalidate')
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        stats.invalidated += 1
+
+def instrument_all(engines):
+    """Instrument every engine Flask-SQLAlchemy created (db.engines)"""
+    for key, engine in engines.items():
+        instrument(engine, key or 'default')
+
+def pool_stats():
+    """Snapshot of every instrumented engine's pool"""
+    snapshot = {}
+    with _stats_lock:
+        items = list(_stats.items())
+
+    for name, (engine, stats) in items:
+        pool = engine.pool
+        # A recreated pool (after dispose) keeps counting into the same stats
+        if getattr(pool, 'rmg_stats', None) is not stats:
+            pool.rmg_stats = stats
+
+        entry = {
+            'pool': type(pool).__name__,
+            'connects': stats.connects,
+            'checkouts': stats.checkouts,
+            'checked_out': stats.checkouts - stats.checkins,
+            'invalidated': stats.invalidated,
+            'waits': stats.waits,
+            'wait_total_ms': round(stats.wait_total * 1000, 3),
+            'wait_avg_ms': round(stats.wait_total * 1000 / stats.waits, 3) if stats.waits else 0.0,
+            'wait_max_ms': round(stats.wait_max * 1000, 3),
+            'timeouts': stats.timeouts
+        }
+        if isinstance(pool, QueuePool):
+            entry.update(
+                size=pool.size(),
+                checked_in=pool.checkedin(),
+                overflow=max(pool.overflow(), 0),
+                max_overflow=pool._max_overflow
+            )
+        snapshot[name] = entry
+    return snapshot
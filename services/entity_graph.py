@@ -0,0 +1,367 @@
+"""
+Entity link graph for fraud-ring detection
+Connects entities that share registration numbers, contact details or
+report sources, stored as a CSR adjacency over numpy arrays
+"""
+
+from flask import current_app
+from models import Entity, FraudReport, db
+from collections import defaultdict
+import threading
+import json
+import time
+import re
+
+# Edge kinds (bit flags, an edge can carry several)
+LINK_REGISTRATION = 1
+LINK_CONTACT = 2
+LINK_CO_REPORTED = 4
+
+LINK_NAMES = {
+    LINK_REGISTRATION: 'registration_number',
+    LINK_CONTACT: 'contact_info',
+    LINK_CO_REPORTED: 'co_reported'
+}
+
+DEFAULT_MAX_FANOUT = 50
+DEFAULT_MAX_AGE = 300
+DEFAULT_MAX_NODES = 200
+
+EMAIL_RE = re.compile(r'[\w.+-]+@[\w-]+(?:\.[\w-]+)+')
+PHONE_RE = re.compile(r'\+?\d[\d\s().-]{6,}\d')
+URL_RE = re.compile(r'https?://\S+', re.IGNORECASE)
+
+_graph = None
+_refreshing = False
+_lock = threading.Lock()
+
+# numpy is imported by the first graph build, so workers that only record
+# new entities and reports never pay for it
+np = None
+
+def _load_numpy():
+    global np
+    if np is None:
+        import numpy
+        np = numpy
+
+def normalize_registration(registration_number):
+    """Uppercase alphanumerics only, so 'ab-123 456' matches 'AB123456'"""
+    if not registration_number:
+        return None
+    value = re.sub(r'[^0-9A-Z]', '', registration_number.upper())
+    return value if len(value) >= 4 else None
+
+def contact_tokens(contact_info):
+    """Extract normalized e-mail addresses and phone numbers from free text"""
+    if not contact_info:
+        return set()
+
+    tokens = {email.lower() for email in EMAIL_RE.findall(contact_info)}
+    for phone in PHONE_RE.findall(contact_info):
+        digits = re.sub(r'\D', '', phone)
+        if len(digits) >= 7:
+            # Compare on the trailing 10 digits to ignore country prefixes
+            tokens.add('tel:' + digits[-10:])
+    return tokens
+
+def source_tokens(sources):
+    """Extract normalized source URLs from a report's JSON sources list"""
+    if not sources:
+        return set()
+    try:
+        entries = json.loads(sources)
+    except (TypeError, ValueError):
+        entries = [sources]
+
+    tokens = set()
+    for entry in entries:
+        for url in URL_RE.findall(str(entry)):
+            tokens.add(url.lower().rstrip('/.,'))
+    return tokens
+
+def entity_keys(registration_number, contact_info):
+    """Link keys contributed by an entity's own fields"""
+    keys = set()
+    registration = normalize_registration(registration_number)
+    if registration:
+        keys.add((LINK_REGISTRATION, registration))
+    for token in contact_tokens(contact_info):
+        keys.add((LINK_CONTACT, token))
+    return keys
+
+def report_keys(sources):
+    """Link keys contributed by a report on an entity
+
+    Only the report's cited sources link entities. The graph is public, so
+    who filed a report (anonymous or not) must never shape it.
+    """
+    return {(LINK_CO_REPORTED, 'src:' + token) for token in source_tokens(sources)}
+
+class EntityGraph:
+    """CSR adjacency with incremental degree and component tracking"""
+
+    def __init__(self, ids, key_members, max_fanout=DEFAULT_MAX_FANOUT):
+        _load_numpy()
+        self.max_fanout = max_fanout
+        self.key_members = key_members
+        self.ids = list(ids)
+        self.positions = {entity_id: pos for pos, entity_id in enumerate(self.ids)}
+        self.delta = defaultdict(dict)
+        self.dirty = False
+        self.built_at = time.time()
+        self._build_csr()
+        self._build_components()
+
+    def _build_csr(self):
+        """Expand each shared key into edges and compress into CSR arrays"""
+        n = len(self.ids)
+        sources, targets, kinds = [], [], []
+
+        for (kind, _), members in self.key_members.items():
+            if len(members) < 2 or len(members) > self.max_fanout:
+                continue
+            positions = np.fromiter((self.positions[m] for m in members), dtype=np.int64, count=len(members))
+            src, dst = np.meshgrid(positions, positions, indexing='ij')
+            mask = src != dst
+            sources.append(src[mask])
+            targets.append(dst[mask])
+            kinds.append(np.full(mask.sum(), kind, dtype=np.uint8))
+
+        if sources:
+            codes = np.concatenate(sources) * n + np.concatenate(targets)
+            edge_kinds = np.concatenate(kinds)
+            codes, inverse = np.unique(codes, return_inverse=True)
+            self.kinds = np.zeros(len(codes), dtype=np.uint8)
+            np.bitwise_or.at(self.kinds, inverse, edge_kinds)
+            src = codes // n
+            self.indices = (codes % n).astype(np.int32)
+        else:
+            src = np.empty(0, dtype=np.int64)
+            self.indices = np.empty(0, dtype=np.int32)
+            self.kinds = np.empty(0, dtype=np.uint8)
+
+        self.indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=n), out=self.indptr[1:])
+        self.degree = np.diff(self.indptr).astype(np.int32)
+        self.csr_size = n
+
+    def _build_components(self):
+        """Label propagation with pointer jumping until every node points at its root"""
+        n = len(self.ids)
+        labels = np.arange(n, dtype=np.int64)
+        src = np.repeat(np.arange(n, dtype=np.int64), self.degree)
+        dst = self.indices.astype(np.int64)
+
+        while True:
+            previous = labels.copy()
+            np.minimum.at(labels, src, labels[dst])
+            labels = labels[labels]
+            if np.array_equal(labels, previous):
+                break
+
+        self.parent = labels
+        self.component_size = np.bincount(labels, minlength=n).astype(np.int64)
+
+    def _find(self, pos):
+        parent = self.parent
+        while parent[pos] != pos:
+            parent[pos] = parent[parent[pos]]
+            pos = parent[pos]
+        return pos
+
+    def _union(self, a, b):
+        root_a, root_b = self._find(a), self._find(b)
+        if root_a == root_b:
+            return
+        if self.component_size[root_a] < self.component_size[root_b]:
+            root_a, root_b = root_b, root_a
+        self.parent[root_b] = root_a
+        self.component_size[root_a] += self.component_size[root_b]
+
+    def _ensure_node(self, entity_id):
+        pos = self.positions.get(entity_id)
+        if pos is None:
+            pos = len(self.ids)
+            self.ids.append(entity_id)
+            self.positions[entity_id] = pos
+            self.degree = np.append(self.degree, 0)
+            self.parent = np.append(self.parent, pos)
+            self.component_size = np.append(self.component_size, 1)
+        return pos
+
+    def _has_edge(self, a, b):
+        if b in self.delta.get(a, ()):
+            return True
+        if a >= self.csr_size:
+            return False
+        row = self.indices[self.indptr[a]:self.indptr[a + 1]]
+        i = np.searchsorted(row, b)
+        return i < len(row) and row[i] == b
+
+    def add_keys(self, entity_id, keys):
+        """Incrementally link an entity through new keys"""
+        pos = self._ensure_node(entity_id)
+
+        for key in keys:
+            members = self.key_members.setdefault(key, set())
+            if entity_id in members:
+                continue
+            members.add(entity_id)
+
+            if len(members) > self.max_fanout:
+                if len(members) == self.max_fanout + 1:
+                    # Key just became too generic; its existing edges must go
+                    self.dirty = True
+                continue
+
+            kind = key[0]
+            for other_id in members:
+                if other_id == entity_id:
+                    continue
+                other = self.positions[other_id]
+                if not self._has_edge(pos, other):
+                    self.degree[pos] += 1
+                    self.degree[other] += 1
+                self.delta[pos][other] = self.delta[pos].get(other, 0) | kind
+                self.delta[other][pos] = self.delta[other].get(pos, 0) | kind
+                self._union(pos, other)
+
+    def neighbours(self, pos):
+        """Yield (neighbour_pos, kind) for a node from CSR and delta edges"""
+        seen = {}
+        if pos < self.csr_size:
+            start, end = self.indptr[pos], self.indptr[pos + 1]
+            for other, kind in zip(self.indices[start:end].tolist(), self.kinds[start:end].tolist()):
+                seen[other] = kind
+        for other, kind in self.delta.get(pos, {}).items():
+            seen[other] = seen.get(other, 0) | kind
+        return seen.items()
+
+    def neighbourhood(self, entity_id, hops=2, max_nodes=DEFAULT_MAX_NODES):
+        """Breadth-first k-hop neighbourhood, truncated at max_nodes"""
+        pos = self.positions.get(entity_id)
+        if pos is None:
+            return {'nodes': [entity_id], 'edges': [], 'distance': {entity_id: 0},
+                    'degree': {entity_id: 0}, 'component_size': 1, 'truncated': False}
+
+        distance = {pos: 0}
+        edges = []
+        frontier = [pos]
+        truncated = False
+
+        for hop in range(1, hops + 1):
+            next_frontier = []
+            for node in frontier:
+                for other, kind in self.neighbours(node):
+                    if other not in distance:
+                        if len(distance) >= max_nodes:
+                            truncated = True
+                            continue
+                        distance[other] = hop
+                        next_frontier.append(other)
+                    if other in distance:
+                        edges.append((node, other, kind))
+            frontier = next_frontier
+            if not frontier:
+                break
+
+        # Keep each undirected edge once
+        unique_edges = {}
+        for a, b, kind in edges:
+            unique_edges[(min(a, b), max(a, b))] = kind
+
+        return {
+            'nodes': [self.ids[p] for p in distance],
+            'edges': [
+                {
+                    'source': self.ids[a],
+                    'target': self.ids[b],
+                    'links': [name for flag, name in LINK_NAMES.items() if kind & flag]
+                }
+                for (a, b), kind in unique_edges.items()
+            ],
+            'distance': {self.ids[p]: d for p, d in distance.items()},
+            'degree': {self.ids[p]: int(self.degree[p]) for p in distance},
+            'component_size': int(self.component_size[self._find(pos)]),
+            'truncated': truncated
+        }
+
+def build_graph(max_fanout=DEFAULT_MAX_FANOUT):
+    """Build the link graph from current entity and report rows"""
+    key_members = defaultdict(set)
+    ids = []
+
+    entity_rows = db.session.execute(
+        db.select(Entity.id, Entity.registration_number, Entity.contact_info).order_by(Entity.id)
+    )
+    for entity_id, registration_number, contact_info in entity_rows:
+        ids.append(entity_id)
+        for key in entity_keys(registration_number, contact_info):
+            key_members[key].add(entity_id)
+
+    report_rows = db.session.execute(
+        db.select(FraudReport.entity_id, FraudReport.sources).where(
+            FraudReport.entity_id.isnot(None), FraudReport.sources.isnot(None)
+        )
+    )
+    for entity_id, sources in report_rows:
+        for key in report_keys(sources):
+            key_members[key].add(entity_id)
+
+    return EntityGraph(ids, key_members, max_fanout=max_fanout)
+
+def _refresh(app):
+    """Rebuild the graph in a background thread and swap it in"""
+    global _graph, _refreshing
+    try:
+        with app.app_context():
+            graph = build_graph(max_fanout=app.config.get('ENTITY_GRAPH_MAX_FANOUT', DEFAULT_MAX_FANOUT))
+        with _lock:
+            _graph = graph
+    except Exception:
+        app.logger.exception('Entity graph rebuild failed; serving the previous graph')
+    finally:
+        with _lock:
+            _refreshing = False
+
+def get_graph():
+    """Return this worker's graph
+
+    Only a worker's first call builds inline. A dirty or stale graph keeps
+    serving while a background thread rebuilds it, so requests never wait
+    on a rebuild.
+    """
+    global _graph, _refreshing
+    config = current_app.config
+    max_age = config.get('ENTITY_GRAPH_MAX_AGE', DEFAULT_MAX_AGE)
+
+    with _lock:
+        if _graph is None:
+            _graph = build_graph(max_fanout=config.get('ENTITY_GRAPH_MAX_FANOUT', DEFAULT_MAX_FANOUT))
+        elif (_graph.dirty or time.time() - _graph.built_at > max_age) and not _refreshing:
+            _refreshing = True
+            threading.Thread(
+                target=_refresh, args=(current_app._get_current_object(),), name='entity-graph', daemon=True
+            ).start()
+        return _graph
+
+def note_entity_added(entity):
+    """Link a newly created entity into the in-memory graph"""
+    with _lock:
+        if _graph is not None:
+            _graph.add_keys(entity.id, entity_keys(entity.registration_number, entity.contact_info))
+
+def note_report_added(report):
+    """Link a report's entity through the report's sources"""
+    if not report.entity_id:
+        return
+    with _lock:
+        if _graph is not None:
+            _graph.add_keys(report.entity_id, report_keys(report.sources))
+
+def invalidate():
+    """Force a rebuild on next use, e.g. after keys were edited or removed"""
+    with _lock:
+        if _graph is not None:
+            _graph.dirty = True
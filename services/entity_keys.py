@@ -0,0 +1,195 @@
+"""
+Canonical entity keys
+Resolves reported names like "ABC Garments Ltd." and "abc garments limited"
+to the same entity, and consolidates duplicates created before keys existed
+"""
+
+from models import Entity, EntityReportCount, FraudReport, db
+from services import entity_graph, report_counts
+from sqlalchemy.exc import IntegrityError
+import unicodedata
+import re
+
+# Trailing legal-form words and their canonical spelling
+LEGAL_SUFFIXES = {
+    'limited': 'ltd',
+    'ltd': 'ltd',
+    'private': 'pvt',
+    'pvt': 'pvt',
+    'pte': 'pvt',
+    'company': 'co',
+    'co': 'co',
+    'corporation': 'corp',
+    'corp': 'corp',
+    'incorporated': 'inc',
+    'inc': 'inc',
+    'llc': 'llc',
+    'plc': 'plc',
+    'gmbh': 'gmbh',
+    'bhd': 'bhd',
+    'sdn': 'sdn'
+}
+
+DEFAULT_BATCH_SIZE = 1000
+
+def canonical_entity_key(name):
+    """Case-fold, strip accents and punctuation, and normalize legal suffixes"""
+    if not name:
+        return None
+
+    text = unicodedata.normalize('NFKD', name)
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch)).casefold()
+    text = text.replace('&', ' and ')
+    tokens = re.sub(r'[^\w\s]', ' ', text).split()
+
+    # Only rewrite the trailing run of legal-form words
+    split = len(tokens)
+    while split > 1 and tokens[split - 1] in LEGAL_SUFFIXES:
+        split -= 1
+    suffix = [LEGAL_SUFFIXES[token] for token in tokens[split:]]
+
+    key = ' '.join(tokens[:split] + suffix)
+    return key[:200] or None
+
+def find_entity(name, entity_type, country_code):
+    """Look up an entity through the (canonical_key, entity_type, country_code) index"""
+    key = canonical_entity_key(name)
+    if not key:
+        return None
+    return Entity.query.filter_by(
+        canonical_key=key,
+        entity_type=entity_type,
+        country_code=country_code
+    ).first()
+
+def find_or_create_entity(name, entity_type, country_code, **fields):
+    """Resolve an entity by canonical key, creating it if it does not exist"""
+    entity = find_entity(name, entity_type, country_code)
+    if entity:
+        return entity, False
+
+    entity = Entity(
+        name=name,
+        canonical_key=canonical_entity_key(name),
+        entity_type=entity_type,
+        country_code=country_code,
+        **fields
+    )
+    try:
+        with db.session.begin_nested():
+            db.session.add(entity)
+    except IntegrityError:
+        # Another request created the same entity first
+        return find_entity(name, entity_type, country_code), False
+    return entity, True
+
+def backfill_canonical_keys(batch_size=DEFAULT_BATCH_SIZE):
+    """Fill canonical_key in id-ordered batches, skipping keys already taken"""
+    last_id = 0
+    updated = 0
+    conflicts = 0
+
+    while True:
+        batch = db.session.execute(
+            db.select(Entity.id, Entity.name, Entity.entity_type, Entity.country_code).where(
+                Entity.canonical_key.is_(None),
+                Entity.id > last_id
+            ).order_by(Entity.id).limit(batch_size)
+        ).all()
+        if not batch:
+            break
+        last_id = batch[-1].id
+
+        keyed = [(row, canonical_entity_key(row.name)) for row in batch]
+        taken = set(db.session.execute(
+            db.select(Entity.canonical_key, Entity.entity_type, Entity.country_code).where(
+                Entity.canonical_key.in_({key for _, key in keyed if key})
+            )
+        ).all())
+
+        mappings = []
+        for row, key in keyed:
+            triple = (key, row.entity_type, row.country_code)
+            if not key:
+                continue
+            if triple in taken:
+                # Left NULL until merge_duplicates() consolidates it
+                conflicts += 1
+                continue
+            taken.add(triple)
+            mappings.append({'id': row.id, 'canonical_key': key})
+
+        if mappings:
+            db.session.execute(db.update(Entity), mappings)
+        db.session.commit()
+        updated += len(mappings)
+
+    return {'updated': updated, 'conflicts': conflicts}
+
+def find_duplicate_groups():
+    """Group entity ids that share a canonical key, type and country"""
+    groups = {}
+    rows = db.session.execute(
+        db.select(Entity.id, Entity.name, Entity.entity_type, Entity.country_code).order_by(Entity.id)
+    )
+    for row in rows:
+        key = canonical_entity_key(row.name)
+        if key:
+            groups.setdefault((key, row.entity_type, row.country_code), []).append(row.id)
+    return {triple: ids for triple, ids in groups.items() if len(ids) > 1}
+
+def merge_group(entity_ids, canonical_key):
+    """Fold duplicate entities into one survivor and move their reports to it"""
+    entities = Entity.query.filter(Entity.id.in_(entity_ids)).all()
+
+    # Prefer a verified entity, then the oldest
+    entities.sort(key=lambda e: (not e.is_verified, e.id))
+    survivor, duplicates = entities[0], entities[1:]
+    duplicate_ids = [e.id for e in duplicates]
+
+    for duplicate in duplicates:
+        for field in ('registration_number', 'contact_info', 'description'):
+            if not getattr(survivor, field) and getattr(duplicate, field):
+                setattr(survivor, field, getattr(duplicate, field))
+
+    moved = db.session.execute(
+        db.update(FraudReport).where(FraudReport.entity_id.in_(duplicate_ids)).values(
+            entity_id=survivor.id
+        )
+    ).rowcount
+    db.session.execute(
+        db.delete(EntityReportCount).where(EntityReportCount.entity_id.in_(duplicate_ids))
+    )
+    for duplicate in duplicates:
+        db.session.delete(duplicate)
+    db.session.flush()
+
+    survivor.canonical_key = canonical_key
+    # Make the next incremental risk run pick the survivor up
+    survivor.risk_scored_at = None
+    db.session.commit()
+
+    report_counts.rebuild_counts([survivor.id])
+    return {'survivor_id': survivor.id, 'merged_ids': duplicate_ids, 'reports_moved': moved}
+
+def merge_duplicates(dry_run=False):
+    """Consolidate all duplicate groups; with dry_run only report them"""
+    groups = find_duplicate_groups()
+    if dry_run:
+        return [{'canonical_key': key, 'entity_ids': ids} for (key, _, _), ids in groups.items()]
+    return [merge_group(ids, key) for (key, _, _), ids in groups.items()]
+
+def consolidate_entities():
+    """Backfill keys, merge duplicate groups, then key the survivors; the entity_merge job"""
+    backfill = backfill_canonical_keys()
+    merged = merge_duplicates()
+    # Entities left unkeyed by a conflict can take their key now the duplicate is gone
+    rekeyed = backfill_canonical_keys()
+    # Other workers' graphs pick the merge up within ENTITY_GRAPH_MAX_AGE
+    entity_graph.invalidate()
+    return {
+        'backfilled': backfill['updated'] + rekeyed['updated'],
+        'conflicts': rekeyed['conflicts'],
+        'merged': len(merged),
+        'reports_moved': sum(group['reports_moved'] for group in merged)
+    }
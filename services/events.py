@@ -0,0 +1,250 @@
+"""
+Live moderation events
+Publishes new-report, review and verification events to Server-Sent Event
+streams. Viewers share one ring buffer per worker and wait on a single
+condition, so fan-out costs the same for one viewer or a thousand; with
+sqlite:///path (the default outside serverless) every worker on a host
+tails one small event log. Each open stream holds a server thread, so a
+process serves at most EVENTS_MAX_STREAMS of them; other viewers, and
+every viewer on serverless where SSE is off, poll instead
+"""
+
+from flask import current_app
+from collections import deque
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_BACKLOG = 500
+DEFAULT_POLL_INTERVAL = 0.5
+
+_create_lock = threading.Lock()
+
+class MemoryBroker:
+    """In-process ring buffer of recent events with monotonically rising ids"""
+
+    def __init__(self, backlog=DEFAULT_BACKLOG):
+        self.events = deque(maxlen=backlog)
+        self.condition = threading.Condition()
+        self.last_id = 0
+
+    def append(self, event_id, event_type, data):
+        with self.condition:
+            if event_id <= self.last_id:
+                return
+            self.events.append((event_id, event_type, data))
+            self.last_id = event_id
+            self.condition.notify_all()
+
+    def publish(self, event_type, payload):
+        with self.condition:
+            self.append(self.last_id + 1, event_type, json.dumps(payload))
+
+    def since(self, last_id):
+        """Events after last_id, or None when they have left the buffer"""
+        with self.condition:
+            if self.events and last_id < self.events[0][0] - 1:
+                return None
+            return [event for event in self.events if event[0] > last_id]
+
+    def wait(self, last_id, timeout):
+        """Block until an event newer than last_id arrives or timeout passes"""
+        with self.condition:
+            self.condition.wait_for(lambda: self.last_id > last_id, timeout)
+        return self.since(last_id)
+
+    def current_id(self):
+        with self.condition:
+            return self.last_id
+
+class SqliteBroker(MemoryBroker):
+    """Ring buffer fed from a SQLite event log shared by all workers on a host
+
+    Publishing is one INSERT; each worker runs one tail thread that copies
+    new rows into its buffer, however many viewers it serves.
+    """
+
+    def __init__(self, path, backlog=DEFAULT_BACKLOG, poll_interval=DEFAULT_POLL_INTERVAL):
+        super().__init__(backlog)
+        self.path = path
+        self.backlog = backlog
+        self.poll_interval = poll_interval
+        self.local = threading.local()
+        self.tail_pid = None
+        self.tail_lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._connection().execute(
+            'CREATE TABLE IF NOT EXISTS events ('
+            'id INTEGER PRIMARY KEY AUTOINCREMENT, type TEXT NOT NULL, data TEXT NOT NULL, created REAL NOT NULL)'
+        )
+        # Start from the end of the log; older events are not replayed
+        row = self._connection().execute('SELECT MAX(id) FROM events').fetchone()
+        self.last_id = row[0] or 0
+
+    def _connection(self):
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=OFF')
+            self.local.connection = connection
+        return connection
+
+    def publish(self, event_type, payload):
+        connection = self._connection()
+        cursor = connection.execute(
+            'INSERT INTO events (type, data, created) VALUES (?, ?, ?)',
+            (event_type, json.dumps(payload), time.time())
+        )
+        # Keep the log about as long as one buffer
+        if cursor.lastrowid % self.backlog == 0:
+            connection.execute('DELETE FROM events WHERE id <= ?', (cursor.lastrowid - self.backlog,))
+
+    def _ensure_tail(self):
+        # One tail thread per process; forked workers start their own
+        if self.tail_pid == os.getpid():
+            return
+        with self.tail_lock:
+            if self.tail_pid != os.getpid():
+                self.tail_pid = os.getpid()
+                threading.Thread(target=self._tail, name='event-log-tail', daemon=True).start()
+
+    def _catch_up(self):
+        """Copy rows newer than the buffer from the log"""
+        try:
+            rows = self._connection().execute(
+                'SELECT id, type, data FROM events WHERE id > ? ORDER BY id',
+                (super().current_id(),)
+            ).fetchall()
+        except sqlite3.Error:
+            rows = []
+        for row in rows:
+            self.append(*row)
+
+    def _tail(self):
+        while True:
+            self._catch_up()
+            time.sleep(self.poll_interval)
+
+    def wait(self, last_id, timeout):
+        self._ensure_tail()
+        return super().wait(last_id, timeout)
+
+    def since(self, last_id):
+        self._ensure_tail()
+        return super().since(last_id)
+
+    def current_id(self):
+        if self.tail_pid != os.getpid():
+            # Nothing has tailed the log in this process yet, so the buffer can
+            # be far behind; catch up before handing out a cursor
+            self._ensure_tail()
+            self._catch_up()
+        return super().current_id()
+
+def create_broker(storage_url, backlog=DEFAULT_BACKLOG, poll_interval=DEFAULT_POLL_INTERVAL):
+    """memory:// for a single worker, sqlite:///path to share across workers"""
+    if storage_url.startswith('sqlite:///'):
+        return SqliteBroker(storage_url[len('sqlite:///'):], backlog, poll_interval)
+    if storage_url != 'memory://':
+        current_app.logger.warning('Unsupported EVENTS_STORAGE_URL %s, using memory://', storage_url)
+    return MemoryBroker(backlog)
+
+def get_broker():
+    """The application's event broker, created on first use"""
+    app = current_app._get_current_object()
+    broker = app.extensions.get('events')
+    if broker is None:
+        with _create_lock:
+            broker = app.extensions.get('events')
+            if broker is None:
+                broker = create_broker(
+                    app.config.get('EVENTS_STORAGE_URL', 'memory://'),
+                    app.config.get('EVENTS_BACKLOG', DEFAULT_BACKLOG),
+                    app.config.get('EVENTS_POLL_INTERVAL', DEFAULT_POLL_INTERVAL)
+                )
+                app.extensions['events'] = broker
+    return broker
+
+def init_app(app):
+    """Resolve EVENTS_SSE_ENABLED and EVENTS_STORAGE_URL for the deployment"""
+    config = app.config
+    serverless = config.get('DB_ENGINE_PROFILE_ACTIVE') == 'serverless'
+    if config.get('EVENTS_SSE_ENABLED') is None:
+        # A serverless function cannot hold a response open; pages poll instead
+        config['EVENTS_SSE_ENABLED'] = not serverless
+
+    storage_url = config.get('EVENTS_STORAGE_URL')
+    if not storage_url:
+        # Every worker on the host tails one event log, so no stream misses
+        # events published by another worker
+        config['EVENTS_STORAGE_URL'] = 'memory://' if serverless else (
+            'sqlite:///' + os.path.join(app.instance_path, 'events.db')
+        )
+    elif storage_url == 'memory://' and config.get('WEB_CONCURRENCY', 1) > 1:
+        raise ValueError(
+            'EVENTS_STORAGE_URL=memory:// only reaches streams in the publishing worker; '
+            'with WEB_CONCURRENCY > 1 use sqlite:///path'
+        )
+
+_open_streams = 0
+_streams_lock = threading.Lock()
+
+def acquire_stream(limit):
+    """Reserve one of this process's limit stream slots; False when all are taken"""
+    global _open_streams
+    with _streams_lock:
+        if _open_streams >= limit:
+            return False
+        _open_streams += 1
+        return True
+
+def release_stream():
+    global _open_streams
+    with _streams_lock:
+        _open_streams = max(0, _open_streams - 1)
+
+def publish(event_type, payload):
+    """Publish an event to every open stream (call after committing)"""
+    try:
+        get_broker().publish(event_type, payload)
+    except sqlite3.Error as e:
+        # Live updates are best effort; the write itself has already succeeded
+        current_app.logger.warning('Could not publish %s event: %s', event_type, e)
+
+def format_event(event_id, event_type, data):
+    return f'id: {event_id}\nevent: {event_type}\ndata: {data}\n\n'
+
+def poll(broker, last_id):
+    """Events after last_id for clients without a stream; returns (last_id, events, resync)"""
+    current_id = broker.current_id()
+    if last_id is None or last_id > current_id:
+        return current_id, [], False
+    events = broker.since(last_id)
+    if events is None:
+        return current_id, [], True
+    return (events[-1][0] if events else last_id), events, False
+
+def stream(broker, last_id, max_age, heartbeat):
+    """Yield SSE frames until max_age seconds pass; clients reconnect with Last-Event-ID"""
+    if last_id is None or last_id > broker.current_id():
+        # New viewer, or an id from before this worker's buffer existed
+        last_id = broker.current_id()
+
+    yield 'retry: 3000\n' + format_event(last_id, 'hello', json.dumps({'last_id': last_id}))
+
+    deadline = time.monotonic() + max_age
+    while time.monotonic() < deadline:
+        events = broker.wait(last_id, min(heartbeat, max(0, deadline - time.monotonic())))
+        if events is None:
+            # Fell behind the buffer; the page should reload its lists
+            last_id = broker.current_id()
+            yield format_event(last_id, 'resync', '{}')
+        elif events:
+            for event_id, event_type, data in events:
+                yield format_event(event_id, event_type, data)
+            last_id = events[-1][0]
+        else:
+            yield ': keep-alive\n\n'
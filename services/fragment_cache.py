@@ -0,0 +1,142 @@
+"""
+Template fragment caching
+A Jinja `{% cache key, ttl %}...{% endcache %}` block stores its rendered
+HTML in the application cache. Keys include data_version('table', ...),
+a token per table that changes after every commit touching the table, so
+a fragment is re-rendered as soon as its data changes rather than when its
+TTL runs out. That only holds across workers when the tokens live in a
+shared cache (CACHE_STORAGE_URL=file://...); with memory:// other workers
+keep serving the old fragment until its TTL, so fragment caching is off
+there unless FRAGMENT_CACHE_ENABLED asks for it. Template bytecode is
+compiled ahead of time by `flask compile-templates` into
+TEMPLATE_BYTECODE_DIR
+"""
+
+from flask import current_app
+from jinja2 import FileSystemBytecodeCache, nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from services.cache import MISSING, get_cache
+import os
+import uuid
+
+DEFAULT_TTL = 300
+
+# Versions only need to outlive the fragments keyed on them
+VERSION_TTL = 30 * 24 * 3600
+
+def _version_key(table):
+    return f'data_version:{table}'
+
+def data_version(*tables):
+    """Current version tokens of tables, for use in fragment keys"""
+    cache = get_cache()
+    versions = []
+    for table in tables:
+        version = cache.get_shared(_version_key(table))
+        if version is MISSING:
+            # Evicted or never bumped; a fresh token can only cause misses
+            version = bump(table, cache)
+        versions.append(version)
+    return tuple(versions)
+
+def bump(table, cache=None):
+    """Give table a new version, orphaning fragments keyed on the old one"""
+    version = uuid.uuid4().hex[:12]
+    (cache or get_cache()).set(_version_key(table), version, VERSION_TTL)
+    return version
+
+def _changed_tables(session):
+    return session.info.setdefault('fragment_changed_tables', set())
+
+@event.listens_for(Session, 'after_flush')
+def _note_flushed_tables(session, flush_context):
+    changed = _changed_tables(session)
+    for instance in list(session.new) + list(session.dirty) + list(session.deleted):
+        table = getattr(instance, '__tablename__', None)
+        if table:
+            changed.add(table)
+
+@event.listens_for(Session, 'do_orm_execute')
+def _note_dml_tables(orm_execute_state):
+    # Bulk db.update()/db.insert() statements skip the flush
+    if not orm_execute_state.is_select:
+        table = getattr(orm_execute_state.statement, 'table', None)
+        if table is not None and getattr(table, 'name', None):
+            _changed_tables(orm_execute_state.session).add(table.name)
+
+@event.listens_for(Session, 'after_commit')
+def _bump_committed_tables(session):
+    changed = session.info.pop('fragment_changed_tables', None)
+    if not changed or not current_app or not current_app.config.get('FRAGMENT_CACHE_ENABLED', True):
+        return
+    cache = get_cache()
+    for table in changed:
+        bump(table, cache)
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_rolled_back_tables(session):
+    session.info.pop('fragment_changed_tables', None)
+
+class FragmentCacheExtension(Extension):
+    """{% cache key, ttl %} ... {% endcache %}; ttl defaults to FRAGMENT_CACHE_TTL"""
+
+    tags = {'cache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        key = parser.parse_expression()
+        ttl = parser.parse_expression() if parser.stream.skip_if('comma') else nodes.Const(None)
+        body = parser.parse_statements(('name:endcache',), drop_needle=True)
+        # The template and line keep equal keys in different blocks apart
+        block = nodes.Const(f'{parser.name}:{lineno}')
+        return nodes.CallBlock(
+            self.call_method('_render', [block, key, ttl]), [], [], body
+        ).set_lineno(lineno)
+
+    def _render(self, block, key, ttl, caller):
+        if not current_app.config.get('FRAGMENT_CACHE_ENABLED', True):
+            return caller()
+        if ttl is None:
+            ttl = current_app.config.get('FRAGMENT_CACHE_TTL', DEFAULT_TTL)
+        html = get_cache().get_or_set(f'fragment:{block}:{key!r}', ttl, lambda: str(caller()))
+        return Markup(html)
+
+def compile_templates(app):
+    """Compile every template into the bytecode cache and return how many"""
+    names = app.jinja_env.list_templates(filter_func=lambda name: name.endswith('.html'))
+    for name in names:
+        app.jinja_env.get_template(name)
+    return len(names)
+
+def init_app(app):
+    """Register {% cache %} and data_version(), the bytecode cache and `flask compile-templates`"""
+    shared = app.config.get('CACHE_STORAGE_URL', 'memory://').startswith('file://')
+    if app.config.get('FRAGMENT_CACHE_ENABLED') is None:
+        app.config['FRAGMENT_CACHE_ENABLED'] = shared
+    elif app.config['FRAGMENT_CACHE_ENABLED'] and not shared:
+        app.logger.warning(
+            'FRAGMENT_CACHE_ENABLED with a per-worker CACHE_STORAGE_URL: after a commit, '
+            'other workers serve stale fragments for up to FRAGMENT_CACHE_TTL seconds'
+        )
+    app.jinja_env.add_extension(FragmentCacheExtension)
+    app.jinja_env.globals['data_version'] = data_version
+
+    bytecode_dir = app.config.get('TEMPLATE_BYTECODE_DIR')
+    if bytecode_dir:
+        try:
+            os.makedirs(bytecode_dir, exist_ok=True)
+            app.jinja_env.bytecode_cache = FileSystemBytecodeCache(bytecode_dir)
+        except OSError:
+            # Read-only deploys without a prebuilt directory compile in memory
+            pass
+
+    @app.cli.command('compile-templates')
+    def compile_templates_command():
+        """Precompile template bytecode into TEMPLATE_BYTECODE_DIR"""
+        if app.jinja_env.bytecode_cache is None:
+            print("TEMPLATE_BYTECODE_DIR is not set; nothing to compile into.")
+            return
+        print(f"Compiled {compile_templates(app)} templates into {bytecode_dir}.")
@@ -0,0 +1,115 @@
+"""
+Maintenance jobs
+Audit log archival and database backups, run off the request path by the
+scheduler (services/scheduler.py) or on demand with `flask run-job`
+"""
+
+from flask import current_app
+from models import AuditLog, db
+from datetime import datetime, timedelta
+import gzip
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import time
+
+BACKUP_PREFIX = 'rmgfraud-'
+
+def _directory(setting, default_name):
+    directory = current_app.config.get(setting) or os.path.join(current_app.instance_path, default_name)
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+def archive_audit_logs():
+    """Move audit rows older than AUDIT_ARCHIVE_AFTER_DAYS into a gzipped JSON-lines file"""
+    config = current_app.config
+    cutoff = datetime.utcnow() - timedelta(days=config.get('AUDIT_ARCHIVE_AFTER_DAYS', 365))
+    batch_size = config.get('AUDIT_ARCHIVE_BATCH_SIZE', 5000)
+    path = os.path.join(
+        _directory('AUDIT_ARCHIVE_DIR', 'archive'),
+        f'audit_logs-{datetime.utcnow():%Y%m%dT%H%M%S}.jsonl.gz'
+    )
+    table = AuditLog.__table__
+
+    # Id ranges of the archived batches, deleted once the file is complete
+    batches = []
+    last_id = 0
+    with gzip.open(path + '.tmp', 'wt', encoding='utf-8') as archive:
+        while True:
+            rows = db.session.execute(
+                db.select(table).where(table.c.timestamp < cutoff, table.c.id > last_id).order_by(
+                    table.c.id
+                ).limit(batch_size)
+            ).mappings().all()
+            if not rows:
+                break
+            for row in rows:
+                archive.write(json.dumps(dict(row), default=str) + '\n')
+            batches.append((rows[0]['id'], rows[-1]['id']))
+            last_id = rows[-1]['id']
+    db.session.rollback()
+
+    if not batches:
+        os.remove(path + '.tmp')
+        return {'archived': 0}
+    os.replace(path + '.tmp', path)
+
+    archived = 0
+    for first_id, batch_last_id in batches:
+        archived += db.session.execute(
+            table.delete().where(table.c.id.between(first_id, batch_last_id), table.c.timestamp < cutoff)
+        ).rowcount
+        db.session.commit()
+    return {'archived': archived, 'file': path}
+
+def backup_database():
+    """Snapshot the primary database into BACKUP_DIR and drop backups older than BACKUP_RETENTION_DAYS"""
+    config = current_app.config
+    url = db.engine.url
+
+    # Fail before touching anything: instance/ is ephemeral on most hosts,
+    # and a missing pg_dump should not surface only after the nightly run
+    if not config.get('BACKUP_DIR'):
+        raise ValueError('BACKUP_DIR is not set; point it at persistent storage to enable backups')
+    pg_dump = shutil.which('pg_dump') if url.get_backend_name() == 'postgresql' else None
+    if url.get_backend_name() == 'postgresql' and pg_dump is None:
+        raise RuntimeError('pg_dump is not installed; cannot back up PostgreSQL')
+
+    directory = _directory('BACKUP_DIR', 'backups')
+    stamp = f'{datetime.utcnow():%Y%m%dT%H%M%S}'
+
+    if url.get_backend_name() == 'sqlite':
+        if url.database in (None, '', ':memory:'):
+            raise ValueError('An in-memory SQLite database cannot be backed up')
+        path = os.path.join(directory, f'{BACKUP_PREFIX}{stamp}.db')
+        # The backup API copies a consistent snapshot while writers continue
+        source = sqlite3.connect(url.database)
+        target = sqlite3.connect(path)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
+    elif url.get_backend_name() == 'postgresql':
+        path = os.path.join(directory, f'{BACKUP_PREFIX}{stamp}.dump')
+        # The password goes through the environment rather than the process list
+        dsn = url.set(drivername='postgresql', password=None).render_as_string(hide_password=False)
+        env = dict(os.environ, PGPASSWORD=url.password or '')
+        subprocess.run(
+            [pg_dump, '--format=custom', f'--file={path}', dsn],
+            env=env, check=True, timeout=config.get('BACKUP_TIMEOUT', 3600)
+        )
+    else:
+        raise ValueError(f'No backup method for {url.get_backend_name()!r} databases')
+
+    cutoff = time.time() - config.get('BACKUP_RETENTION_DAYS', 30) * 86400
+    removed = 0
+    for name in os.listdir(directory):
+        old_path = os.path.join(directory, name)
+        if name.startswith(BACKUP_PREFIX) and old_path != path and os.path.getmtime(old_path) < cutoff:
+            os.remove(old_path)
+            removed += 1
+
+    return {'file': path, 'bytes': os.path.getsize(path), 'removed': removed}
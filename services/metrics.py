@@ -0,0 +1,427 @@
+"""
+Prometheus metrics
+Request latency histograms, database pool, cache and write-queue figures
+and domain counters, served at /metrics in the Prometheus text format.
+Recording only touches this process's registry; with METRICS_STORAGE_URL
+set to file:///path every worker writes its totals there in the background
+and a scrape of any worker sums them
+"""
+
+from flask import Response, abort, g, request
+from sqlalchemy.exc import SQLAlchemyError
+import atexit
+import bisect
+import hmac
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DEFAULT_FLUSH_INTERVAL = 5
+
+RISK_LEVELS = ('Low', 'Medium', 'High', 'Critical')
+
+# name: (type, help, allowed values for user-supplied labels; others become 'other')
+METRICS = {
+    'rmgfraud_http_request_duration_seconds': (
+        'histogram', 'Request latency by blueprint, endpoint, method and status', {}),
+    'rmgfraud_reports_submitted_total': (
+        'counter', 'Fraud reports submitted, by risk level', {'risk_level': RISK_LEVELS}),
+    'rmgfraud_report_reviews_total': (
+        'counter', 'Report reviews, by resulting report status', {}),
+    'rmgfraud_logins_total': (
+        'counter', 'Login attempts by result (success, failure, mfa_required, mfa_failure)', {}),
+    'rmgfraud_report_queue_depth': (
+        'gauge', 'Reports waiting for moderation', {}),
+    'rmgfraud_db_pool_connections': (
+        'gauge', 'Pooled database connections by state', {}),
+    'rmgfraud_db_pool_checkouts_total': (
+        'counter', 'Database pool checkouts', {}),
+    'rmgfraud_db_pool_wait_seconds_total': (
+        'counter', 'Time spent waiting for a pooled connection', {}),
+    'rmgfraud_db_pool_timeouts_total': (
+        'counter', 'Pool checkouts that timed out', {}),
+    'rmgfraud_cache_requests_total': (
+        'counter', 'Cache lookups by cache, tier and result', {}),
+    'rmgfraud_cache_hit_ratio': (
+        'gauge', 'Share of cache lookups that hit, since the workers started', {}),
+    'rmgfraud_sqlite_write_queue_writes_total': (
+        'counter', 'Write transactions through the SQLite write queue', {}),
+    'rmgfraud_sqlite_write_queue_wait_seconds_total': (
+        'counter', 'Time write transactions spent queued', {}),
+    'rmgfraud_job_duration_seconds': (
+        'histogram', 'Scheduled job run time by job and status', {}),
+    'rmgfraud_metrics_workers': (
+        'gauge', 'Worker processes contributing metrics', {})
+}
+
+def label_key(name, labels):
+    """Sorted (label, value) pairs with unknown user-supplied values folded into 'other'"""
+    allowed = METRICS[name][2]
+    pairs = []
+    for label, value in labels.items():
+        value = str(value)
+        if label in allowed and value not in allowed[label]:
+            value = 'other'
+        pairs.append((label, value))
+    return tuple(sorted(pairs))
+
+class Registry:
+    """Counters and histograms for one process"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, label_key(name, labels))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        key = (name, label_key(name, labels))
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            entry = self.histograms.get(key)
+            if entry is None:
+                # One count per bucket, then +Inf, then the sum
+                entry = self.histograms[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            entry[index] += 1
+            entry[-1] += value
+
+    def copy(self):
+        with self.lock:
+            return dict(self.counters), {key: list(entry) for key, entry in self.histograms.items()}
+
+registry = Registry()
+
+def inc(name, amount=1, **labels):
+    """Add to a counter in this process"""
+    registry.inc(name, amount, **labels)
+
+def observe(name, value, **labels):
+    """Record a histogram observation in this process"""
+    registry.observe(name, value, **labels)
+
+def collect_process(app):
+    """Counters and gauges read from this process's pools, caches and queues"""
+    from services import engine_profiles, sqlite_mode, user_cache
+
+    counters = {}
+    gauges = {}
+    for engine, stats in engine_profiles.pool_stats().items():
+        labels = (('engine', engine),)
+        counters[('rmgfraud_db_pool_checkouts_total', labels)] = stats['checkouts']
+        counters[('rmgfraud_db_pool_wait_seconds_total', labels)] = stats['wait_total_ms'] / 1000
+        counters[('rmgfraud_db_pool_timeouts_total', labels)] = stats['timeouts']
+        states = {'checked_out': stats['checked_out']}
+        if 'size' in stats:
+            states.update(checked_in=stats['checked_in'], overflow=stats['overflow'], size=stats['size'])
+        for state, value in states.items():
+            gauges[('rmgfraud_db_pool_connections', (('engine', engine), ('state', state)))] = value
+
+    user_stats = user_cache.stats()
+    lookups = [('user', 'local', user_stats['hits'], user_stats['misses'])]
+    cache = app.extensions.get('cache')
+    if cache is not None:
+        stats = cache.stats()
+        lookups.append(('app', 'local', stats['local_hits'], stats['local_misses']))
+        if 'shared_hits' in stats:
+            lookups.append(('app', 'shared', stats['shared_hits'], stats['shared_misses']))
+    for cache_name, tier, hits, misses in lookups:
+        for result, value in (('hit', hits), ('miss', misses)):
+            labels = (('cache', cache_name), ('result', result), ('tier', tier))
+            counters[('rmgfraud_cache_requests_total', labels)] = value
+
+    for database, stats in sqlite_mode.write_queue_stats().items():
+        labels = (('database', database),)
+        counters[('rmgfraud_sqlite_write_queue_writes_total', labels)] = stats['writes']
+        counters[('rmgfraud_sqlite_write_queue_wait_seconds_total', labels)] = stats['wait_total_ms'] / 1000
+
+    return counters, gauges
+
+def _pid_alive(pid):
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        pass
+    return True
+
+def _encode(counters, histograms, gauges):
+    return {
+        'counters': [[name, labels, value] for (name, labels), value in counters.items()],
+        'histograms': [[name, labels, entry] for (name, labels), entry in histograms.items()],
+        'gauges': [[name, labels, value] for (name, labels), value in gauges.items()]
+    }
+
+def _decode(items):
+    return {(name, tuple(tuple(pair) for pair in labels)): value for name, labels, value in items}
+
+class FileStore:
+    """One JSON file of running totals per worker in a shared directory"""
+
+    RETIRED = 'retired.json'
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.path = None
+        self.pid = None
+
+    def _write(self, path, data):
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as handle:
+                json.dump(data, handle)
+            os.replace(temp_path, path)
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def _read(self, path):
+        try:
+            with open(path) as handle:
+                return json.load(handle)
+        except (OSError, ValueError):
+            return None
+
+    def write(self, data):
+        if self.pid != os.getpid():
+            # Unique per process, so a recycled pid never overwrites a dead worker's totals
+            self.pid = os.getpid()
+            self.path = os.path.join(self.directory, f'worker-{self.pid}-{uuid.uuid4().hex[:8]}.json')
+        self._write(self.path, dict(data, pid=self.pid, updated=time.time()))
+
+    def _retire(self, dead):
+        """Fold dead workers' counters into retired.json so the directory stays small"""
+        if fcntl is None or not dead:
+            return False
+        with open(os.path.join(self.directory, '.lock'), 'a') as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            retired_path = os.path.join(self.directory, self.RETIRED)
+            retired = self._read(retired_path) or {}
+            counters = _decode(retired.get('counters', []))
+            histograms = _decode(retired.get('histograms', []))
+            for path in dead:
+                # Another scrape may have folded it already
+                data = self._read(path)
+                if data is not None:
+                    _merge(counters, histograms, data)
+            self._write(retired_path, _encode(counters, histograms, {}))
+            for path in dead:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        return True
+
+    def read_others(self):
+        """Totals from every other worker, living or dead, and how many are alive"""
+        live = []
+        dead = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if not name.startswith('worker-') or not name.endswith('.json') or path == self.path:
+                continue
+            data = self._read(path)
+            if data is None:
+                continue
+            if _pid_alive(data.get('pid')):
+                live.append(data)
+            else:
+                dead.append(path)
+
+        others = list(live)
+        if not self._retire(dead):
+            # Without a lock the dead files stay; their gauges no longer apply
+            for path in dead:
+                data = self._read(path)
+                if data is not None:
+                    others.append(dict(data, gauges=[]))
+        retired = self._read(os.path.join(self.directory, self.RETIRED))
+        if retired is not None:
+            others.append(retired)
+        return others, len(live)
+
+def _merge(counters, histograms, data, gauges=None):
+    for key, value in _decode(data.get('counters', [])).items():
+        counters[key] = counters.get(key, 0) + value
+    for key, entry in _decode(data.get('histograms', [])).items():
+        current = histograms.get(key)
+        histograms[key] = list(entry) if current is None else [a + b for a, b in zip(current, entry)]
+    if gauges is not None:
+        for key, value in _decode(data.get('gauges', [])).items():
+            gauges[key] = gauges.get(key, 0) + value
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{label}="{_escape(value)}"' for label, value in pairs) + '}'
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def render(counters, histograms, gauges, buckets=DEFAULT_BUCKETS):
+    """Prometheus text exposition format 0.0.4"""
+    by_name = {}
+    for source in (counters, histograms, gauges):
+        for (name, labels), value in source.items():
+            by_name.setdefault(name, []).append((labels, value))
+
+    lines = []
+    for name in sorted(by_name):
+        metric_type, help_text, _ = METRICS[name]
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {metric_type}')
+        for labels, value in sorted(by_name[name]):
+            if metric_type != 'histogram':
+                lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+                continue
+            cumulative = 0
+            for bound, count in zip(buckets, value):
+                cumulative += count
+                lines.append(f'{name}_bucket{_format_labels(labels, [("le", repr(float(bound)))])} {cumulative}')
+            cumulative += value[len(buckets)]
+            lines.append(f'{name}_bucket{_format_labels(labels, [("le", "+Inf")])} {cumulative}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(value[-1])}')
+            lines.append(f'{name}_count{_format_labels(labels)} {cumulative}')
+    return '\n'.join(lines) + '\n'
+
+class MetricsExporter:
+    """Flask extension: request timing hooks, background flushing and the /metrics view"""
+
+    def __init__(self, app=None):
+        self.app = None
+        self.store = None
+        self.flush_interval = DEFAULT_FLUSH_INTERVAL
+        self.flusher_pid = None
+        self.flusher_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.extensions['metrics'] = self
+        if not app.config.get('METRICS_ENABLED', True):
+            return
+
+        storage_url = app.config.get('METRICS_STORAGE_URL') or 'memory://'
+        if storage_url.startswith('file://'):
+            self.store = FileStore(storage_url[len('file://'):])
+        elif storage_url != 'memory://':
+            app.logger.warning('Unsupported METRICS_STORAGE_URL %s, using memory://', storage_url)
+        self.flush_interval = app.config.get('METRICS_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL)
+
+        app.before_request(self.start_timer)
+        app.after_request(self.record_request)
+        app.add_url_rule('/metrics', 'metrics', self.view)
+
+    def start_timer(self):
+        g._metrics_started = time.perf_counter()
+        if self.store is not None and self.flusher_pid != os.getpid():
+            self._start_flusher()
+
+    def record_request(self, response):
+        started = g.pop('_metrics_started', None)
+        if started is not None and request.endpoint not in (None, 'static', 'metrics'):
+            registry.observe(
+                'rmgfraud_http_request_duration_seconds',
+                time.perf_counter() - started,
+                blueprint=request.blueprint or 'app',
+                endpoint=request.endpoint,
+                method=request.method,
+                status=response.status_code
+            )
+        return response
+
+    def _start_flusher(self):
+        # Started per process after any fork, from the first request it serves
+        with self.flusher_lock:
+            if self.flusher_pid == os.getpid():
+                return
+            self.flusher_pid = os.getpid()
+            threading.Thread(target=self._flush_loop, name='metrics-flush', daemon=True).start()
+            atexit.register(self.flush)
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception:
+                self.app.logger.exception('Metrics flush failed')
+
+    def snapshot(self):
+        """This process's counters, histograms and gauges"""
+        counters, histograms = registry.copy()
+        process_counters, gauges = collect_process(self.app)
+        counters.update(process_counters)
+        return counters, histograms, gauges
+
+    def flush(self):
+        """Write this process's totals to the shared directory"""
+        if self.store is not None:
+            self.store.write(_encode(*self.snapshot()))
+
+    def collect(self):
+        """Totals across workers plus the scrape-time gauges"""
+        counters, histograms, gauges = self.snapshot()
+        workers = 1
+        if self.store is not None:
+            self.store.write(_encode(counters, histograms, gauges))
+            others, live = self.store.read_others()
+            for data in others:
+                _merge(counters, histograms, data, gauges)
+            workers += live
+        gauges[('rmgfraud_metrics_workers', ())] = workers
+
+        lookups = {}
+        for (name, labels), value in counters.items():
+            if name == 'rmgfraud_cache_requests_total':
+                labels = dict(labels)
+                result = labels.pop('result')
+                lookups.setdefault(tuple(sorted(labels.items())), {'hit': 0, 'miss': 0})[result] += value
+        for labels, totals in lookups.items():
+            total = totals['hit'] + totals['miss']
+            if total:
+                gauges[('rmgfraud_cache_hit_ratio', labels)] = round(totals['hit'] / total, 4)
+
+        from services import platform_stats
+        try:
+            gauges[('rmgfraud_report_queue_depth', (('status', 'pending'),))] = platform_stats.get_stats()['pending_reports']
+        except SQLAlchemyError:
+            pass
+        return counters, histograms, gauges
+
+    def view(self):
+        """Prometheus scrape endpoint; requires METRICS_TOKEN as a bearer token, or METRICS_PUBLIC"""
+        token = self.app.config.get('METRICS_TOKEN')
+        if not token and not self.app.config.get('METRICS_PUBLIC', False):
+            # Scrapes can reach the database; keep them off the open internet
+            return Response('Not Found\n', status=404, mimetype='text/plain')
+        if token:
+            supplied = request.headers.get('Authorization', '')
+            if not hmac.compare_digest(supplied.encode(), f'Bearer {token}'.encode()):
+                abort(401)
+        return Response(render(*self.collect(), buckets=registry.buckets),
+                        mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+exporter = MetricsExporter()
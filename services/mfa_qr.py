@@ -0,0 +1,67 @@
+"""
+MFA QR code provisioning
+Renders the TOTP provisioning URI as a compact inline SVG, cached per
+(user, secret); qrcode is imported on first use and Pillow never is
+"""
+
+from collections import OrderedDict
+import threading
+
+DEFAULT_MAX_ENTRIES = 1024
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+def render_svg(data, border=2):
+    """Encode data as a QR code and draw it as one run-length SVG path"""
+    import qrcode
+
+    qr = qrcode.QRCode(border=border, error_correction=qrcode.constants.ERROR_CORRECT_M)
+    qr.add_data(data)
+    qr.make(fit=True)
+    matrix = qr.get_matrix()
+
+    # One rectangle per horizontal run of dark modules
+    segments = []
+    for y, row in enumerate(matrix):
+        x = 0
+        while x < len(row):
+            if row[x]:
+                start = x
+                while x < len(row) and row[x]:
+                    x += 1
+                segments.append(f'M{start} {y}h{x - start}v1h-{x - start}z')
+            else:
+                x += 1
+
+    size = len(matrix)
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {size} {size}" '
+        f'width="220" height="220" shape-rendering="crispEdges" role="img" aria-label="MFA QR code">'
+        f'<rect width="{size}" height="{size}" fill="#fff"/>'
+        f'<path d="{"".join(segments)}" fill="#000"/></svg>'
+    )
+
+def provisioning_svg(user_id, secret, provisioning_uri, max_entries=DEFAULT_MAX_ENTRIES):
+    """Cached SVG for a user's current secret; None if qrcode is unavailable"""
+    key = (user_id, secret)
+    with _lock:
+        svg = _cache.get(key)
+        if svg is not None:
+            _cache.move_to_end(key)
+            return svg
+
+    try:
+        svg = render_svg(provisioning_uri)
+    except ImportError:
+        # Deployments without qrcode fall back to manual key entry
+        return None
+
+    with _lock:
+        # A user only ever needs the SVG for their latest secret
+        for cached_key in [k for k in _cache if k[0] == user_id]:
+            del _cache[cached_key]
+        _cache[key] = svg
+        while len(_cache) > max_entries:
+            _cache.popitem(last=False)
+    return svg
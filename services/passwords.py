@@ -0,0 +1,88 @@
+"""
+Password hashing service
+Runs PBKDF2 with a per-deployment cost and transparent upgrade of legacy
+hashes. hashlib releases the GIL while it hashes, so the request thread
+hashes inline; a bounded semaphore caps how many hashes a worker computes
+at once, so a burst of logins cannot take every core from other requests
+"""
+
+from flask import current_app, has_app_context
+from werkzeug.security import generate_password_hash, check_password_hash
+import hashlib
+import hmac
+import os
+import re
+import threading
+
+DEFAULT_METHOD = 'pbkdf2:sha256'
+DEFAULT_ITERATIONS = 600000
+DEFAULT_WORKERS = 2
+DEFAULT_TIMEOUT = 10
+
+# Unsalted SHA-256 hex digests written by simple_app.py
+LEGACY_SHA256_RE = re.compile(r'^[0-9a-f]{64}$')
+
+_slots = None
+_slots_key = None
+_slots_lock = threading.Lock()
+
+def _setting(name, default):
+    if has_app_context():
+        return current_app.config.get(name, default)
+    return default
+
+def hash_method():
+    """Werkzeug method string for the configured cost, e.g. pbkdf2:sha256:600000"""
+    method = _setting('PASSWORD_HASH_METHOD', DEFAULT_METHOD)
+    iterations = _setting('PASSWORD_HASH_ITERATIONS', DEFAULT_ITERATIONS)
+    return f'{method}:{iterations}'
+
+def _get_slots():
+    """Semaphore for this worker, recreated after a fork or a new limit"""
+    global _slots, _slots_key
+    workers = _setting('PASSWORD_HASH_WORKERS', None)
+    if workers is None:
+        workers = DEFAULT_WORKERS
+    if workers <= 0:
+        return None
+
+    key = (os.getpid(), workers)
+    with _slots_lock:
+        if _slots is None or _slots_key != key:
+            _slots = threading.BoundedSemaphore(workers)
+            _slots_key = key
+        return _slots
+
+def _run(func, *args):
+    slots = _get_slots()
+    if slots is None:
+        return func(*args)
+    if not slots.acquire(timeout=_setting('PASSWORD_HASH_TIMEOUT', DEFAULT_TIMEOUT)):
+        raise TimeoutError('Timed out waiting for a password hashing slot')
+    try:
+        return func(*args)
+    finally:
+        slots.release()
+
+def _verify(stored_hash, password, method):
+    """Return (matches, needs_rehash)"""
+    if not stored_hash:
+        return False, False
+
+    if LEGACY_SHA256_RE.match(stored_hash):
+        digest = hashlib.sha256(password.encode()).hexdigest()
+        return hmac.compare_digest(digest, stored_hash), True
+
+    try:
+        matches = check_password_hash(stored_hash, password)
+    except ValueError:
+        return False, False
+    return matches, matches and not stored_hash.startswith(method + '$')
+
+def hash_password(password):
+    """Hash a password with the configured method and cost"""
+    return _run(generate_password_hash, password, hash_method())
+
+def verify_password(stored_hash, password):
+    """Check a password; needs_rehash is True for legacy or outdated hashes"""
+    return _run(_verify, stored_hash, password, hash_method())
@@ -0,0 +1,56 @@
+"""
+Platform statistics
+All dashboard counts with one conditional-aggregation query per table,
+shared through the application cache for a short TTL
+"""
+
+from flask import current_app
+from models import User, Entity, FraudReport, db
+from services.cache import get_cache
+
+DEFAULT_TTL = 15
+CACHE_KEY = 'platform_stats:v1'
+
+def _count_if(condition):
+    return db.func.coalesce(db.func.sum(db.case((condition, 1), else_=0)), 0)
+
+def compute_stats():
+    """Run the three aggregate queries and return a plain dict"""
+    users = db.session.execute(db.select(
+        db.func.count(User.id),
+        _count_if(User.is_verified == True)
+    )).one()
+
+    entities = db.session.execute(db.select(
+        db.func.count(Entity.id),
+        _count_if(Entity.is_verified == True),
+        _count_if(Entity.risk_level.in_(['High', 'Critical']))
+    )).one()
+
+    reports = db.session.execute(db.select(
+        db.func.count(FraudReport.id),
+        _count_if(FraudReport.status == 'pending'),
+        _count_if(FraudReport.status == 'verified')
+    )).one()
+
+    return {
+        'total_users': users[0],
+        'verified_users': users[1],
+        'pending_verifications': users[0] - users[1],
+        'total_entities': entities[0],
+        'verified_entities': entities[1],
+        'pending_entities': entities[0] - entities[1],
+        'high_risk_entities': entities[2],
+        'total_reports': reports[0],
+        'pending_reports': reports[1],
+        'verified_reports': reports[2]
+    }
+
+def get_stats():
+    """Cached platform statistics, at most PLATFORM_STATS_TTL seconds old"""
+    ttl = current_app.config.get('PLATFORM_STATS_TTL', DEFAULT_TTL)
+    return get_cache().get_or_set(CACHE_KEY, ttl, compute_stats)
+
+def invalidate():
+    """Drop cached statistics so the next dashboard load recomputes them"""
+    get_cache().delete(CACHE_KEY)
@@ -0,0 +1,203 @@
+"""
+Per-request profiling
+Samples a share of requests (PROFILING_SAMPLE_RATE) and, for each endpoint,
+records wall time, SQL query count, total SQL time and the slowest
+statements by hooking SQLAlchemy's cursor events and the Flask request
+lifecycle. Figures are kept per worker process
+"""
+
+from collections import deque
+from datetime import datetime
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+import os
+import random
+import threading
+import time
+
+DEFAULT_SAMPLE_RATE = 0.1
+DEFAULT_SLOW_STATEMENTS = 5
+DEFAULT_WINDOW = 200
+
+# Statements longer than this are cut in the report
+STATEMENT_MAX_LENGTH = 500
+
+# Attribute on a statement's execution context holding its start time
+START_KEY = 'rmg_profile_started'
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of floats"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1)
+    return ordered[max(index, 0)]
+
+class EndpointProfile:
+    """Running totals for one endpoint"""
+
+    def __init__(self, window):
+        self.requests = 0
+        self.errors = 0
+        self.wall_total = 0.0
+        self.wall_max = 0.0
+        self.queries_total = 0
+        self.queries_max = 0
+        self.sql_total = 0.0
+        self.recent_wall = deque(maxlen=window)
+        self.slowest = []
+
+    def add(self, wall, queries, sql_time, statements, status, slow_statements):
+        self.requests += 1
+        if status >= 500:
+            self.errors += 1
+        self.wall_total += wall
+        self.wall_max = max(self.wall_max, wall)
+        self.queries_total += queries
+        self.queries_max = max(self.queries_max, queries)
+        self.sql_total += sql_time
+        self.recent_wall.append(wall)
+
+        if statements:
+            self.slowest.extend(statements)
+            self.slowest.sort(key=lambda item: -item['ms'])
+            del self.slowest[slow_statements:]
+
+    def snapshot(self):
+        recent_ms = [wall * 1000 for wall in self.recent_wall]
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'wall_avg_ms': round(self.wall_total * 1000 / self.requests, 3),
+            'wall_max_ms': round(self.wall_max * 1000, 3),
+            'wall_p50_ms': round(percentile(recent_ms, 50), 3),
+            'wall_p95_ms': round(percentile(recent_ms, 95), 3),
+            'queries_avg': round(self.queries_total / self.requests, 2),
+            'queries_max': self.queries_max,
+            'sql_avg_ms': round(self.sql_total * 1000 / self.requests, 3),
+            'sql_share': round(self.sql_total / self.wall_total, 3) if self.wall_total else 0.0,
+            'slowest_statements': list(self.slowest)
+        }
+
+class Profiler:
+    """Collects sampled request profiles for one process"""
+
+    def __init__(self, sample_rate=DEFAULT_SAMPLE_RATE, slow_statements=DEFAULT_SLOW_STATEMENTS,
+                 window=DEFAULT_WINDOW, exclude=()):
+        self.sample_rate = sample_rate
+        self.slow_statements = slow_statements
+        self.window = window
+        self.exclude = set(exclude)
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.endpoints = {}
+            self.since = datetime.utcnow()
+
+    def should_sample(self, endpoint):
+        if endpoint is None or endpoint in self.exclude or endpoint.split('.')[0] in self.exclude:
+            return False
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def record(self, endpoint, profile, wall, status):
+        with self.lock:
+            entry = self.endpoints.get(endpoint)
+            if entry is None:
+                entry = self.endpoints[endpoint] = EndpointProfile(self.window)
+            entry.add(wall, profile['queries'], profile['sql_time'], profile['statements'], status,
+                      self.slow_statements)
+
+    def snapshot(self):
+        """Per-endpoint figures, slowest average first"""
+        with self.lock:
+            endpoints = {name: entry.snapshot() for name, entry in self.endpoints.items()}
+            since = self.since
+        return {
+            'pid': os.getpid(),
+            'since': since.isoformat(),
+            'sample_rate': self.sample_rate,
+            'endpoints': dict(sorted(endpoints.items(), key=lambda item: -item[1]['wall_avg_ms']))
+        }
+
+def _current_profile():
+    if not has_request_context():
+        return None
+    return g.get('_profile')
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # The start time lives on the statement's execution context, so a
+    # statement that raises leaves nothing behind on the connection
+    if context is not None and _current_profile() is not None:
+        setattr(context, START_KEY, time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, START_KEY, None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    profile = _current_profile()
+    if profile is None:
+        return
+
+    profile['queries'] += 1
+    profile['sql_time'] += elapsed
+    statements = profile['statements']
+    if len(statements) >= profile['keep'] and (not statements or elapsed * 1000 <= statements[-1]['ms']):
+        return
+    statements.append({
+        'ms': round(elapsed * 1000, 3),
+        'statement': ' '.join(statement.split())[:STATEMENT_MAX_LENGTH],
+        'at': datetime.utcnow().isoformat()
+    })
+    # Only the request's slowest few are kept, slowest first
+    statements.sort(key=lambda item: -item['ms'])
+    del statements[profile['keep']:]
+
+def instrument_engine(engine):
+    """Time every statement an engine runs inside a sampled request"""
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+def init_app(app, db):
+    """Create the profiler and hook the request lifecycle and db.engines"""
+    if not app.config.get('PROFILING_ENABLED', True):
+        return None
+
+    profiler = Profiler(
+        sample_rate=app.config.get('PROFILING_SAMPLE_RATE', DEFAULT_SAMPLE_RATE),
+        slow_statements=app.config.get('PROFILING_SLOW_STATEMENTS', DEFAULT_SLOW_STATEMENTS),
+        window=app.config.get('PROFILING_WINDOW', DEFAULT_WINDOW),
+        exclude=app.config.get('PROFILING_EXCLUDE', ())
+    )
+    app.extensions['profiling'] = profiler
+
+    with app.app_context():
+        for engine in db.engines.values():
+            instrument_engine(engine)
+
+    @app.before_request
+    def start_profile():
+        if profiler.should_sample(request.endpoint):
+            g._profile = {
+                'started': time.perf_counter(),
+                'queries': 0,
+                'sql_time': 0.0,
+                'statements': [],
+                'keep': profiler.slow_statements
+            }
+
+    @app.after_request
+    def finish_profile(response):
+        profile = g.pop('_profile', None)
+        if profile is not None:
+            wall = time.perf_counter() - profile['started']
+            profiler.record(request.endpoint, profile, wall, response.status_code)
+        return response
+
+    return profiler
+
+def get_profiler():
+    """The app's profiler, or None when PROFILING_ENABLED is off"""
+    return current_app.extensions.get('profiling')
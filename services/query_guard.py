@@ -0,0 +1,111 @@
+"""
+Query budget guard
+Counts the SQL statements each request runs, groups them by statement shape
+to spot N+1 patterns (the same query repeated once per row) and checks the
+total against the budget a view declares with @query_budget. QUERY_GUARD
+is 'off', 'warn' (log) or 'raise' (fail the request; used by the tests)
+"""
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from collections import Counter
+import re
+
+DEFAULT_BUDGET = 25
+DEFAULT_MAX_REPEATS = 3
+
+IN_LIST_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+
+class QueryBudgetExceeded(AssertionError):
+    """A request ran more queries than its budget, or repeated a statement shape"""
+
+def query_budget(max_queries, max_repeats=None):
+    """Declare how many queries a view may run, and optionally how often one shape may repeat"""
+    def decorate(view):
+        view.query_budget = max_queries
+        if max_repeats is not None:
+            view.query_max_repeats = max_repeats
+        return view
+    return decorate
+
+def statement_shape(statement):
+    """Statement text with whitespace, literals and IN-list lengths normalised"""
+    shape = ' '.join(statement.split())
+    shape = IN_LIST_RE.sub('(?...)', shape)
+    return LITERAL_RE.sub('?', shape)
+
+class QueryReport:
+    """Statements one request ran, and how they compare with its budget"""
+
+    def __init__(self, endpoint, budget, max_repeats):
+        self.endpoint = endpoint
+        self.budget = budget
+        self.max_repeats = max_repeats
+        self.shapes = Counter()
+
+    @property
+    def total(self):
+        return sum(self.shapes.values())
+
+    def repeated(self):
+        """Shapes run more than max_repeats times (likely N+1), most repeated first"""
+        return [(shape, count) for shape, count in self.shapes.most_common() if count > self.max_repeats]
+
+    def problems(self):
+        problems = []
+        if self.total > self.budget:
+            problems.append(f'{self.endpoint} ran {self.total} queries, budget is {self.budget}')
+        for shape, count in self.repeated():
+            problems.append(f'{self.endpoint} repeated a statement {count} times (N+1?): {shape[:200]}')
+        return problems
+
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        report = g.get('_query_report')
+        if report is not None:
+            report.shapes[statement_shape(statement)] += 1
+
+def init_app(app, db):
+    """Count queries per request when QUERY_GUARD is 'warn' or 'raise'"""
+    mode = app.config.get('QUERY_GUARD', 'off')
+    if mode not in ('warn', 'raise'):
+        return
+
+    with app.app_context():
+        for engine in db.engines.values():
+            event.listen(engine, 'before_cursor_execute', _count_statement)
+
+    @app.before_request
+    def start_query_report():
+        view = app.view_functions.get(request.endpoint)
+        if view is None or request.endpoint == 'static':
+            return
+        g._query_report = QueryReport(
+            request.endpoint,
+            getattr(view, 'query_budget', app.config.get('QUERY_GUARD_DEFAULT_BUDGET', DEFAULT_BUDGET)),
+            getattr(view, 'query_max_repeats', app.config.get('QUERY_GUARD_MAX_REPEATS', DEFAULT_MAX_REPEATS))
+        )
+
+    @app.after_request
+    def check_query_report(response):
+        report = g.get('_query_report')
+        if report is None:
+            return response
+        # Streamed bodies run their queries later; count what ran before
+        problems = report.problems()
+        if problems and mode == 'raise':
+            raise QueryBudgetExceeded('\n'.join(problems))
+        for problem in problems:
+            current_app.logger.warning('Query guard: %s', problem)
+        return response
+
+    @app.teardown_request
+    def keep_query_report(exc):
+        report = g.pop('_query_report', None)
+        if report is not None:
+            app.extensions['query_guard_last'] = report
+
+def last_report():
+    """The report of the app's most recent request (tests read this)"""
+    return current_app.extensions.get('query_guard_last')
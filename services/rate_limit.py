@@ -0,0 +1,219 @@
+"""
+Token-bucket rate limiting
+Enforces RATELIMIT_ENDPOINT_LIMITS on the login, registration, report
+submission and scraped API endpoints with an in-memory backend, or a
+shared SQLite file when several workers must agree
+"""
+
+from flask import current_app, request, jsonify
+from config import Config
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+
+PERIODS = {
+    'second': 1,
+    'minute': 60,
+    'hour': 3600,
+    'day': 86400
+}
+
+LIMIT_RE = re.compile(r'^\s*(\d+)\s*(?:per|/)\s*(second|minute|hour|day)s?\s*$', re.IGNORECASE)
+
+def parse_limit(value):
+    """Parse '100 per hour' or '100/hour' into (capacity, refill_per_second)"""
+    match = LIMIT_RE.match(value or '')
+    if not match:
+        raise ValueError(f'Invalid rate limit: {value!r}')
+    count = int(match.group(1))
+    return count, count / PERIODS[match.group(2).lower()]
+
+class MemoryBackend:
+    """Per-process token buckets, dropped once they have refilled"""
+
+    SWEEP_INTERVAL = 60
+
+    def __init__(self):
+        # key -> (tokens, updated, full_at)
+        self.buckets = {}
+        self.lock = threading.Lock()
+        self.next_sweep = time.monotonic() + self.SWEEP_INTERVAL
+
+    def hit(self, key, capacity, rate):
+        """Take one token; return (allowed, tokens_left)"""
+        now = time.monotonic()
+        with self.lock:
+            tokens, updated, _ = self.buckets.get(key, (capacity, now, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self.buckets[key] = (tokens, now, now + (capacity - tokens) / rate)
+            if now >= self.next_sweep:
+                self.sweep(now)
+        return allowed, tokens
+
+    def sweep(self, now):
+        # A full bucket is the same as no bucket, so idle clients cost nothing
+        for key in [key for key, bucket in self.buckets.items() if bucket[2] <= now]:
+            del self.buckets[key]
+        self.next_sweep = now + self.SWEEP_INTERVAL
+
+    def prune(self, idle_seconds):
+        """Drop buckets that have refilled; each one records when it is full"""
+        with self.lock:
+            before = len(self.buckets)
+            self.sweep(time.monotonic())
+            return before - len(self.buckets)
+
+class SqliteBackend:
+    """Token buckets in a SQLite file shared by all workers on a host
+
+    Each hit is a single UPSERT on a dedicated file, never the application
+    database, so it takes no application transaction.
+    """
+
+    HIT_SQL = '''
+        INSERT INTO buckets (key, tokens, updated, allowed) VALUES (:key, :capacity - 1, :now, 1)
+        ON CONFLICT(key) DO UPDATE SET
+            allowed = MIN(:capacity, tokens + (:now - updated) * :rate) >= 1,
+            tokens = MIN(:capacity, tokens + (:now - updated) * :rate)
+                     - (MIN(:capacity, tokens + (:now - updated) * :rate) >= 1),
+            updated = :now
+        RETURNING allowed, tokens
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._connection().execute(
+            'CREATE TABLE IF NOT EXISTS buckets ('
+            'key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL, allowed INTEGER NOT NULL)'
+        )
+
+    def _connection(self):
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=OFF')
+            self.local.connection = connection
+        return connection
+
+    def hit(self, key, capacity, rate):
+        """Take one token; return (allowed, tokens_left)"""
+        row = self._connection().execute(self.HIT_SQL, {
+            'key': key,
+            'capacity': capacity,
+            'rate': rate,
+            'now': time.time()
+        }).fetchone()
+        return bool(row[0]), row[1]
+
+    def prune(self, idle_seconds):
+        """Delete buckets untouched for idle_seconds, by then as full as a missing one"""
+        return self._connection().execute(
+            'DELETE FROM buckets WHERE updated < ?', (time.time() - idle_seconds,)
+        ).rowcount
+
+def client_address(remote_addr, forwarded_for, trusted_hops):
+    """The client address, taken from X-Forwarded-For like ProxyFix(x_for=trusted_hops)"""
+    if trusted_hops:
+        values = [value.strip() for value in forwarded_for.split(',') if value.strip()]
+        if len(values) >= trusted_hops:
+            return values[-trusted_hops]
+    return remote_addr
+
+def create_backend(storage_url):
+    """memory:// for a single worker, sqlite:///path or file:///path to share"""
+    if storage_url.startswith('sqlite:///'):
+        return SqliteBackend(storage_url[len('sqlite:///'):])
+    if storage_url.startswith('file://'):
+        return SqliteBackend(storage_url[len('file://'):])
+    if storage_url != 'memory://':
+        current_app.logger.warning('Unsupported RATELIMIT_STORAGE_URL %s, using memory://', storage_url)
+    return MemoryBackend()
+
+def parse_limits(limits):
+    """RATELIMIT_ENDPOINT_LIMITS as {'endpoint' or 'METHOD endpoint': (capacity, refill_per_second)}"""
+    parsed = {}
+    for rule, limit in limits.items():
+        method, _, endpoint = rule.strip().rpartition(' ')
+        parsed[f'{method.upper()} {endpoint}' if method else endpoint] = parse_limit(limit)
+    return parsed
+
+class RateLimiter:
+    """Flask extension applying per-endpoint token buckets per client address
+
+    Each app gets its own instance (RateLimiter(app)), kept in
+    app.extensions['rate_limiter'], so apps never share limits or buckets.
+    Behind a proxy, set PROXY_FIX_X_FOR so request.remote_addr is the client
+    from X-Forwarded-For rather than the proxy every request comes through.
+    """
+
+    def __init__(self, app=None):
+        self.backend = None
+        self.limits = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        # Fill in RATELIMIT_* settings from config.py the app did not set itself
+        for key in dir(Config):
+            if key.startswith('RATELIMIT_'):
+                app.config.setdefault(key, getattr(Config, key))
+
+        app.extensions['rate_limiter'] = self
+        if not app.config['RATELIMIT_ENABLED']:
+            return
+
+        self.limits = parse_limits(app.config['RATELIMIT_ENDPOINT_LIMITS'])
+        with app.app_context():
+            self.backend = create_backend(app.config['RATELIMIT_STORAGE_URL'])
+        app.before_request(self.check)
+
+    def rule_for(self, endpoint, method):
+        """The limits key that applies to a request, or None when it is not limited"""
+        for rule in (f'{method} {endpoint}', endpoint):
+            if rule in self.limits:
+                return rule
+        return None
+
+    def consume(self, endpoint, method, client):
+        """Take one token from client's bucket; return (allowed, retry_after, capacity), or None if not limited"""
+        rule = self.rule_for(endpoint, method)
+        if rule is None:
+            return None
+        capacity, rate = self.limits[rule]
+        allowed, tokens = self.backend.hit(f'{rule}:{client}', capacity, rate)
+        retry_after = 0 if allowed else max(1, math.ceil((1 - tokens) / rate))
+        return allowed, retry_after, capacity
+
+    def prune(self):
+        """Drop buckets idle for longer than the slowest limit takes to refill"""
+        if self.backend is None or not self.limits:
+            return 0
+        return self.backend.prune(max(capacity / rate for capacity, rate in self.limits.values()))
+
+    def check(self):
+        """before_request hook; returns a 429 response when the bucket is empty"""
+        result = self.consume(request.endpoint, request.method, request.remote_addr)
+        if result is None or result[0]:
+            return None
+        _, retry_after, capacity = result
+
+        response = jsonify({'error': 'rate_limited', 'retry_after': retry_after})
+        response.status_code = 429
+        response.headers['Retry-After'] = str(retry_after)
+        response.headers['X-RateLimit-Limit'] = str(capacity)
+        return response
+
+def prune_buckets():
+    """Delete idle buckets from the shared backend; the rate_limit_prune job"""
+    limiter = current_app.extensions.get('rate_limiter')
+    return {'pruned': limiter.prune() if limiter is not None else 0}
@@ -0,0 +1,101 @@
+"""
+Read-replica routing
+GET views marked with @use_replica read through the 'replica' bind when
+DATABASE_REPLICA_URL is set. Flushes and DML always go to the primary, and
+a client that has just written something stays on the primary for
+REPLICA_STICKY_SECONDS so it reads its own writes
+"""
+
+from flask import request, session as client_session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+import sqlite3
+import time
+
+REPLICA_BIND = 'replica'
+STICKY_KEY = '_primary_until'
+DEFAULT_STICKY_SECONDS = 10
+
+def use_replica(view):
+    """Mark a GET view whose reads may be served by the replica"""
+    view.use_replica = True
+    return view
+
+def _is_read(clause):
+    return clause is None or getattr(clause, 'is_select', False)
+
+class RoutingSession(Session):
+    """Session that sends reads to the replica while session.info['use_replica'] is set"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self.info.get('use_replica') and not self._flushing and _is_read(clause):
+            replica = self._db.engines.get(REPLICA_BIND)
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _note_flush(session, flush_context):
+    session.info['wrote'] = True
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def _note_dml(orm_execute_state):
+    if not orm_execute_state.is_select:
+        orm_execute_state.session.info['wrote'] = True
+
+def configure(app):
+    """Add the replica bind from DATABASE_REPLICA_URL; call before db.init_app"""
+    replica_url = app.config.get('DATABASE_REPLICA_URL')
+    if replica_url:
+        binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+        binds.setdefault(REPLICA_BIND, replica_url)
+        app.config['SQLALCHEMY_BINDS'] = binds
+
+def init_app(app, db):
+    """Route marked GET views to the replica and make writers sticky"""
+    if not app.config.get('DATABASE_REPLICA_URL'):
+        return
+
+    @app.before_request
+    def route_reads():
+        if request.method not in ('GET', 'HEAD'):
+            return
+        view = app.view_functions.get(request.endpoint)
+        if not getattr(view, 'use_replica', False):
+            return
+        if client_session.get(STICKY_KEY, 0) > time.time():
+            return
+        db.session.info['use_replica'] = True
+
+    @app.after_request
+    def remember_writes(response):
+        if request.method not in ('GET', 'HEAD') and db.session.info.get('wrote'):
+            sticky = app.config.get('REPLICA_STICKY_SECONDS', DEFAULT_STICKY_SECONDS)
+            client_session[STICKY_KEY] = time.time() + sticky
+        return response
+
+    @app.cli.command('sync-replica')
+    def sync_replica_command():
+        """Copy a SQLite primary onto its SQLite replica (local testing)"""
+        with app.app_context():
+            copy_sqlite_database(db.engines[None], db.engines[REPLICA_BIND])
+        print('Replica synced from primary.')
+
+def _sqlite_path(engine):
+    url = make_url(str(engine.url))
+    if url.get_backend_name() != 'sqlite' or url.database in (None, '', ':memory:'):
+        raise ValueError(f'{engine.url} is not a SQLite file')
+    return url.database
+
+def copy_sqlite_database(primary_engine, replica_engine):
+    """Snapshot a SQLite primary into a SQLite replica with the backup API"""
+    source = sqlite3.connect(_sqlite_path(primary_engine))
+    target = sqlite3.connect(_sqlite_path(replica_engine))
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+    # Pooled replica connections would keep reading the old file pages
+    replica_engine.dispose()
@@ -0,0 +1,116 @@
+"""
+Precomputed per-entity report counts
+Kept in step with report submission and moderation so entity pages never
+have to aggregate over an entity's full report history
+"""
+
+from flask import current_app
+from models import Entity, EntityReportCount, FraudReport, db
+from sqlalchemy.exc import IntegrityError
+
+DEFAULT_BATCH_SIZE = 1000
+
+def _bump(entity_id, status, risk_level, delta):
+    """Add delta to one (entity, status, risk) counter, creating it if needed"""
+    match = (
+        (EntityReportCount.entity_id == entity_id) &
+        (EntityReportCount.status == status) &
+        (EntityReportCount.risk_level == risk_level)
+    )
+    result = db.session.execute(
+        db.update(EntityReportCount).where(match).values(
+            report_count=EntityReportCount.report_count + delta
+        )
+    )
+    if result.rowcount or delta < 0:
+        return
+
+    try:
+        with db.session.begin_nested():
+            db.session.add(EntityReportCount(
+                entity_id=entity_id,
+                status=status,
+                risk_level=risk_level,
+                report_count=delta
+            ))
+    except IntegrityError:
+        # Another worker created the row first
+        db.session.execute(
+            db.update(EntityReportCount).where(match).values(
+                report_count=EntityReportCount.report_count + delta
+            )
+        )
+
+def record_report(report):
+    """Count a newly submitted report (call before committing it)"""
+    if report.entity_id:
+        _bump(report.entity_id, report.status or 'pending', report.risk_level, 1)
+
+def record_status_change(report, old_status):
+    """Move a report between status buckets (call before committing it)"""
+    if report.entity_id and old_status != report.status:
+        _bump(report.entity_id, old_status, report.risk_level, -1)
+        _bump(report.entity_id, report.status, report.risk_level, 1)
+
+def counts_for_entity(entity_id):
+    """Return total and per-status / per-risk counts from the summary rows"""
+    rows = EntityReportCount.query.filter_by(entity_id=entity_id).all()
+
+    counts = {'total': 0, 'by_status': {}, 'by_risk': {}}
+    for row in rows:
+        counts['total'] += row.report_count
+        counts['by_status'][row.status] = counts['by_status'].get(row.status, 0) + row.report_count
+        counts['by_risk'][row.risk_level] = counts['by_risk'].get(row.risk_level, 0) + row.report_count
+    return counts
+
+def _rebuild(match):
+    """Replace the summary rows of the entities whose id satisfies match(column)"""
+    db.session.execute(db.delete(EntityReportCount).where(match(EntityReportCount.entity_id)))
+    grouped = db.select(
+        FraudReport.entity_id,
+        FraudReport.status,
+        FraudReport.risk_level,
+        db.func.count(FraudReport.id)
+    ).where(
+        FraudReport.entity_id.isnot(None), match(FraudReport.entity_id)
+    ).group_by(FraudReport.entity_id, FraudReport.status, FraudReport.risk_level)
+
+    rows = [
+        {'entity_id': entity_id, 'status': status, 'risk_level': risk_level, 'report_count': count}
+        for entity_id, status, risk_level, count in db.session.execute(grouped)
+    ]
+    if rows:
+        db.session.execute(db.insert(EntityReportCount), rows)
+    db.session.commit()
+    return len(rows)
+
+def rebuild_counts(entity_ids=None, batch_size=None):
+    """Recompute summary rows from fraud_reports, for all or some entities
+
+    A full rebuild walks entity id ranges of REPORT_COUNTS_BATCH_SIZE and
+    commits each one, so no single write transaction covers the whole table.
+    """
+    if entity_ids is not None:
+        return _rebuild(lambda column: column.in_(entity_ids))
+
+    batch_size = batch_size or current_app.config.get('REPORT_COUNTS_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+    rebuilt = 0
+    last_id = 0
+    while True:
+        ids = db.session.scalars(
+            db.select(Entity.id).where(Entity.id > last_id).order_by(Entity.id).limit(batch_size)
+        ).all()
+        if not ids:
+            break
+        first_id, last_id = last_id, ids[-1]
+        rebuilt += _rebuild(lambda column: (column > first_id) & (column <= last_id))
+    return rebuilt
+
+def init_app(app):
+    """Add `flask rebuild-report-counts`, the one-off backfill after upgrading"""
+    @app.cli.command('rebuild-report-counts')
+    def rebuild_report_counts_command():
+        """Recompute every entity's report counters from fraud_reports"""
+        with app.app_context():
+            rows = rebuild_counts()
+        print(f"Rebuilt {rows} report counter rows.")
@@ -0,0 +1,165 @@
+"""
+Entity risk scoring engine
+Computes a 0-100 risk score per entity from its accumulated fraud reports
+"""
+
+from flask import current_app
+from models import Entity, FraudReport, db
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+import time
+
+# Report severity and moderation status weights
+SEVERITY_WEIGHTS = {'Low': 1.0, 'Medium': 2.0, 'High': 4.0, 'Critical': 8.0}
+STATUS_WEIGHTS = {'verified': 1.0, 'under_review': 0.6, 'pending': 0.4, 'rejected': 0.0}
+
+# Score thresholds for the derived risk level (checked highest first)
+RISK_BANDS = [(75.0, 'Critical'), (50.0, 'High'), (25.0, 'Medium')]
+
+DEFAULT_HALF_LIFE_DAYS = 180
+DEFAULT_SATURATION = 20.0
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_DECAY_STEP_HOURS = 24
+
+def touched_entities_query(since, stale_before):
+    """Entity ids never scored, with reports updated after since, or with reports and scored before stale_before
+
+    Each branch of the union is an index range: fraud_reports is read only
+    for the rows updated after since, never grouped in full. Rescoring stale
+    entities lets recency decay reach quiet ones, and notices reports that
+    were removed without touching any other row.
+    """
+    branches = [
+        db.select(Entity.id).where(Entity.risk_scored_at.is_(None)),
+        db.select(Entity.id).where(Entity.risk_scored_at < stale_before, Entity.risk_report_count > 0)
+    ]
+    if since is not None:
+        branches.append(db.select(FraudReport.entity_id).where(
+            FraudReport.updated_at > since, FraudReport.entity_id.isnot(None)
+        ))
+    return db.union(*branches)
+
+def extract_reports(entity_filter=None):
+    """Load the scoring columns of fraud reports as a DataFrame"""
+    stmt = db.select(
+        FraudReport.entity_id,
+        FraudReport.risk_level,
+        FraudReport.status,
+        FraudReport.created_at
+    ).where(FraudReport.entity_id.isnot(None))
+
+    if entity_filter is not None:
+        stmt = stmt.where(FraudReport.entity_id.in_(entity_filter))
+
+    frame = pd.read_sql(stmt, db.session.connection())
+    frame['created_at'] = pd.to_datetime(frame['created_at'])
+    return frame
+
+def compute_scores(frame, now=None, half_life_days=DEFAULT_HALF_LIFE_DAYS,
+                   saturation=DEFAULT_SATURATION):
+    """Aggregate report rows into (entity_ids, scores, report_counts) numpy arrays"""
+    if frame.empty:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64), np.empty(0, dtype=np.int64)
+
+    now = now or datetime.utcnow()
+
+    # Per-report weight: severity x verification status x recency decay
+    severity = frame['risk_level'].map(SEVERITY_WEIGHTS).fillna(1.0).to_numpy(dtype=np.float64)
+    status = frame['status'].map(STATUS_WEIGHTS).fillna(STATUS_WEIGHTS['pending']).to_numpy(dtype=np.float64)
+
+    created = frame['created_at'].to_numpy(dtype='datetime64[ns]')
+    age_days = (np.datetime64(now, 'ns') - created) / np.timedelta64(1, 'D')
+    age_days = np.nan_to_num(np.clip(age_days, 0.0, None), nan=0.0)
+    decay = np.exp2(-age_days / half_life_days)
+
+    weights = severity * status * decay
+
+    # Sum per entity, then squash onto 0-100 so report count saturates
+    codes, entity_ids = pd.factorize(frame['entity_id'], sort=True)
+    raw = np.bincount(codes, weights=weights, minlength=len(entity_ids))
+    scores = 100.0 * (1.0 - np.exp(-raw / saturation))
+    counts = np.bincount(codes, minlength=len(entity_ids))
+
+    return np.asarray(entity_ids, dtype=np.int64), np.round(scores, 2), counts.astype(np.int64)
+
+def score_to_level(scores):
+    """Map numeric scores to Low/Medium/High/Critical"""
+    conditions = [scores >= threshold for threshold, _ in RISK_BANDS]
+    choices = [level for _, level in RISK_BANDS]
+    return np.select(conditions, choices, default='Low')
+
+def with_unreported(entity_ids, scores, counts, candidate_ids):
+    """Append a zero score for candidates that have no reports left"""
+    missing = np.setdiff1d(np.asarray(candidate_ids, dtype=np.int64), entity_ids)
+    return (
+        np.concatenate([entity_ids, missing]),
+        np.concatenate([scores, np.zeros(len(missing))]),
+        np.concatenate([counts, np.zeros(len(missing), dtype=np.int64)])
+    )
+
+def write_scores(entity_ids, scores, counts, scored_at, batch_size=DEFAULT_BATCH_SIZE):
+    """Bulk update risk_score, computed_risk_level, risk_report_count and risk_scored_at by primary key
+
+    risk_level is left alone: moderators set it by hand. Each batch commits
+    on its own, keeping write transactions (and SQLite's single writer
+    lock) short during a full rescore.
+    """
+    levels = score_to_level(scores)
+
+    for start in range(0, len(entity_ids), batch_size):
+        end = start + batch_size
+        db.session.execute(db.update(Entity), [
+            {
+                'id': int(entity_id),
+                'risk_score': float(score),
+                'computed_risk_level': str(level),
+                'risk_report_count': int(count),
+                'risk_scored_at': scored_at
+            }
+            for entity_id, score, level, count in zip(
+                entity_ids[start:end], scores[start:end], levels[start:end], counts[start:end]
+            )
+        ])
+        db.session.commit()
+
+def rescore_entities(full=False, now=None):
+    """Recompute risk scores for touched entities, or all entities when full=True"""
+    started = time.perf_counter()
+    now = now or datetime.utcnow()
+    config = current_app.config
+
+    if full:
+        candidate_ids = db.session.scalars(db.select(Entity.id)).all()
+        frame = extract_reports()
+    else:
+        # The previous run's scored_at; reports updated after it changed
+        since = db.session.scalar(db.select(db.func.max(Entity.risk_scored_at)))
+        stale_before = now - timedelta(hours=config.get('RISK_SCORE_DECAY_STEP_HOURS', DEFAULT_DECAY_STEP_HOURS))
+        touched = touched_entities_query(since, stale_before)
+        candidate_ids = db.session.scalars(touched).all()
+        # A subquery rather than a bound id list, which SQLite caps in size
+        frame = extract_reports(touched)
+
+    entity_ids, scores, counts = compute_scores(
+        frame,
+        now=now,
+        half_life_days=config.get('RISK_SCORE_HALF_LIFE_DAYS', DEFAULT_HALF_LIFE_DAYS),
+        saturation=config.get('RISK_SCORE_SATURATION', DEFAULT_SATURATION)
+    )
+    entity_ids, scores, counts = with_unreported(entity_ids, scores, counts, candidate_ids)
+
+    write_scores(
+        entity_ids,
+        scores,
+        counts,
+        scored_at=now,
+        batch_size=config.get('RISK_SCORE_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+    )
+
+    return {
+        'mode': 'full' if full else 'incremental',
+        'reports': len(frame),
+        'entities': len(entity_ids),
+        'seconds': round(time.perf_counter() - started, 3)
+    }
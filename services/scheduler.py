@@ -0,0 +1,354 @@
+"""
+Periodic job scheduler
+Maintenance jobs run on cron schedules (UTC) from SCHEDULER_JOBS, off the
+request path, in a `flask run-jobs --loop` process rather than the web
+workers. Each job is a row in scheduled_jobs. Pollers read the table, and
+a conditional UPDATE lets only one claim a due run: it advances
+next_run_at and takes a leader lock for SCHEDULER_LOCK_SECONDS.
+Every run is recorded in job_runs with its timing, result and error
+"""
+
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from models import JobRun, ScheduledJob, db
+from services import metrics
+from datetime import datetime, time as clock_time, timedelta
+import click
+import importlib
+import json
+import os
+import random
+import socket
+import threading
+import time
+import traceback
+
+DEFAULT_POLL_SECONDS = 30
+DEFAULT_LOCK_SECONDS = 3600
+DEFAULT_HISTORY_DAYS = 30
+
+# Job name -> (module, function); imported when the job runs, so pandas and
+# friends stay out of workers that never run them
+JOBS = {
+    'country_statistics': ('services.country_stats', 'refresh_statistics'),
+    'report_counts': ('services.report_counts', 'rebuild_counts'),
+    'risk_rescore': ('services.risk_scoring', 'rescore_entities'),
+    'entity_merge': ('services.entity_keys', 'consolidate_entities'),
+    'audit_archive': ('services.maintenance', 'archive_audit_logs'),
+    'backup': ('services.maintenance', 'backup_database'),
+    'job_history': ('services.scheduler', 'prune_history'),
+    'rate_limit_prune': ('services.rate_limit', 'prune_buckets')
+}
+
+DISABLED = 'off'
+
+ALIASES = {
+    '@hourly': '0 * * * *',
+    '@daily': '0 0 * * *',
+    '@weekly': '0 0 * * 0',
+    '@monthly': '0 0 1 * *',
+    '@yearly': '0 0 1 1 *'
+}
+
+# (name, lowest, highest); weekday 7 is also Sunday
+FIELDS = (('minute', 0, 59), ('hour', 0, 23), ('day', 1, 31), ('month', 1, 12), ('weekday', 0, 7))
+
+_started_pid = None
+_start_lock = threading.Lock()
+
+def _parse_field(text, name, low, high):
+    values = set()
+    for part in text.split(','):
+        body, _, step = part.partition('/')
+        if body == '*':
+            start, end = low, high
+        elif '-' in body:
+            start, end = (int(value) for value in body.split('-', 1))
+        else:
+            start = int(body)
+            # '5/15' means 5, 20, 35, 50
+            end = high if step else start
+        step = int(step) if step else 1
+        if not low <= start <= end <= high or step < 1:
+            raise ValueError(f'Invalid cron {name} field {text!r}')
+        values.update(range(start, end + 1, step))
+    return values
+
+class CronSchedule:
+    """Five-field cron expression: minute hour day-of-month month day-of-week"""
+
+    def __init__(self, expression):
+        self.expression = expression
+        fields = ALIASES.get(expression.strip(), expression).split()
+        if len(fields) != len(FIELDS):
+            raise ValueError(f'Cron expression {expression!r} needs {len(FIELDS)} fields')
+
+        minutes, hours, days, months, weekdays = (
+            _parse_field(text, name, low, high) for text, (name, low, high) in zip(fields, FIELDS)
+        )
+        self.minutes = sorted(minutes)
+        self.hours = sorted(hours)
+        self.days = days
+        self.months = months
+        self.weekdays = {weekday % 7 for weekday in weekdays}
+        # Like cron, a restricted day-of-month and day-of-week match either
+        self.any_day = fields[2].startswith('*')
+        self.any_weekday = fields[4].startswith('*')
+
+    def _day_matches(self, day):
+        if day.month not in self.months:
+            return False
+        day_match = day.day in self.days
+        weekday_match = day.isoweekday() % 7 in self.weekdays
+        if self.any_day or self.any_weekday:
+            return day_match and weekday_match
+        return day_match or weekday_match
+
+    def next_after(self, moment):
+        """The first matching minute strictly after moment"""
+        earliest = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        day = earliest.date()
+        # Leap days and weekday/day combinations repeat within a few years
+        for _ in range(366 * 8):
+            if self._day_matches(day):
+                for hour in self.hours:
+                    for minute in self.minutes:
+                        candidate = datetime.combine(day, clock_time(hour, minute))
+                        if candidate >= earliest:
+                            return candidate
+            day += timedelta(days=1)
+        raise ValueError(f'Cron expression {self.expression!r} never matches')
+
+def worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+def configured_schedules():
+    """SCHEDULER_JOBS for the registered jobs; 'off' disables a job"""
+    schedules = current_app.config.get('SCHEDULER_JOBS') or {}
+    if not current_app.config.get('BACKUP_ENABLED', False):
+        schedules = dict(schedules, backup=DISABLED)
+    return {name: (schedules.get(name) or DISABLED).strip() for name in JOBS}
+
+def sync_jobs(now=None):
+    """Create or update a scheduled_jobs row per registered job from the configuration"""
+    now = now or datetime.utcnow()
+    jobs = {job.name: job for job in ScheduledJob.query.all()}
+
+    for name, schedule in configured_schedules().items():
+        enabled = schedule != DISABLED
+        next_run_at = CronSchedule(schedule).next_after(now) if enabled else now
+        job = jobs.get(name)
+        if job is None:
+            db.session.add(ScheduledJob(name=name, schedule=schedule, enabled=enabled, next_run_at=next_run_at))
+        elif job.schedule != schedule or job.enabled != enabled:
+            job.schedule = schedule
+            job.enabled = enabled
+            job.next_run_at = next_run_at
+
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Another worker inserted the same rows first
+        db.session.rollback()
+
+def claim(name, now, due_only=True):
+    """Take a job's leader lock, advancing next_run_at for scheduled runs; False if another worker has it"""
+    job = db.session.get(ScheduledJob, name)
+    if job is None:
+        return False
+
+    lease = current_app.config.get('SCHEDULER_LOCK_SECONDS', DEFAULT_LOCK_SECONDS)
+    values = {'locked_by': worker_id(), 'locked_until': now + timedelta(seconds=lease)}
+    conditions = [
+        ScheduledJob.name == name,
+        db.or_(ScheduledJob.locked_until.is_(None), ScheduledJob.locked_until < now)
+    ]
+    if due_only:
+        conditions += [ScheduledJob.enabled.is_(True), ScheduledJob.next_run_at <= now]
+        values['next_run_at'] = CronSchedule(job.schedule).next_after(now)
+
+    # One UPDATE decides the race: every other worker matches no row
+    claimed = db.session.execute(
+        db.update(ScheduledJob).where(*conditions).values(**values).execution_options(synchronize_session=False)
+    ).rowcount == 1
+    db.session.commit()
+    return claimed
+
+def run_job(name, trigger='schedule'):
+    """Run a claimed job, record it in job_runs and release the lock; returns the JobRun id"""
+    run = JobRun(job_name=name, worker=worker_id(), trigger=trigger, started_at=datetime.utcnow())
+    db.session.add(run)
+    db.session.commit()
+    run_id = run.id
+
+    started = time.perf_counter()
+    result = error = None
+    try:
+        module_name, function_name = JOBS[name]
+        result = getattr(importlib.import_module(module_name), function_name)()
+        status = 'success'
+    except Exception:
+        db.session.rollback()
+        current_app.logger.exception('Scheduled job %s failed', name)
+        status = 'failed'
+        error = traceback.format_exc()[-4000:]
+    seconds = time.perf_counter() - started
+    finished_at = datetime.utcnow()
+
+    db.session.execute(db.update(JobRun).where(JobRun.id == run_id).values(
+        finished_at=finished_at,
+        duration_ms=round(seconds * 1000, 3),
+        status=status,
+        result=json.dumps(result, default=str) if result is not None else None,
+        error=error
+    ))
+    db.session.execute(db.update(ScheduledJob).where(ScheduledJob.name == name).values(
+        last_run_at=finished_at,
+        last_status=status,
+        last_duration_ms=round(seconds * 1000, 3),
+        locked_by=None,
+        locked_until=None
+    ))
+    db.session.commit()
+
+    metrics.observe('rmgfraud_job_duration_seconds', seconds, job=name, status=status)
+    return run_id
+
+def request_run(name, now=None):
+    """Make an enabled job due now, for the next poll of whichever process runs jobs; False if it is disabled"""
+    now = now or datetime.utcnow()
+    sync_jobs(now)
+    requested = db.session.execute(
+        db.update(ScheduledJob).where(ScheduledJob.name == name, ScheduledJob.enabled.is_(True)).values(
+            next_run_at=now
+        ).execution_options(synchronize_session=False)
+    ).rowcount == 1
+    db.session.commit()
+    return requested
+
+def run_due_jobs(now=None):
+    """Claim and run every due job this worker wins; returns their names"""
+    now = now or datetime.utcnow()
+    due = db.session.execute(
+        db.select(ScheduledJob.name).where(ScheduledJob.enabled.is_(True), ScheduledJob.next_run_at <= now)
+    ).scalars().all()
+    db.session.commit()
+
+    ran = []
+    for name in due:
+        if name in JOBS and claim(name, now):
+            run_job(name)
+            ran.append(name)
+    return ran
+
+def prune_history():
+    """Delete job runs older than SCHEDULER_HISTORY_DAYS and close runs whose worker died"""
+    now = datetime.utcnow()
+    cutoff = now - timedelta(days=current_app.config.get('SCHEDULER_HISTORY_DAYS', DEFAULT_HISTORY_DAYS))
+    lease = current_app.config.get('SCHEDULER_LOCK_SECONDS', DEFAULT_LOCK_SECONDS)
+
+    abandoned = db.session.execute(db.update(JobRun).where(
+        JobRun.status == 'running',
+        JobRun.started_at < now - timedelta(seconds=lease)
+    ).values(status='abandoned')).rowcount
+    deleted = db.session.execute(db.delete(JobRun).where(JobRun.started_at < cutoff)).rowcount
+    db.session.commit()
+    return {'deleted': deleted, 'abandoned': abandoned}
+
+def job_status():
+    """Every job with its schedule, lock and most recent runs"""
+    jobs = ScheduledJob.query.order_by(ScheduledJob.name).all()
+    runs = JobRun.query.order_by(JobRun.started_at.desc()).limit(
+        current_app.config.get('SCHEDULER_STATUS_RUNS', 50)
+    ).all()
+    return {
+        'jobs': [{
+            'name': job.name,
+            'schedule': job.schedule,
+            'enabled': job.enabled,
+            'next_run_at': job.next_run_at.isoformat() if job.enabled else None,
+            'locked_by': job.locked_by,
+            'last_run_at': job.last_run_at.isoformat() if job.last_run_at else None,
+            'last_status': job.last_status,
+            'last_duration_ms': job.last_duration_ms
+        } for job in jobs],
+        'recent_runs': [{
+            'job': run.job_name,
+            'trigger': run.trigger,
+            'worker': run.worker,
+            'started_at': run.started_at.isoformat(),
+            'duration_ms': run.duration_ms,
+            'status': run.status,
+            'error': run.error.strip().splitlines()[-1] if run.error else None
+        } for run in runs]
+    }
+
+def _loop(app):
+    poll = app.config.get('SCHEDULER_POLL_SECONDS', DEFAULT_POLL_SECONDS)
+    synced = False
+    while True:
+        # Jitter keeps the workers from polling in lockstep
+        time.sleep(poll * random.uniform(0.5, 1.5))
+        try:
+            with app.app_context():
+                if not synced:
+                    sync_jobs()
+                    synced = True
+                run_due_jobs()
+        except Exception:
+            app.logger.exception('Scheduler poll failed')
+
+def start(app):
+    """Poll for due jobs from a daemon thread in this process, once per process"""
+    global _started_pid
+    with _start_lock:
+        if _started_pid == os.getpid():
+            return
+        _started_pid = os.getpid()
+    threading.Thread(target=_loop, args=(app,), name='scheduler', daemon=True).start()
+
+def init_app(app):
+    """Add the job commands, and start the in-process scheduler only when SCHEDULER_ENABLED is set"""
+    # Serverless functions are frozen between requests; run `flask run-jobs` from a cron trigger there
+    if app.config.get('SCHEDULER_ENABLED', False) and app.config.get('DB_ENGINE_PROFILE_ACTIVE') != 'serverless':
+        @app.before_request
+        def start_scheduler():
+            # Started from the first request so each forked worker gets its own thread
+            if _started_pid != os.getpid():
+                start(app)
+
+    @app.cli.command('run-jobs')
+    @click.option('--loop', is_flag=True, help='keep polling, for a dedicated scheduler process')
+    def run_jobs_command(loop):
+        """Run the scheduled jobs that are due"""
+        with app.app_context():
+            sync_jobs()
+            while True:
+                ran = run_due_jobs()
+                if ran:
+                    print(f"Ran {', '.join(ran)}.")
+                if not loop:
+                    break
+                time.sleep(app.config.get('SCHEDULER_POLL_SECONDS', DEFAULT_POLL_SECONDS))
+
+    @app.cli.command('run-job')
+    @click.argument('name', type=click.Choice(sorted(JOBS)))
+    def run_job_command(name):
+        """Run one job now, outside its schedule"""
+        with app.app_context():
+            sync_jobs()
+            if not claim(name, datetime.utcnow(), due_only=False):
+                print(f'{name} is already running on another worker.')
+                return
+            run_id = run_job(name, trigger='manual')
+            run = db.session.get(JobRun, run_id)
+            print(f'{name}: {run.status} in {run.duration_ms:.0f} ms{" - " + run.result if run.result else ""}')
+
+    @app.cli.command('jobs')
+    def jobs_command():
+        """List scheduled jobs with their next and last runs"""
+        with app.app_context():
+            sync_jobs()
+            for job in job_status()['jobs']:
+                print(f"{job['name']:<20} {job['schedule']:<16} next {job['next_run_at'] or '-':<20} "
+                      f"last {job['last_run_at'] or '-'} {job['last_status'] or ''}")
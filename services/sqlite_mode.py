@@ -0,0 +1,214 @@
+"""
+SQLite production mode
+Every connection to a SQLite file gets WAL journaling and tuning pragmas
+(synchronous, mmap_size, busy_timeout, cache_size). Writes go through a
+single-writer queue: the first INSERT/UPDATE/DELETE or SAVEPOINT of a
+transaction waits its turn (a thread lock inside the process, a lock file
+across gunicorn workers) and opens it with BEGIN IMMEDIATE, so writers
+queue instead of sleep-polling SQLite's busy handler or failing with
+"database is locked", while readers carry on against the WAL
+"""
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+import os
+import re
+import sqlite3
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    # No cross-process lock on Windows; SQLite's busy handler still applies
+    fcntl = None
+
+# A SAVEPOINT outside a transaction opens a deferred one (session.begin_nested()),
+# so the writes inside it would otherwise skip the queue and upgrade the lock late
+WRITE_RE = re.compile(r'^\s*(INSERT|UPDATE|DELETE|REPLACE|SAVEPOINT)\b', re.IGNORECASE)
+
+# Key in the pool's connection_record.info while a connection holds the queue
+HOLDING_KEY = 'rmg_write_queue'
+
+# One queue per database file, shared by every engine on that file
+_queues = {}
+_queues_lock = threading.Lock()
+
+class WriteQueue:
+    """Runs one write transaction at a time against a SQLite file"""
+
+    def __init__(self, path, timeout):
+        self.path = path
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.lock_path = f'{path}-writer.lock'
+        self.lock_file = None
+        self.lock_pid = None
+        self.stats_lock = threading.Lock()
+        self.writes = 0
+        self.waits = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.timeouts = 0
+
+    def _file_lock(self, deadline):
+        """Take the cross-process lock file by deadline; only the thread holding self.lock gets here"""
+        if fcntl is None:
+            return True
+        if self.lock_pid != os.getpid():
+            # A descriptor inherited through fork would share the parent's lock
+            self.lock_file = open(self.lock_path, 'a')
+            self.lock_pid = os.getpid()
+
+        # Poll rather than block in flock(), which has no timeout: a worker
+        # stuck mid-transaction must not hang every other worker's writes
+        delay = 0.001
+        while True:
+            try:
+                fcntl.flock(self.lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return True
+            except BlockingIOError:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    return False
+                time.sleep(min(delay, remaining))
+                delay = min(delay * 2, 0.05)
+
+    def acquire(self):
+        """Wait for the queue; False when the thread lock times out (SQLite's own busy handler takes over)
+
+        Raises sqlite3.OperationalError when another process holds the lock
+        file for longer than the timeout.
+        """
+        started = time.perf_counter()
+        acquired = self.lock.acquire(timeout=self.timeout)
+        if acquired and not self._file_lock(started + self.timeout):
+            self.lock.release()
+            with self.stats_lock:
+                self.timeouts += 1
+            raise sqlite3.OperationalError(
+                f'database is locked: another process held the write queue for over {self.timeout}s'
+            )
+        waited = time.perf_counter() - started
+
+        with self.stats_lock:
+            if acquired:
+                self.writes += 1
+            else:
+                self.timeouts += 1
+            # Anything over a millisecond counts as having queued
+            if waited > 0.001 or not acquired:
+                self.waits += 1
+                self.wait_total += waited
+                self.wait_max = max(self.wait_max, waited)
+        return acquired
+
+    def release(self):
+        if fcntl is not None and self.lock_pid == os.getpid():
+            fcntl.flock(self.lock_file.fileno(), fcntl.LOCK_UN)
+        self.lock.release()
+
+    def snapshot(self):
+        with self.stats_lock:
+            return {
+                'writes': self.writes,
+                'waits': self.waits,
+                'wait_total_ms': round(self.wait_total * 1000, 3),
+                'wait_avg_ms': round(self.wait_total * 1000 / self.waits, 3) if self.waits else 0.0,
+                'wait_max_ms': round(self.wait_max * 1000, 3),
+                'timeouts': self.timeouts,
+                'busy': self.lock.locked()
+            }
+
+def sqlite_file(engine):
+    """Absolute path of a file-backed SQLite engine, else None"""
+    url = make_url(str(engine.url))
+    if url.get_backend_name() != 'sqlite' or url.database in (None, '', ':memory:'):
+        return None
+    if url.database.startswith('file:'):
+        return None
+    return os.path.abspath(url.database)
+
+def pragmas(config):
+    """PRAGMA statements applied to every new connection"""
+    return [
+        'PRAGMA journal_mode=WAL',
+        f"PRAGMA synchronous={config.get('SQLITE_SYNCHRONOUS', 'NORMAL')}",
+        f"PRAGMA busy_timeout={int(config.get('SQLITE_BUSY_TIMEOUT', 15) * 1000)}",
+        f"PRAGMA mmap_size={int(config.get('SQLITE_MMAP_SIZE', 268435456))}",
+        # Negative cache_size is in KiB rather than pages
+        f"PRAGMA cache_size=-{int(config.get('SQLITE_CACHE_SIZE_KB', 65536))}"
+    ]
+
+def get_queue(path, timeout):
+    with _queues_lock:
+        queue = _queues.get(path)
+        if queue is None:
+            queue = _queues[path] = WriteQueue(path, timeout)
+        return queue
+
+def install(engine, config):
+    """Apply production mode to a file-backed SQLite engine; False for anything else"""
+    path = sqlite_file(engine)
+    if path is None:
+        return False
+
+    statements = pragmas(config)
+
+    @event.listens_for(engine, 'connect')
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+
+    if not config.get('SQLITE_WRITE_QUEUE', True):
+        return True
+
+    queue = get_queue(path, config.get('SQLITE_BUSY_TIMEOUT', 15))
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def begin_write(conn, cursor, statement, parameters, context, executemany):
+        if not WRITE_RE.match(statement):
+            return
+        pooled = conn.connection
+        dbapi_connection = pooled.dbapi_connection
+        if HOLDING_KEY in pooled.info or dbapi_connection.in_transaction:
+            return
+
+        if queue.acquire():
+            pooled.info[HOLDING_KEY] = queue
+        try:
+            # pysqlite would open a deferred transaction here; an immediate
+            # one takes the write lock up front, waiting out other processes
+            dbapi_connection.execute('BEGIN IMMEDIATE')
+        except Exception:
+            release_write(dbapi_connection, pooled)
+            raise
+
+    # Sessions hand their connection back as soon as they commit or roll back
+    @event.listens_for(engine, 'checkin')
+    def release_write(dbapi_connection, connection_record):
+        held = connection_record.info.pop(HOLDING_KEY, None)
+        if held is not None:
+            held.release()
+
+    @event.listens_for(engine, 'invalidate')
+    def release_invalidated(dbapi_connection, connection_record, exception):
+        release_write(dbapi_connection, connection_record)
+
+    return True
+
+def install_all(app, engines):
+    """Install on every SQLite file engine (db.engines) when SQLITE_PRODUCTION_MODE is on"""
+    if not app.config.get('SQLITE_PRODUCTION_MODE', True):
+        return []
+    return [key or 'default' for key, engine in engines.items() if install(engine, app.config)]
+
+def write_queue_stats():
+    """Snapshot of every write queue, keyed by database file name"""
+    with _queues_lock:
+        queues = list(_queues.values())
+    return {os.path.basename(queue.path): queue.snapshot() for queue in queues}
@@ -0,0 +1,151 @@
+"""
+Per-worker identity cache for Flask-Login
+Serves current_user from a slim immutable snapshot so authenticated
+requests do not need a users query; the full row is loaded on demand.
+Invalidating a user bumps a version token in the shared cache, and every
+worker checks it before trusting its snapshot, so deleting, verifying or
+changing a user takes effect everywhere at once when CACHE_STORAGE_URL is
+shared (file://...)
+"""
+
+from flask import current_app
+from flask_login import UserMixin
+from models import User, db
+from services.cache import MISSING, get_cache
+from collections import OrderedDict, namedtuple
+import threading
+import time
+import uuid
+
+UserSnapshot = namedtuple('UserSnapshot', ['id', 'username', 'role', 'is_verified', 'mfa_enabled'])
+
+DEFAULT_TTL = 30
+DEFAULT_MAX_ENTRIES = 10000
+
+# Versions only need to outlive the snapshots checked against them
+VERSION_TTL = 24 * 3600
+
+_create_lock = threading.Lock()
+
+class SnapshotCache:
+    """One app's snapshots: user id -> (snapshot, expires_at, version)"""
+
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+def _snapshots():
+    app = current_app._get_current_object()
+    snapshots = app.extensions.get('user_cache')
+    if snapshots is None:
+        with _create_lock:
+            snapshots = app.extensions.setdefault('user_cache', SnapshotCache())
+    return snapshots
+
+def _version_key(user_id):
+    return f'user_version:{user_id}'
+
+def _version(user_id):
+    version = get_cache().get_shared(_version_key(user_id))
+    return None if version is MISSING else version
+
+class CachedUser(UserMixin):
+    """current_user backed by a snapshot, falling back to the User row
+
+    Reading any attribute outside the snapshot, calling a model method or
+    assigning an attribute loads the full row into the request's session.
+    """
+
+    def __init__(self, snapshot):
+        object.__setattr__(self, '_snapshot', snapshot)
+        object.__setattr__(self, '_model', None)
+
+    def _load(self):
+        model = object.__getattribute__(self, '_model')
+        if model is None:
+            model = db.session.get(User, self._snapshot.id)
+            object.__setattr__(self, '_model', model)
+        return model
+
+    def _field(self, name):
+        model = object.__getattribute__(self, '_model')
+        if model is not None:
+            return getattr(model, name)
+        return getattr(self._snapshot, name)
+
+    id = property(lambda self: self._snapshot.id)
+    username = property(lambda self: self._field('username'))
+    role = property(lambda self: self._field('role'))
+    is_verified = property(lambda self: self._field('is_verified'))
+    mfa_enabled = property(lambda self: self._field('mfa_enabled'))
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return getattr(self._load(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._load(), name, value)
+
+    def __repr__(self):
+        return f'<CachedUser {self._snapshot.id}>'
+
+def _fetch_snapshot(user_id):
+    row = db.session.execute(
+        db.select(User.id, User.username, User.role, User.is_verified, User.mfa_enabled).where(
+            User.id == user_id
+        )
+    ).first()
+    return UserSnapshot(*row) if row else None
+
+def load_user(user_id):
+    """Flask-Login user_loader backed by the snapshot cache"""
+    ttl = current_app.config.get('USER_CACHE_TTL', DEFAULT_TTL)
+    now = time.monotonic()
+    snapshots = _snapshots()
+    # Read before the row, so an invalidation in between only costs a miss
+    version = _version(user_id)
+
+    with snapshots.lock:
+        entry = snapshots.entries.get(user_id)
+        if entry and entry[1] > now and entry[2] == version:
+            snapshots.entries.move_to_end(user_id)
+            snapshots.hits += 1
+            return CachedUser(entry[0])
+        snapshots.misses += 1
+
+    snapshot = _fetch_snapshot(user_id)
+    if snapshot is None:
+        with snapshots.lock:
+            snapshots.entries.pop(user_id, None)
+        return None
+
+    max_entries = current_app.config.get('USER_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES)
+    with snapshots.lock:
+        snapshots.entries[user_id] = (snapshot, now + ttl, version)
+        snapshots.entries.move_to_end(user_id)
+        while len(snapshots.entries) > max_entries:
+            snapshots.entries.popitem(last=False)
+
+    return CachedUser(snapshot)
+
+def invalidate_user(user_id):
+    """Drop a user's snapshot on every worker after their role, verification, MFA or profile changes"""
+    snapshots = _snapshots()
+    with snapshots.lock:
+        snapshots.entries.pop(user_id, None)
+    get_cache().set(_version_key(user_id), uuid.uuid4().hex[:12], VERSION_TTL)
+
+def clear():
+    """Drop every snapshot this worker holds"""
+    snapshots = _snapshots()
+    with snapshots.lock:
+        snapshots.entries.clear()
+
+def stats():
+    """Hit/miss counters for this worker"""
+    snapshots = _snapshots()
+    with snapshots.lock:
+        return {'hits': snapshots.hits, 'misses': snapshots.misses, 'entries': len(snapshots.entries)}
@@ -7,7 +7,7 @@ from flask import Flask, render_template, request, redirect, url_for, flash, jso
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
-import hashlib
+from services import passwords
 from datetime import datetime
 import os
 
@@ -35,11 +35,14 @@ class User(UserMixin, db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     def set_password(self, password):
-        # Use a simple hash for compatibility
-        self.password_hash = hashlib.sha256(password.encode()).hexdigest()
+        # Same scheme as the main app so both can share a user store
+        self.password_hash = passwords.hash_password(password)
     
     def check_password(self, password):
-        return self.password_hash == hashlib.sha256(password.encode()).hexdigest()
+        matches, needs_rehash = passwords.verify_password(self.password_hash, password)
+        if matches and needs_rehash:
+            self.set_password(password)
+        return matches
 
 # Entity model
 class Entity(db.Model):
@@ -92,6 +95,7 @@ def login():
         
         if user and user.check_password(password):
             login_user(user)
+            db.session.commit()  # Persist an upgraded password hash
             flash('Login successful!', 'success')
             return redirect(url_for('index'))
         else:
@@ -0,0 +1,205 @@
+// RMGFraud - Live moderation updates over Server-Sent Events, or polling
+//
+// Pages opt in with data attributes:
+//   data-live-stream="<url>"          SSE stream, when the deployment serves one
+//   data-live-poll="<url>"            polling fallback (no stream, or the stream is refused)
+//   data-live-poll-seconds="<n>"      polling interval
+//   data-live-counter="<name>"        number adjusted as events arrive
+//   data-live-list="reports"          container new reports are prepended to
+//   data-live-status-filter="<status>" on the list; rows leaving it are removed
+//   data-report-id / data-user-id / data-entity-id   rows updated in place
+//   data-live-status / data-live-verified            badges inside those rows
+
+// Each handler updates rows in place; `adjust` moves counters by event, or
+// does nothing when polling, which sets counters from fresh totals instead
+const liveHandlers = {
+    new_report: function(report, adjust) {
+        adjust('total_reports', 1);
+        adjust(report.status + '_reports', 1);
+        prependReport(report);
+    },
+    report_reviewed: function(report, adjust) {
+        adjust(report.old_status + '_reports', -1);
+        adjust(report.status + '_reports', 1);
+        updateReportRow(report);
+    },
+    user_verified: function(user, adjust) {
+        adjust('verified_users', 1);
+        adjust('pending_verifications', -1);
+        markVerified(document.querySelectorAll(`[data-user-id="${user.id}"]`));
+    },
+    users_verified: function(batch, adjust) {
+        adjust('verified_users', batch.ids.length);
+        adjust('pending_verifications', -batch.ids.length);
+        batch.ids.forEach(function(id) {
+            markVerified(document.querySelectorAll(`[data-user-id="${id}"]`));
+        });
+    },
+    entity_verified: function(entity, adjust) {
+        adjust('verified_entities', 1);
+        adjust('pending_entities', -1);
+        markVerified(document.querySelectorAll(`[data-entity-id="${entity.id}"]`));
+    }
+};
+
+document.addEventListener('DOMContentLoaded', function() {
+    const root = document.querySelector('[data-live-stream], [data-live-poll]');
+    if (!root) return;
+
+    if (root.dataset.liveStream && window.EventSource) {
+        openStream(root);
+    } else if (root.dataset.livePoll) {
+        startPolling(root, null);
+    }
+});
+
+function openStream(root) {
+    const source = new EventSource(root.dataset.liveStream);
+    let lastId = null;
+
+    Object.keys(liveHandlers).forEach(function(type) {
+        source.addEventListener(type, function(event) {
+            lastId = parseInt(event.lastEventId, 10);
+            liveHandlers[type](JSON.parse(event.data), adjustCounter);
+        });
+    });
+
+    source.addEventListener('hello', function(event) {
+        lastId = JSON.parse(event.data).last_id;
+    });
+
+    source.addEventListener('resync', function() {
+        // Missed more events than the server keeps; start from fresh counts
+        source.close();
+        window.location.reload();
+    });
+
+    source.addEventListener('error', function() {
+        // Refused (every stream slot busy) rather than a dropped connection
+        if (source.readyState === EventSource.CLOSED && root.dataset.livePoll) {
+            startPolling(root, lastId);
+        }
+    });
+}
+
+function startPolling(root, lastId) {
+    const interval = (parseInt(root.dataset.livePollSeconds, 10) || 15) * 1000;
+
+    function poll() {
+        const url = new URL(root.dataset.livePoll, window.location.href);
+        if (lastId !== null) url.searchParams.set('last_id', lastId);
+
+        fetch(url, {credentials: 'same-origin', headers: {'Accept': 'application/json'}})
+            .then(response => response.ok ? response.json() : Promise.reject(response.status))
+            .then(function(update) {
+                if (update.resync) {
+                    window.location.reload();
+                    return;
+                }
+                update.events.forEach(function(event) {
+                    const handler = liveHandlers[event.type];
+                    if (handler) handler(event.data, function() {});
+                });
+                Object.keys(update.counts).forEach(name => setCounter(name, update.counts[name]));
+                lastId = update.last_id;
+            })
+            .catch(function() {})
+            .finally(() => setTimeout(poll, interval));
+    }
+
+    poll();
+}
+
+function setCounter(name, value) {
+    document.querySelectorAll(`[data-live-counter="${name}"]`).forEach(function(counter) {
+        if (counter.textContent === String(value)) return;
+        counter.textContent = value;
+        counter.classList.add('live-updated');
+        setTimeout(() => counter.classList.remove('live-updated'), 1500);
+    });
+}
+
+function adjustCounter(name, delta) {
+    document.querySelectorAll(`[data-live-counter="${name}"]`).forEach(function(counter) {
+        const value = parseInt(counter.textContent, 10) || 0;
+        counter.textContent = Math.max(0, value + delta);
+        counter.classList.add('live-updated');
+        setTimeout(() => counter.classList.remove('live-updated'), 1500);
+    });
+}
+
+function prependReport(report) {
+    document.querySelectorAll('[data-live-list="reports"]').forEach(function(list) {
+        const filter = list.dataset.liveStatusFilter;
+        if (filter && filter !== 'all' && filter !== report.status) return;
+
+        const row = document.createElement('div');
+        row.className = 'report-item d-flex justify-content-between align-items-center py-3 border-bottom live-updated';
+        row.dataset.reportId = report.id;
+
+        const info = document.createElement('div');
+        const title = document.createElement('h6');
+        title.className = 'text-white mb-1';
+        title.textContent = report.title;
+        const meta = document.createElement('small');
+        meta.className = 'text-muted';
+        meta.textContent = `${report.fraud_type} · ${formatDateTime(report.created_at)}`;
+        info.append(title, meta);
+
+        const badges = document.createElement('div');
+        const status = document.createElement('span');
+        status.className = `badge bg-${getStatusBadgeColor(report.status)}`;
+        status.dataset.liveStatus = '';
+        status.textContent = formatStatus(report.status);
+        const risk = document.createElement('span');
+        risk.className = `badge bg-${getRiskBadgeColor(report.risk_level)} ms-2`;
+        risk.textContent = report.risk_level;
+        badges.append(status, risk);
+
+        row.append(info, badges);
+        list.prepend(row);
+
+        const empty = list.querySelector('[data-live-empty]');
+        if (empty) empty.remove();
+    });
+}
+
+function updateReportRow(report) {
+    document.querySelectorAll(`[data-report-id="${report.id}"]`).forEach(function(row) {
+        const list = row.closest('[data-live-list]');
+        const filter = list ? list.dataset.liveStatusFilter : null;
+        if (filter && filter !== 'all' && filter !== report.status) {
+            row.remove();
+            return;
+        }
+        const status = row.querySelector('[data-live-status]');
+        if (status) {
+            status.textContent = formatStatus(report.status);
+            status.className = `badge bg-${getStatusBadgeColor(report.status)}`;
+        }
+    });
+}
+
+function markVerified(rows) {
+    rows.forEach(function(row) {
+        const badge = row.querySelector('[data-live-verified]');
+        if (badge) {
+            badge.textContent = 'Verified';
+            badge.className = 'badge bg-success';
+        }
+        row.querySelectorAll('[data-live-verify-action]').forEach(action => action.remove());
+    });
+}
+
+function formatStatus(status) {
+    return status.replace('_', ' ').replace(/\b\w/g, c => c.toUpperCase());
+}
+
+function getStatusBadgeColor(status) {
+    switch (status) {
+        case 'verified': return 'success';
+        case 'pending': return 'warning';
+        case 'rejected': return 'danger';
+        default: return 'secondary';
+    }
+}
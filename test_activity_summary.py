@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+RMGFraud Activity Summary Tests
+The per-user counters stay equal to a fresh count of the user's reports
+through submissions and moderation, and the backfill command gives every
+user a row
+"""
+
+import pytest
+
+from extensions import db
+from factory import create_app
+from models import FraudReport, User, UserActivitySummary
+from services import activity_summary
+
+COUNTERS = ('reports_total', 'reports_pending', 'reports_under_review', 'reports_verified', 'reports_rejected')
+
+@pytest.fixture
+def app():
+    app = create_app('testing', config_overrides={'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+    with app.app_context():
+        db.create_all()
+        for name, role in (('moderator', 'moderator'), ('reporter', 'user'), ('quiet', 'user')):
+            user = User(username=name, email=f'{name}@example.com', role=role, is_verified=True)
+            user.set_password('Secret123!')
+            db.session.add(user)
+        db.session.commit()
+    return app
+
+def login(client, user_id):
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+        session['_fresh'] = True
+
+def counters(app, user_id):
+    with app.app_context():
+        summary = db.session.get(UserActivitySummary, user_id)
+        return {name: getattr(summary, name) for name in COUNTERS}
+
+def recounted(app, user_id):
+    with app.app_context():
+        summary = activity_summary._fill(UserActivitySummary(user_id=user_id))
+        return {name: getattr(summary, name) for name in COUNTERS}
+
+def test_counters_follow_submissions_and_reviews(app):
+    """Each submission and review moves exactly one report between counters"""
+    client = app.test_client()
+    login(client, 2)
+    for title in ('First', 'Second', 'Third'):
+        response = client.post('/reporting/submit', data={
+            'title': title, 'fraud_type': 'Labor Violations', 'risk_level': 'Medium', 'summary': 'Seen on site'
+        })
+        assert response.status_code == 302
+    assert counters(app, 2) == dict(recounted(app, 2), reports_total=3, reports_pending=3)
+
+    login(client, 1)
+    for report_id, review_status in ((1, 'approved'), (2, 'rejected'), (3, 'needs_more_info'), (3, 'approved')):
+        response = client.post(f'/reporting/review/{report_id}', data={'review_status': review_status})
+        assert response.status_code == 302
+        assert counters(app, 2) == recounted(app, 2)
+
+    assert counters(app, 2) == {
+        'reports_total': 3, 'reports_pending': 0, 'reports_under_review': 0,
+        'reports_verified': 2, 'reports_rejected': 1
+    }
+
+def test_repeated_review_does_not_double_count(app):
+    """Approving an already verified report leaves the counters alone"""
+    with app.app_context():
+        report = FraudReport(
+            title='Repeat', fraud_type='Other', risk_level='Low', summary='Seen', status='pending', reporter_id=2
+        )
+        db.session.add(report)
+        activity_summary.record_report(report)
+        db.session.commit()
+
+        for _ in range(2):
+            old_status = report.status
+            report.status = 'verified'
+            activity_summary.record_status_change(report, old_status)
+            db.session.commit()
+
+    assert counters(app, 2) == recounted(app, 2) == dict(
+        reports_total=1, reports_pending=0, reports_under_review=0, reports_verified=1, reports_rejected=0
+    )
+
+def test_rebuild_command_backfills_every_user(app):
+    """Users with reports from before the summaries existed get a correct row"""
+    with app.app_context():
+        db.session.add_all([
+            FraudReport(title=f'Old {i}', fraud_type='Other', risk_level='Low', summary='Seen',
+                        status=status, reporter_id=2)
+            for i, status in enumerate(['pending', 'verified', 'verified'])
+        ])
+        db.session.commit()
+        assert UserActivitySummary.query.count() == 0
+
+    result = app.test_cli_runner().invoke(args=['rebuild-activity-summaries'])
+
+    assert 'for 3 users' in result.output
+    with app.app_context():
+        assert UserActivitySummary.query.count() == 3
+    assert counters(app, 2) == dict(
+        reports_total=3, reports_pending=1, reports_under_review=0, reports_verified=2, reports_rejected=0
+    )
+    assert counters(app, 3)['reports_total'] == 0
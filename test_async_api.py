@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+RMGFraud Async API Tests
+Drives the ASGI app from services/async_api.py with its real dependencies
+(a2wsgi, aiosqlite) against a SQLite file: lifespan, the async JSON
+routes, the WSGI fall-through and load shedding when the pool is exhausted
+"""
+
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip('a2wsgi')
+pytest.importorskip('aiosqlite')
+pytest.importorskip('greenlet')
+
+from flask import url_for
+
+from extensions import db
+from factory import create_app
+from models import CountryProfile, Entity
+
+COUNTRIES = ['BD', 'IN', 'PK']
+
+def seed():
+    for i, code in enumerate(COUNTRIES):
+        db.session.add(CountryProfile(
+            country_name=code, country_code=code, fraud_count=i * 3, high_risk_count=i, critical_count=i % 2
+        ))
+    for i in range(12):
+        db.session.add(Entity(
+            name=f'Entity {i} Garments Ltd',
+            entity_type='company',
+            country_code=COUNTRIES[i % len(COUNTRIES)],
+            risk_level='High' if i % 2 else 'Low',
+            is_verified=i % 3 == 0
+        ))
+    db.session.commit()
+
+def make_app(tmp_path, **settings):
+    overrides = {'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "async.db"}'}
+    overrides.update(settings)
+    app = create_app('testing', config_overrides=overrides)
+    with app.app_context():
+        db.create_all()
+        if not CountryProfile.query.count():
+            seed()
+    return app
+
+def url(app, endpoint):
+    with app.test_request_context():
+        return url_for(endpoint)
+
+async def call(asgi, path, method='GET', query_string=b'', headers=()):
+    """Run one HTTP request through asgi; return (status, headers, body)"""
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+        'method': method, 'scheme': 'http', 'path': path, 'raw_path': path.encode(),
+        'root_path': '', 'query_string': query_string, 'headers': list(headers),
+        'client': ('127.0.0.1', 50000), 'server': ('testserver', 80)
+    }
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    await asgi(scope, receive, send)
+    start = messages[0]
+    body = b''.join(message.get('body', b'') for message in messages[1:])
+    return start['status'], dict(start['headers']), body
+
+@pytest.fixture
+def app(tmp_path):
+    return make_app(tmp_path)
+
+def test_lifespan_disposes_engine(app):
+    """Startup completes and shutdown closes the async pool"""
+    from services.async_api import create_asgi_app
+    asgi = create_asgi_app(app)
+    incoming = [{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}]
+    sent = []
+
+    async def receive():
+        return incoming.pop(0)
+
+    async def send(message):
+        sent.append(message['type'])
+
+    async def run():
+        await call(asgi, url(app, 'country.api_statistics'))
+        assert asgi.engine.pool.checkedin() == 1
+        await asgi({'type': 'lifespan'}, receive, send)
+
+    asyncio.run(run())
+    assert sent == ['lifespan.startup.complete', 'lifespan.shutdown.complete']
+    assert asgi.engine.pool.checkedin() == 0
+
+def test_json_routes_match_flask(app):
+    """The four async endpoints return what the Flask views return"""
+    from services.async_api import create_asgi_app
+    asgi = create_asgi_app(app)
+    client = app.test_client()
+    json_header = (b'content-type', b'application/json')
+
+    requests = [
+        (url(app, 'country.api_statistics'), b'', ()),
+        (url(app, 'country.api_heatmap_data'), b'', ()),
+        (url(app, 'database.search'), b'q=Garments&country=BD', (json_header,)),
+        (url(app, 'reporting.fraud_types'), b'', ())
+    ]
+
+    async def run():
+        results = [await call(asgi, path, query_string=query, headers=headers) for path, query, headers in requests]
+        await asgi.engine.dispose()
+        return results
+
+    for (path, query, headers), (status, response_headers, body) in zip(requests, asyncio.run(run())):
+        expected = client.get(path, query_string=query.decode(), headers=dict(
+            (name.decode(), value.decode()) for name, value in headers
+        ))
+        assert status == expected.status_code == 200, path
+        assert response_headers[b'content-type'] == b'application/json'
+        assert json.loads(body) == expected.get_json(), path
+
+    search = json.loads(asyncio.run(call(
+        asgi, requests[2][0], query_string=requests[2][1], headers=requests[2][2]
+    ))[2])
+    assert search and {entity['country_code'] for entity in search} == {'BD'}
+
+def test_other_requests_fall_through_to_flask(app):
+    """Pages and non-GET methods are answered by the WSGI app"""
+    from services.async_api import create_asgi_app
+    asgi = create_asgi_app(app)
+
+    async def run():
+        page = await call(asgi, '/')
+        post = await call(asgi, url(app, 'reporting.fraud_types'), method='POST')
+        await asgi.engine.dispose()
+        return page, post
+
+    (page_status, page_headers, page_body), (post_status, _, _) = asyncio.run(run())
+    assert page_status == 200
+    assert page_headers[b'content-type'].startswith(b'text/html')
+    assert page_body == app.test_client().get('/').data
+    # Flask's method check, not the async router
+    assert post_status == 405
+
+def test_pool_timeout_returns_503(tmp_path):
+    """With every pooled connection held, a JSON request is shed with 503"""
+    from services.async_api import create_asgi_app
+    app = make_app(tmp_path, ASYNC_DB_POOL_SIZE=1, ASYNC_DB_MAX_OVERFLOW=0, ASYNC_DB_POOL_TIMEOUT=0.2)
+    asgi = create_asgi_app(app)
+
+    async def run():
+        async with asgi.engine.connect():
+            busy = await call(asgi, url(app, 'country.api_statistics'))
+        freed = await call(asgi, url(app, 'country.api_statistics'))
+        await asgi.engine.dispose()
+        return busy, freed
+
+    (status, headers, body), (freed_status, _, _) = asyncio.run(run())
+    assert status == 503
+    assert headers[b'retry-after'] == b'1'
+    assert 'error' in json.loads(body)
+    assert freed_status == 200
+
+def test_rate_limit_shares_flask_buckets(tmp_path):
+    """Async requests draw on the endpoint's token bucket like Flask ones"""
+    from services.async_api import create_asgi_app
+    app = make_app(tmp_path, RATELIMIT_ENABLED=True, RATELIMIT_ENDPOINT_LIMITS={'reporting.fraud_types': '2 per hour'})
+    asgi = create_asgi_app(app)
+    path = url(app, 'reporting.fraud_types')
+
+    async def run():
+        results = [await call(asgi, path) for _ in range(3)]
+        await asgi.engine.dispose()
+        return results
+
+    statuses = [status for status, _, _ in asyncio.run(run())]
+    assert statuses == [200, 200, 429]
+    # The bucket is the one Flask's before_request hook checks
+    assert app.test_client().get(path, environ_base={'REMOTE_ADDR': '127.0.0.1'}).status_code == 429
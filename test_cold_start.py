@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+"""
+RMGFraud Cold Start Test
+Fails when app creation starts importing heavy libraries or exceeds the
+startup import budget (COLD_START_BUDGET_MS, see benchmarks/cold_start.py)
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks'))
+
+import cold_start
+
+BUDGET_MS = float(os.environ.get('COLD_START_BUDGET_MS') or cold_start.DEFAULT_BUDGET_MS)
+
+def test_startup_skips_heavy_modules():
+    """Neither eager nor lazy app creation may load numpy, pandas, qrcode, ..."""
+    for lazy in (False, True):
+        result = cold_start.measure(lazy=lazy)
+        assert result['heavy'] == [], f"lazy={lazy} imported {result['heavy']}"
+
+def test_startup_import_budget():
+    """Best of three runs must stay within the import budget"""
+    best = min(cold_start.measure(lazy=True)['import_ms'] for _ in range(3))
+    assert best <= BUDGET_MS, f'{best:.1f} ms of imports, budget {BUDGET_MS:.0f} ms'
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+RMGFraud Entity Key Tests
+Canonical key normalisation, the create race in find_or_create_entity and
+the duplicate merge that moves reports to the surviving entity
+"""
+
+import pytest
+
+from extensions import db
+from factory import create_app
+from models import Entity, EntityReportCount, FraudReport
+from services import entity_keys, report_counts, scheduler
+
+@pytest.fixture
+def app():
+    app = create_app('testing', config_overrides={'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+
+def add_report(entity, **fields):
+    report = FraudReport(
+        title='Unpaid wages', fraud_type='Labor Violations', risk_level='High',
+        summary='Seeded report', entity_id=entity.id, status='pending', **fields
+    )
+    db.session.add(report)
+    return report
+
+@pytest.mark.parametrize('name, key', [
+    ('ABC Garments Ltd.', 'abc garments ltd'),
+    ('abc  garments   LIMITED', 'abc garments ltd'),
+    ('  ABC Garments Limited  ', 'abc garments ltd'),
+    ('Ábc Garments Pvt. Ltd', 'abc garments pvt ltd'),
+    ('ABC Garments Private Limited', 'abc garments pvt ltd'),
+    ('Smith & Sons Co', 'smith and sons co'),
+    # Legal words are only rewritten at the end of the name
+    ('Limited Editions Apparel', 'limited editions apparel'),
+    ('Limited', 'limited'),
+    ('', None),
+    ('...', None)
+])
+def test_canonical_entity_key(name, key):
+    assert entity_keys.canonical_entity_key(name) == key
+
+def test_find_or_create_reuses_the_canonical_entity(app):
+    """Spelling variants of a name resolve to one entity"""
+    entity, created = entity_keys.find_or_create_entity('ABC Garments Ltd.', 'company', 'BD')
+    db.session.commit()
+    again, created_again = entity_keys.find_or_create_entity('abc garments limited', 'company', 'BD')
+
+    assert created and not created_again
+    assert again.id == entity.id
+    # Type and country are part of the key
+    other, created_other = entity_keys.find_or_create_entity('ABC Garments Ltd', 'supplier', 'BD')
+    assert created_other and other.id != entity.id
+
+def test_find_or_create_recovers_from_a_lost_race(app, monkeypatch):
+    """When another request inserts the same key first, its entity is returned"""
+    winner, _ = entity_keys.find_or_create_entity('Race Knitwear Ltd', 'company', 'BD')
+    db.session.commit()
+
+    # The lookup misses as it would before the other request committed
+    real_find = entity_keys.find_entity
+    calls = []
+
+    def find_after_race(*args):
+        calls.append(args)
+        return None if len(calls) == 1 else real_find(*args)
+
+    monkeypatch.setattr(entity_keys, 'find_entity', find_after_race)
+
+    entity, created = entity_keys.find_or_create_entity('RACE KNITWEAR LIMITED', 'company', 'BD')
+    assert not created
+    assert entity.id == winner.id
+    # Missed once, then found again after the IntegrityError
+    assert len(calls) == 2
+    # Only the savepoint rolled back; the outer transaction still works
+    db.session.commit()
+    assert Entity.query.count() == 1
+
+def test_merge_group_moves_reports_to_the_survivor(app):
+    """Duplicates fold into the verified entity, which takes over their reports and counts"""
+    first = Entity(name='Delta Apparel Ltd', entity_type='company', country_code='BD')
+    verified = Entity(name='DELTA APPAREL LIMITED', entity_type='company', country_code='BD', is_verified=True)
+    third = Entity(name='Delta Apparel', entity_type='company', country_code='BD', registration_number='C-1')
+    db.session.add_all([first, verified, third])
+    db.session.flush()
+    for entity, count in ((first, 2), (verified, 1), (third, 3)):
+        for _ in range(count):
+            add_report(entity)
+    db.session.commit()
+    report_counts.rebuild_counts()
+
+    result = entity_keys.merge_group([first.id, verified.id, third.id], 'delta apparel ltd')
+
+    assert result['survivor_id'] == verified.id
+    assert sorted(result['merged_ids']) == sorted([first.id, third.id])
+    assert result['reports_moved'] == 5
+    assert Entity.query.count() == 1
+    survivor = db.session.get(Entity, verified.id)
+    assert survivor.registration_number == 'C-1'
+    assert survivor.risk_scored_at is None
+    assert {report.entity_id for report in FraudReport.query} == {verified.id}
+    assert report_counts.counts_for_entity(verified.id)['total'] == 6
+    assert EntityReportCount.query.filter(EntityReportCount.entity_id != verified.id).count() == 0
+
+def test_consolidate_entities_keys_and_merges(app):
+    """The entity_merge job keys legacy rows and merges the groups they form"""
+    db.session.add_all([
+        Entity(name='Old Mills Ltd', entity_type='company', country_code='IN'),
+        Entity(name='old mills limited', entity_type='company', country_code='IN'),
+        Entity(name='Other Mills', entity_type='company', country_code='IN')
+    ])
+    db.session.commit()
+
+    result = entity_keys.consolidate_entities()
+
+    assert result['merged'] == 1
+    assert Entity.query.count() == 2
+    assert Entity.query.filter(Entity.canonical_key.is_(None)).count() == 0
+
+def test_merge_view_only_queues_the_job(app):
+    """The admin action makes entity_merge due instead of merging in the request"""
+    assert scheduler.request_run('entity_merge')
+    job = db.session.get(scheduler.ScheduledJob, 'entity_merge')
+    assert job.enabled and job.next_run_at <= scheduler.datetime.utcnow()
+
+    app.config['SCHEDULER_JOBS'] = dict(app.config['SCHEDULER_JOBS'], entity_merge='off')
+    assert not scheduler.request_run('entity_merge')
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+RMGFraud Event Tests
+Two SqliteBrokers on one event log stand in for two gunicorn workers: the
+first cursor a worker hands out covers events the other published, and
+later polls pick up new ones through the tail
+"""
+
+import pytest
+
+from services import events
+
+@pytest.fixture
+def workers(tmp_path):
+    path = str(tmp_path / 'events.db')
+    return events.SqliteBroker(path, poll_interval=0.05), events.SqliteBroker(path, poll_interval=0.05)
+
+def test_first_cursor_includes_other_workers_events(workers):
+    viewer, publisher = workers
+    for n in range(3):
+        publisher.publish('report_submitted', {'id': n})
+
+    # The viewer's buffer was empty when these were published
+    assert events.poll(viewer, None) == (3, [], False)
+
+def test_poll_after_the_first_cursor_returns_new_events(workers):
+    viewer, publisher = workers
+    publisher.publish('report_submitted', {'id': 1})
+    cursor, _, _ = events.poll(viewer, None)
+
+    publisher.publish('report_reviewed', {'id': 1})
+    assert [event[0] for event in viewer.wait(cursor, timeout=2)] == [cursor + 1]
+    last_id, new_events, resync = events.poll(viewer, cursor)
+    assert (last_id, resync) == (cursor + 1, False)
+    assert [event[1] for event in new_events] == ['report_reviewed']
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+RMGFraud Fragment Cache Tests
+Outside serverless the shared file cache is the default store, so
+{% cache %} blocks are on, and a cached page skips the queries behind its
+fragment, not just the rendering
+"""
+
+import pytest
+from sqlalchemy import event
+
+from extensions import db
+from factory import create_app
+from models import CountryProfile, Entity
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app('testing', config_overrides={
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "fragments.db"}',
+        'CACHE_STORAGE_URL': f'file://{tmp_path / "cache"}'
+    })
+    with app.app_context():
+        db.create_all()
+        db.session.add(Entity(name='Cached Garments Ltd', entity_type='company', country_code='BD'))
+        db.session.add(CountryProfile(country_name='Bangladesh', country_code='BD', fraud_count=3))
+        db.session.commit()
+    return app
+
+@pytest.fixture
+def statements(app):
+    seen = []
+    with app.app_context():
+        engine = db.engine
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        seen.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', record)
+    yield seen
+    event.remove(engine, 'before_cursor_execute', record)
+
+def test_default_store_is_shared_outside_serverless(tmp_path):
+    app = create_app('testing', config_overrides={'CACHE_STORAGE_URL': None})
+    assert app.config['CACHE_STORAGE_URL'].startswith('file://')
+    assert app.config['FRAGMENT_CACHE_ENABLED'] is True
+
+    serverless = create_app('testing', config_overrides={
+        'CACHE_STORAGE_URL': None, 'DB_ENGINE_PROFILE': 'serverless'
+    })
+    assert serverless.config['CACHE_STORAGE_URL'] == 'memory://'
+    assert serverless.config['FRAGMENT_CACHE_ENABLED'] is False
+
+@pytest.mark.parametrize('path, table, text', [
+    ('/database/?q=Cached', 'entities', b'Cached Garments Ltd'),
+    ('/country/', 'country_profiles', b'Bangladesh')
+])
+def test_cached_fragment_skips_its_queries(app, statements, path, table, text):
+    client = app.test_client()
+    first = client.get(path)
+    assert first.status_code == 200 and text in first.data
+    assert any(f'FROM {table}' in statement for statement in statements)
+
+    statements.clear()
+    second = client.get(path)
+    assert second.data == first.data
+    assert not any(f'FROM {table}' in statement for statement in statements)
+
+def test_commit_re_renders_the_fragment(app):
+    client = app.test_client()
+    client.get('/database/?q=Garments')
+    with app.app_context():
+        db.session.add(Entity(name='Fresh Garments Ltd', entity_type='company', country_code='BD'))
+        db.session.commit()
+    assert b'Fresh Garments Ltd' in client.get('/database/?q=Garments').data
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+RMGFraud Migration Tests
+Runs the migrations in migrations/ against SQLite files: a database built
+by create_all() upgrades without changes, and the canonical key revision
+merges duplicate entities before it creates the unique index
+"""
+
+import os
+
+import pytest
+
+pytest.importorskip('flask_migrate')
+
+import flask_migrate
+from sqlalchemy import inspect, text
+
+from extensions import db
+from factory import create_app
+from models import Entity, EntityReportCount, FraudReport
+
+MIGRATIONS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+
+# The revision before the canonical key one
+BEFORE_CANONICAL_KEYS = 'f1713d57e476'
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app('testing', config_overrides={'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "migrate.db"}'})
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+
+def test_create_all_database_upgrades_to_the_models(app):
+    """Every revision skips what create_all() already made, and head matches the models"""
+    flask_migrate.upgrade(directory=MIGRATIONS)
+    # Exits with an error when autogenerate finds a difference
+    flask_migrate.check(directory=MIGRATIONS)
+
+def test_canonical_key_revision_merges_before_indexing(app):
+    """Duplicates of an existing database are merged, then the unique index is created"""
+    with db.engine.begin() as connection:
+        connection.execute(text('DROP INDEX uq_entities_canonical'))
+    db.session.add_all([
+        Entity(name='ABC Garments Ltd', entity_type='company', country_code='BD'),
+        Entity(name='abc garments limited', entity_type='company', country_code='BD', is_verified=True),
+        Entity(name='ABC Garments Ltd.', entity_type='company', country_code='BD', contact_info='ops@abc.example'),
+        Entity(name='ABC Garments Ltd', entity_type='supplier', country_code='BD')
+    ])
+    db.session.flush()
+    for entity_id in (1, 1, 2, 3, 4):
+        db.session.add(FraudReport(
+            title='Unpaid wages', fraud_type='Labor Violations', risk_level='High',
+            summary='Seeded report', status='pending', entity_id=entity_id
+        ))
+    db.session.commit()
+
+    flask_migrate.stamp(directory=MIGRATIONS, revision=BEFORE_CANONICAL_KEYS)
+    flask_migrate.upgrade(directory=MIGRATIONS)
+    db.session.expire_all()
+
+    survivor = db.session.get(Entity, 2)
+    assert [entity.id for entity in Entity.query.order_by(Entity.id)] == [2, 4]
+    assert survivor.canonical_key == 'abc garments ltd'
+    assert survivor.contact_info == 'ops@abc.example'
+    assert FraudReport.query.filter_by(entity_id=2).count() == 4
+    assert db.session.get(EntityReportCount, (2, 'pending', 'High')).report_count == 4
+    assert 'uq_entities_canonical' in {index['name'] for index in inspect(db.engine).get_indexes('entities')}
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+RMGFraud Password Hashing Tests
+Legacy hashes are upgraded and saved even when the login stops at the
+MFA prompt, and the semaphore caps how many hashes run at once
+"""
+
+import hashlib
+import threading
+import time
+
+import pytest
+
+from extensions import db
+from factory import create_app
+from models import User
+from services import passwords
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app('testing', config_overrides={
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "passwords.db"}'
+    })
+    with app.app_context():
+        db.create_all()
+        user = User(username='member', email='member@example.com', role='user', mfa_enabled=True)
+        user.generate_mfa_secret()
+        user.password_hash = hashlib.sha256(b'Secret123!').hexdigest()
+        db.session.add(user)
+        db.session.commit()
+    return app
+
+def stored_hash(app):
+    with app.app_context():
+        return db.session.get(User, 1).password_hash
+
+def test_mfa_prompt_saves_the_upgraded_hash(app):
+    response = app.test_client().post('/auth/login', data={'username': 'member', 'password': 'Secret123!'})
+    assert response.status_code == 200
+
+    upgraded = stored_hash(app)
+    assert upgraded.startswith('pbkdf2:sha256:1000$')
+    with app.app_context():
+        assert passwords.verify_password(upgraded, 'Secret123!') == (True, False)
+
+def test_failed_mfa_token_saves_the_upgraded_hash(app):
+    response = app.test_client().post(
+        '/auth/login', data={'username': 'member', 'password': 'Secret123!', 'mfa_token': '000000'}
+    )
+    assert response.status_code == 200
+    assert stored_hash(app).startswith('pbkdf2:sha256:1000$')
+
+def test_wrong_password_keeps_the_legacy_hash(app):
+    app.test_client().post('/auth/login', data={'username': 'member', 'password': 'wrong'})
+    assert stored_hash(app) == hashlib.sha256(b'Secret123!').hexdigest()
+
+def test_concurrent_hashes_are_capped(app, monkeypatch):
+    app.config['PASSWORD_HASH_WORKERS'] = 2
+    lock = threading.Lock()
+    running = []
+    peak = []
+
+    def slow_hash(password, method):
+        with lock:
+            running.append(password)
+            peak.append(len(running))
+        time.sleep(0.05)
+        with lock:
+            running.remove(password)
+        return password
+
+    monkeypatch.setattr(passwords, 'generate_password_hash', slow_hash)
+
+    def hash_one(password):
+        with app.app_context():
+            passwords.hash_password(password)
+
+    threads = [threading.Thread(target=hash_one, args=(str(n),)) for n in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(peak) == 6
+    assert max(peak) == 2
+
+def test_saturated_slots_time_out(app):
+    app.config.update(PASSWORD_HASH_WORKERS=1, PASSWORD_HASH_TIMEOUT=0.05)
+    with app.app_context():
+        slots = passwords._get_slots()
+        slots.acquire()
+        try:
+            with pytest.raises(TimeoutError):
+                passwords.hash_password('Secret123!')
+        finally:
+            slots.release()
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+RMGFraud Query Budget Tests
+Requests every blueprint route against a seeded database with the query
+guard in 'raise' mode, so a route fails when it exceeds its @query_budget
+or repeats a statement shape per row (N+1)
+"""
+
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from jinja2 import ChoiceLoader, DictLoader
+
+from factory import create_app
+from extensions import db
+from models import User, Entity, FraudReport, ReportReview, CountryProfile, AuditLog
+from services import activity_summary, query_guard, report_counts
+
+COUNTRIES = ['BD', 'IN', 'PK', 'CN', 'LK', 'MM', 'TH', 'VN']
+ENTITY_TYPES = ['company', 'individual', 'supplier', 'manufacturer']
+RISK_LEVELS = ['Low', 'Medium', 'High', 'Critical']
+STATUSES = ['pending', 'under_review', 'verified', 'rejected']
+
+USERS = 40
+ENTITIES = 150
+REPORTS = 600
+
+# Requested signed out; every other route runs as the seeded admin
+ANONYMOUS = {'auth.login', 'auth.register'}
+
+# Pages whose templates are not in this tree, stubbed with what the real
+# pages show so their relationship loads are still counted
+STUB_TEMPLATES = {
+    'country/country_detail.html': (
+        '{{ country.country_name }}: {% for entity in entities %}{{ entity.name }} {% endfor %}'
+        '{% for report in fraud_reports %}{{ report.title }} {% endfor %}'
+        '{% for row in monthly_reports %}{{ row.month.strftime("%Y-%m") }}={{ row.count }};{% endfor %}'
+    ),
+    'dashboard/audit_logs.html': (
+        '{% for log in logs.items %}{{ log.action }} {{ log.user.username if log.user }} {% endfor %}'
+    ),
+    'dashboard/profile.html': '{{ user.username }}',
+    'dashboard/settings.html': '{{ user.username }}',
+    'database/add_entity.html': 'Add entity',
+    'database/edit_entity.html': '{{ entity.name }}',
+    'database/search_results.html': '{% for entity in entities %}{{ entity.name }} {% endfor %}',
+    'reporting/my_reports.html': '{% for report in reports.items %}{{ report.title }} {{ report.status }} {% endfor %}',
+    'reporting/report_detail.html': (
+        '{{ report.title }} {{ report.reporter.username if report.reporter }} {{ report.entity.name }} '
+        '{% for review in report.reviews %}{{ review.review_status }} {{ review.reviewer.username }} {% endfor %}'
+    ),
+    'reporting/success.html': 'Report submitted'
+}
+
+# Redirect on GET; POSTs redirect, or re-render a rejected form with 200
+REDIRECTS = {'auth.logout'}
+
+# endpoint -> (method, url arguments, form data); run in this order
+ROUTES = [
+    ('index', 'GET', {}, None),
+    ('auth.login', 'GET', {}, None),
+    ('auth.login', 'POST', {}, {'username': 'member2', 'password': 'wrong'}),
+    ('auth.login', 'POST', {}, {'username': 'member2', 'password': 'Secret123!'}),
+    ('auth.register', 'GET', {}, None),
+    ('auth.register', 'POST', {}, {
+        'username': 'newcomer', 'email': 'newcomer@example.com', 'password': 'Secret123!',
+        'confirm_password': 'Secret123!', 'verification_id': 'BGMEA-NEW', 'verification_type': 'bgmea'
+    }),
+    ('auth.setup_mfa', 'GET', {}, None),
+    ('auth.verify_mfa', 'POST', {}, {'token': '000000'}),
+    ('auth.disable_mfa', 'POST', {}, {'password': 'wrong'}),
+    ('country.index', 'GET', {}, None),
+    ('country.country_detail', 'GET', {'country_code': 'BD'}, None),
+    ('country.api_statistics', 'GET', {}, None),
+    ('country.api_heatmap_data', 'GET', {}, None),
+    ('country.update_statistics', 'GET', {}, None),
+    ('dashboard.index', 'GET', {}, None),
+    ('dashboard.profile', 'GET', {}, None),
+    ('dashboard.settings', 'GET', {}, None),
+    ('dashboard.update_profile', 'POST', {}, {'username': 'admin', 'email': 'admin@example.com'}),
+    ('dashboard.change_password', 'POST', {}, {
+        'current_password': 'wrong', 'new_password': 'Secret456!', 'confirm_password': 'Secret456!'
+    }),
+    ('dashboard.admin', 'GET', {}, None),
+    ('dashboard.event_stream', 'GET', {}, None),
+    ('dashboard.event_poll', 'GET', {}, {'last_id': 0}),
+    ('dashboard.pending_users', 'GET', {}, None),
+    ('dashboard.verify_user', 'POST', {'user_id': 3}, {}),
+    ('dashboard.verify_users', 'POST', {}, {'user_ids': ['5', '7', '9', '11', '13']}),
+    ('dashboard.pool_stats', 'GET', {}, None),
+    ('dashboard.scheduled_jobs', 'GET', {}, None),
+    ('dashboard.profiling_report', 'GET', {}, None),
+    ('dashboard.profiling_dump', 'GET', {}, None),
+    ('dashboard.reset_profiling', 'POST', {}, {}),
+    ('dashboard.audit_logs', 'GET', {}, None),
+    ('dashboard.rescore_risk', 'POST', {}, {'full': 'on'}),
+    ('dashboard.merge_entities', 'POST', {}, {}),
+    ('database.index', 'GET', {}, None),
+    ('database.search', 'GET', {}, {'q': 'Garments', 'country': 'BD'}),
+    ('database.entity_detail', 'GET', {'id': 1}, None),
+    ('database.entity_reports', 'GET', {'id': 1}, None),
+    ('database.entity_network', 'GET', {'id': 1}, None),
+    ('database.add_entity', 'GET', {}, None),
+    ('database.add_entity', 'POST', {}, {
+        'name': 'Budget Test Knitwear Ltd', 'entity_type': 'manufacturer', 'country_code': 'BD',
+        'risk_level': 'Medium'
+    }),
+    ('database.edit_entity', 'GET', {'id': 2}, None),
+    ('database.edit_entity', 'POST', {'id': 2}, {
+        'name': 'Entity 2 Garments Ltd', 'entity_type': 'company', 'country_code': 'BD', 'risk_level': 'High'
+    }),
+    ('database.verify_entity', 'POST', {'id': 3}, {}),
+    ('reporting.submit', 'GET', {}, None),
+    ('reporting.submit', 'POST', {}, {
+        'title': 'Wage theft at dyeing unit', 'fraud_type': 'Labor Violations', 'risk_level': 'High',
+        'summary': 'Workers unpaid for three months', 'entity_name': 'Entity 4 Garments Ltd',
+        'entity_type': 'company', 'country_code': 'BD', 'sources': 'https://example.com/a'
+    }),
+    ('reporting.success', 'GET', {}, None),
+    ('reporting.my_reports', 'GET', {}, None),
+    ('reporting.report_detail', 'GET', {'id': 1}, None),
+    ('reporting.moderate', 'GET', {}, None),
+    ('reporting.review_report', 'POST', {'id': 2}, {'review_status': 'approved', 'review_notes': 'Checked'}),
+    ('reporting.fraud_types', 'GET', {}, None),
+    ('dashboard.delete_user', 'POST', {'user_id': 40}, {}),
+    ('auth.logout', 'GET', {}, None),
+]
+
+def seed():
+    """Users, entities, reports, reviews and audit logs at realistic volumes"""
+    rng = random.Random(44)
+    now = datetime.utcnow()
+
+    users = []
+    for i in range(1, USERS + 1):
+        user = User(
+            username='admin' if i == 1 else f'member{i}',
+            email='admin@example.com' if i == 1 else f'member{i}@example.com',
+            role='admin' if i == 1 else ('moderator' if i % 10 == 0 else 'user'),
+            is_verified=i == 1 or i % 2 == 0,
+            verification_id=f'BGMEA-{i:04d}',
+            verification_type=['bgmea', 'rmg_supplier', 'banking'][i % 3],
+            created_at=now - timedelta(days=i)
+        )
+        user.set_password('Secret123!')
+        users.append(user)
+    db.session.add_all(users)
+
+    for code in COUNTRIES:
+        db.session.add(CountryProfile(country_name=code, country_code=code))
+
+    entities = [
+        Entity(
+            name=f'Entity {i} Garments Ltd',
+            entity_type=ENTITY_TYPES[i % len(ENTITY_TYPES)],
+            country_code=COUNTRIES[i % len(COUNTRIES)],
+            risk_level=RISK_LEVELS[i % len(RISK_LEVELS)],
+            is_verified=i % 3 == 0
+        )
+        for i in range(1, ENTITIES + 1)
+    ]
+    db.session.add_all(entities)
+    db.session.flush()
+
+    reports = [
+        FraudReport(
+            title=f'Report {i}',
+            fraud_type=rng.choice(['Financial Fraud', 'Supply Chain Fraud', 'Labor Violations']),
+            risk_level=rng.choice(RISK_LEVELS),
+            summary='Seeded report',
+            sources='["https://example.com"]',
+            is_anonymous=i % 4 == 0,
+            status=rng.choice(STATUSES),
+            entity_id=entities[rng.randrange(ENTITIES)].id,
+            reporter_id=users[rng.randrange(USERS)].id,
+            created_at=now - timedelta(hours=i)
+        )
+        for i in range(1, REPORTS + 1)
+    ]
+    db.session.add_all(reports)
+    db.session.flush()
+
+    for report in reports[:200]:
+        db.session.add(ReportReview(
+            fraud_report_id=report.id,
+            reviewer_id=users[0].id,
+            review_status='approved',
+            review_notes='Seeded review'
+        ))
+    for i in range(300):
+        db.session.add(AuditLog(
+            user_id=users[i % USERS].id,
+            action='view_entity',
+            resource_type='entity',
+            resource_id=entities[i % ENTITIES].id,
+            timestamp=now - timedelta(minutes=i)
+        ))
+    db.session.commit()
+
+    report_counts.rebuild_counts()
+    for user in users:
+        activity_summary.rebuild_summary(user.id)
+
+@pytest.fixture(scope='module')
+def app():
+    app = create_app('testing', config_overrides={'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+    app.jinja_loader = ChoiceLoader([app.jinja_loader, DictLoader(STUB_TEMPLATES)])
+    with app.app_context():
+        db.create_all()
+        seed()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+
+def test_guard_flags_repeated_statements():
+    """A shape run once per row is reported even inside the total budget"""
+    report = query_guard.QueryReport('example.view', budget=50, max_repeats=3)
+    for entity_id in range(10):
+        report.shapes[query_guard.statement_shape(
+            f'SELECT * FROM entities WHERE entities.id = {entity_id}'
+        )] += 1
+    report.shapes[query_guard.statement_shape('SELECT * FROM users WHERE id IN (?, ?, ?)')] += 1
+    report.shapes[query_guard.statement_shape('SELECT * FROM users WHERE id IN (?, ?)')] += 1
+
+    assert report.total == 12
+    assert len(report.shapes) == 2
+    assert [count for _, count in report.repeated()] == [10]
+    assert len(report.problems()) == 1
+
+def test_every_blueprint_route_is_budgeted(app):
+    """Each blueprint endpoint has a budget and a row in ROUTES"""
+    covered = {endpoint for endpoint, _, _, _ in ROUTES}
+    for rule in app.url_map.iter_rules():
+        if rule.endpoint in ('static', 'metrics'):
+            continue
+        assert rule.endpoint in covered, f'{rule.endpoint} missing from ROUTES'
+        if '.' in rule.endpoint:
+            view = app.view_functions[rule.endpoint]
+            assert hasattr(view, 'query_budget'), f'{rule.endpoint} has no @query_budget'
+
+def test_routes_stay_within_query_budgets(app):
+    """Each route runs within its budget and without N+1 statements"""
+    client = app.test_client()
+    failures = []
+
+    for endpoint, method, kwargs, data in ROUTES:
+        with client.session_transaction() as session:
+            session.clear()
+            if endpoint not in ANONYMOUS:
+                session['_user_id'] = '1'
+                session['_fresh'] = True
+
+        with app.test_request_context():
+            from flask import url_for
+            url = url_for(endpoint, **kwargs)
+
+        try:
+            if method == 'GET':
+                response = client.get(url, query_string=data)
+                expected = (302,) if endpoint in REDIRECTS else (200,)
+                assert response.status_code in expected, f'{endpoint}: {response.status_code}'
+            else:
+                response = client.post(url, data=data)
+                assert response.status_code in (200, 302), f'{endpoint}: {response.status_code}'
+        except query_guard.QueryBudgetExceeded:
+            # Collected from the report below, with every other route's
+            pass
+
+        with app.app_context():
+            report = query_guard.last_report()
+            assert report is not None and report.endpoint == endpoint, endpoint
+            failures.extend(report.problems())
+
+    assert failures == []
+
+def test_country_trend_counts_reports_by_month(app):
+    """The trend has one row per month, oldest first, covering every recent report"""
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = '1'
+        session['_fresh'] = True
+    page = client.get('/country/BD').get_data(as_text=True)
+
+    rows = [row.split('=') for row in page.rsplit(' ', 1)[-1].split(';') if row]
+    months = [month for month, _ in rows]
+    assert months == sorted(months) and len(set(months)) == len(months)
+    with app.app_context():
+        # Every seeded report is recent; the route tests may have added more
+        assert sum(int(count) for _, count in rows) == FraudReport.query.count()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+RMGFraud Rate Limit Tests
+Token buckets on the Flask request path: only the configured endpoints
+and methods are limited, an empty bucket answers 429 with Retry-After and
+refills over time, apps keep their own limits, and idle SQLite buckets
+are pruned
+"""
+
+import time
+
+import pytest
+
+from extensions import db
+from factory import create_app
+from services import rate_limit
+
+def make_app(tmp_path, **overrides):
+    config = {
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "limits.db"}',
+        'RATELIMIT_ENABLED': True,
+        'RATELIMIT_ENDPOINT_LIMITS': {'POST auth.login': '2 per second'}
+    }
+    config.update(overrides)
+    app = create_app('testing', config_overrides=config)
+    with app.app_context():
+        db.create_all()
+    return app
+
+def login(client):
+    return client.post('/auth/login', data={'username': 'nobody', 'password': 'wrong'})
+
+def test_empty_bucket_returns_429_and_refills(tmp_path):
+    client = make_app(tmp_path).test_client()
+    assert [login(client).status_code for _ in range(2)] == [200, 200]
+
+    limited = login(client)
+    assert limited.status_code == 429
+    assert limited.headers['Retry-After'] == '1'
+    assert limited.headers['X-RateLimit-Limit'] == '2'
+    assert limited.get_json()['error'] == 'rate_limited'
+
+    # 2 per second refills a token every half second
+    time.sleep(0.6)
+    assert login(client).status_code == 200
+    assert login(client).status_code == 429
+
+def test_unlisted_endpoints_and_methods_are_not_limited(tmp_path):
+    client = make_app(tmp_path).test_client()
+    for _ in range(5):
+        assert client.get('/auth/login').status_code == 200
+        assert client.get('/').status_code == 200
+
+def test_apps_keep_their_own_limits(tmp_path):
+    strict = make_app(tmp_path)
+    lenient = make_app(tmp_path, RATELIMIT_ENDPOINT_LIMITS={'POST auth.login': '100 per second'})
+    assert strict.extensions['rate_limiter'] is not lenient.extensions['rate_limiter']
+
+    strict_client, lenient_client = strict.test_client(), lenient.test_client()
+    assert [login(strict_client).status_code for _ in range(3)] == [200, 200, 429]
+    assert [login(lenient_client).status_code for _ in range(3)] == [200, 200, 200]
+
+def test_sqlite_buckets_are_pruned_once_refilled(tmp_path):
+    app = make_app(tmp_path, RATELIMIT_STORAGE_URL=f'sqlite:///{tmp_path / "buckets.db"}')
+    limiter = app.extensions['rate_limiter']
+    limiter.consume('auth.login', 'POST', '10.0.0.1')
+    limiter.consume('auth.login', 'POST', '10.0.0.2')
+
+    with app.app_context():
+        assert rate_limit.prune_buckets() == {'pruned': 0}
+        time.sleep(1.1)
+        limiter.consume('auth.login', 'POST', '10.0.0.2')
+        assert rate_limit.prune_buckets() == {'pruned': 1}
+
+def test_parse_limits_normalises_methods():
+    assert rate_limit.parse_limits({'post auth.login': '60/minute', 'database.search': '10 per second'}) == {
+        'POST auth.login': (60, 1.0),
+        'database.search': (10, 10.0)
+    }
+    with pytest.raises(ValueError):
+        rate_limit.parse_limits({'database.search': 'lots'})
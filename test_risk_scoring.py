@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+RMGFraud Risk Scoring Tests
+The score formula and level bands, and which entities an incremental
+rescore picks up: new reports, decay of quiet entities and reports
+removed from an entity
+"""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from extensions import db
+from factory import create_app
+from models import Entity, FraudReport
+from services import risk_scoring
+
+NOW = datetime(2026, 10, 1, 12, 0)
+
+@pytest.fixture
+def app():
+    app = create_app('testing', config_overrides={'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+
+def frame(*rows):
+    return pd.DataFrame(rows, columns=['entity_id', 'risk_level', 'status', 'created_at'])
+
+def add_entity(name):
+    entity = Entity(name=name, entity_type='company', country_code='BD')
+    db.session.add(entity)
+    db.session.flush()
+    return entity
+
+def add_report(entity, risk_level='High', status='verified', created_at=NOW):
+    report = FraudReport(
+        title='Unpaid wages', fraud_type='Labor Violations', risk_level=risk_level, summary='Seeded report',
+        entity_id=entity.id, status=status, created_at=created_at, updated_at=created_at
+    )
+    db.session.add(report)
+    return report
+
+def test_score_weighs_severity_status_and_age():
+    entity_ids, scores, counts = risk_scoring.compute_scores(frame(
+        (1, 'Critical', 'verified', NOW),
+        (2, 'Critical', 'verified', NOW - timedelta(days=180)),
+        (3, 'Critical', 'rejected', NOW),
+        (4, 'Low', 'pending', NOW),
+        (4, 'Medium', 'under_review', NOW)
+    ), now=NOW)
+
+    assert entity_ids.tolist() == [1, 2, 3, 4]
+    assert counts.tolist() == [1, 1, 1, 2]
+    expected = [
+        100 * (1 - np.exp(-8.0 / 20)),
+        # One half-life halves the report's weight
+        100 * (1 - np.exp(-4.0 / 20)),
+        0.0,
+        100 * (1 - np.exp(-(1.0 * 0.4 + 2.0 * 0.6) / 20))
+    ]
+    assert scores.tolist() == pytest.approx(np.round(expected, 2).tolist())
+
+def test_score_saturates_below_100():
+    reports = [(1, 'Critical', 'verified', NOW)] * 50
+    _, scores, _ = risk_scoring.compute_scores(frame(*reports), now=NOW)
+    assert 99.0 < scores[0] <= 100.0
+
+def test_score_to_level_bands():
+    scores = np.array([0.0, 24.99, 25.0, 49.99, 50.0, 74.99, 75.0, 100.0])
+    assert risk_scoring.score_to_level(scores).tolist() == [
+        'Low', 'Low', 'Medium', 'Medium', 'High', 'High', 'Critical', 'Critical'
+    ]
+
+def test_incremental_rescore_reads_only_updated_reports(app):
+    first, second = add_entity('First Garments'), add_entity('Second Garments')
+    add_report(first)
+    add_report(second)
+    db.session.commit()
+    assert risk_scoring.rescore_entities(now=NOW)['entities'] == 2
+
+    # Nothing changed: nothing is rescored
+    later = NOW + timedelta(hours=1)
+    assert risk_scoring.rescore_entities(now=later)['entities'] == 0
+
+    add_report(second, risk_level='Critical', created_at=later)
+    db.session.commit()
+    result = risk_scoring.rescore_entities(now=later + timedelta(minutes=5))
+    assert (result['entities'], result['reports']) == (1, 2)
+    assert db.session.get(Entity, second.id).risk_report_count == 2
+    assert db.session.get(Entity, second.id).risk_score > db.session.get(Entity, first.id).risk_score
+
+def test_quiet_entities_decay_after_the_decay_step(app):
+    entity = add_entity('Quiet Garments')
+    add_report(entity, risk_level='Critical')
+    db.session.commit()
+    risk_scoring.rescore_entities(now=NOW)
+    score = db.session.get(Entity, entity.id).risk_score
+
+    # Inside the decay step the entity is left alone
+    assert risk_scoring.rescore_entities(now=NOW + timedelta(hours=23))['entities'] == 0
+
+    result = risk_scoring.rescore_entities(now=NOW + timedelta(days=180))
+    assert result['entities'] == 1
+    assert db.session.get(Entity, entity.id).risk_score < score
+
+def test_rescore_after_reports_are_removed(app):
+    entity = add_entity('Removed Garments')
+    kept = add_report(entity, risk_level='Low')
+    removed = add_report(entity, risk_level='Critical')
+    db.session.commit()
+    risk_scoring.rescore_entities(now=NOW)
+    assert db.session.get(Entity, entity.id).computed_risk_level == 'Medium'
+
+    db.session.delete(removed)
+    db.session.commit()
+    risk_scoring.rescore_entities(now=NOW + timedelta(hours=25))
+    rescored = db.session.get(Entity, entity.id)
+    assert rescored.risk_report_count == 1
+    assert rescored.computed_risk_level == 'Low'
+
+    # An entity with no reports left scores 0 and drops out of decay rescoring
+    db.session.delete(kept)
+    db.session.commit()
+    risk_scoring.rescore_entities(now=NOW + timedelta(hours=50))
+    assert (rescored.risk_score, rescored.risk_report_count) == (0.0, 0)
+    assert risk_scoring.rescore_entities(now=NOW + timedelta(hours=75))['entities'] == 0
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+RMGFraud Scheduler Tests
+Web workers never start the polling thread unless SCHEDULER_ENABLED is
+set; jobs run from `flask run-jobs`, including runs the dashboard queues
+"""
+
+import pytest
+
+from config import Config
+from extensions import db
+from factory import create_app
+from models import JobRun
+from services import scheduler
+
+def make_app(tmp_path, enabled):
+    app = create_app('testing', config_overrides={
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "jobs.db"}',
+        'SCHEDULER_ENABLED': enabled
+    })
+    with app.app_context():
+        db.create_all()
+    return app
+
+@pytest.fixture
+def app(tmp_path):
+    return make_app(tmp_path, Config.SCHEDULER_ENABLED)
+
+def test_web_workers_do_not_start_the_scheduler(app, monkeypatch):
+    started = []
+    monkeypatch.setattr(scheduler, 'start', started.append)
+    app.test_client().get('/')
+    assert not Config.SCHEDULER_ENABLED
+    assert started == []
+
+def test_enabled_scheduler_starts_on_the_first_request(tmp_path, monkeypatch):
+    started = []
+    monkeypatch.setattr(scheduler, 'start', started.append)
+    monkeypatch.setattr(scheduler, '_started_pid', None)
+    app = make_app(tmp_path, True)
+    app.test_client().get('/')
+    assert started == [app]
+
+def test_run_jobs_runs_queued_jobs(app):
+    runner = app.test_cli_runner()
+    # Nothing is due right after the schedules are synced
+    assert runner.invoke(args=['run-jobs']).output == ''
+
+    with app.app_context():
+        assert scheduler.request_run('job_history')
+    assert runner.invoke(args=['run-jobs']).output == 'Ran job_history.\n'
+    with app.app_context():
+        run = JobRun.query.one()
+        assert (run.job_name, run.status) == ('job_history', 'success')
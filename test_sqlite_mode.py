@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+RMGFraud SQLite Mode Tests
+Runs writes against a SQLite file with production mode on and checks they
+go through the single-writer queue and open with BEGIN IMMEDIATE
+"""
+
+import re
+
+import pytest
+from flask import url_for
+from sqlalchemy import event
+
+from extensions import db
+from factory import create_app
+from models import Entity, FraudReport, User
+from services import sqlite_mode
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app('testing', config_overrides={
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "queue.db"}',
+        'SQLITE_PRODUCTION_MODE': True,
+        'SQLITE_WRITE_QUEUE': True
+    })
+    with app.app_context():
+        db.create_all()
+        user = User(username='reporter', email='reporter@example.com', is_verified=True)
+        user.set_password('Secret123!')
+        db.session.add(user)
+        db.session.commit()
+    return app
+
+def queue_writes(app):
+    with app.app_context():
+        return sqlite_mode.get_queue(sqlite_mode.sqlite_file(db.engine), 0).snapshot()['writes']
+
+def test_new_entity_report_takes_the_write_queue(app):
+    """Submitting a report for a new entity queues before its SAVEPOINT"""
+    seen = []
+    with app.app_context():
+        engine = db.engine
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if sqlite_mode.WRITE_RE.match(statement):
+            seen.append((statement.split()[0].upper(), sqlite_mode.HOLDING_KEY in conn.connection.info))
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = '1'
+        session['_fresh'] = True
+    with app.test_request_context():
+        url = url_for('reporting.submit')
+
+    before = queue_writes(app)
+    response = client.post(url, data={
+        'title': 'Unpaid overtime', 'fraud_type': 'Labor Violations', 'risk_level': 'High',
+        'summary': 'Overtime never paid', 'entity_name': 'Brand New Knitwear Ltd',
+        'entity_type': 'company', 'country_code': 'BD'
+    })
+    event.remove(engine, 'before_cursor_execute', record)
+
+    assert response.status_code == 302
+    assert queue_writes(app) - before >= 1
+    assert ('SAVEPOINT', True) in seen
+    # Every write ran inside a transaction that held the queue
+    assert all(holding for _, holding in seen)
+    with app.app_context():
+        assert Entity.query.filter_by(name='Brand New Knitwear Ltd').count() == 1
+        assert FraudReport.query.count() == 1
+
+def test_reads_do_not_take_the_write_queue(app):
+    """Plain SELECTs never wait for the writer"""
+    before = queue_writes(app)
+    with app.app_context():
+        assert User.query.count() == 1
+    assert queue_writes(app) == before
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+RMGFraud User Cache Tests
+Two apps on one database file and one file:// cache stand in for two
+gunicorn workers: invalidating a user on one must reach the other's
+snapshot before its TTL runs out
+"""
+
+import pytest
+
+from extensions import db
+from factory import create_app
+from models import User
+from services import user_cache
+
+@pytest.fixture
+def workers(tmp_path):
+    overrides = {
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "users.db"}',
+        'CACHE_STORAGE_URL': f'file://{tmp_path / "cache"}',
+        'USER_CACHE_TTL': 3600
+    }
+    first = create_app('testing', config_overrides=overrides)
+    second = create_app('testing', config_overrides=overrides)
+    with first.app_context():
+        db.create_all()
+        user = User(username='member', email='member@example.com', role='user', is_verified=False)
+        user.set_password('Secret123!')
+        db.session.add(user)
+        db.session.commit()
+    return first, second
+
+def load(app, user_id=1):
+    with app.app_context():
+        user = user_cache.load_user(user_id)
+        return user and (user.role, user.is_verified)
+
+def test_snapshot_is_served_from_the_worker_cache(workers):
+    first, _ = workers
+    assert load(first) == ('user', False)
+    assert load(first) == ('user', False)
+    with first.app_context():
+        assert user_cache.stats() == {'hits': 1, 'misses': 1, 'entries': 1}
+
+def test_invalidation_reaches_other_workers(workers):
+    """Verifying, then deleting, a user on one worker shows on the other straight away"""
+    first, second = workers
+    assert load(first) == ('user', False)
+
+    with second.app_context():
+        db.session.get(User, 1).is_verified = True
+        db.session.commit()
+        user_cache.invalidate_user(1)
+    assert load(first) == ('user', True)
+
+    with second.app_context():
+        db.session.delete(db.session.get(User, 1))
+        db.session.commit()
+        user_cache.invalidate_user(1)
+    assert load(first) is None
+
+def test_apps_do_not_share_snapshots(workers, tmp_path):
+    """Each app keeps its own snapshots, so another database's user 1 is never served"""
+    first, _ = workers
+    assert load(first) == ('user', False)
+
+    other = create_app('testing', config_overrides={'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "other.db"}'})
+    with other.app_context():
+        db.create_all()
+        admin = User(username='admin', email='admin@example.com', role='admin', is_verified=True)
+        admin.set_password('Secret123!')
+        db.session.add(admin)
+        db.session.commit()
+    assert load(other) == ('admin', True)